@@ -37,7 +37,8 @@ def get_scraper_names(enable_beta_scrapers=False):
 def make_scraper_registry(*, home_dir=Path('work'),
                           census_api_key=None,
                           registry_args={},
-                          scraper_args={}):
+                          scraper_args={},
+                          web_cache_args={}):
     """Returns a Registry instance with all the per-state scrapers
     registered.
 
@@ -53,10 +54,13 @@ def make_scraper_registry(*, home_dir=Path('work'),
 
       scraper_args: optional, a dict of additional keyword arguments
         for all scrapers' constructors.
+
+      web_cache_args: optional, a dict of additional keyword arguments
+        for the WebCache constructor.
     """
     os.makedirs(str(home_dir), exist_ok=True)
     # We need a web cache for creating the census API.
-    web_cache = WebCache(str(home_dir / 'web_cache.db'))
+    web_cache = WebCache(str(home_dir / 'web_cache.db'), **web_cache_args)
     with UTILS_WEB_CACHE.with_instance(web_cache):
         census_api = CensusApi(census_api_key)
     registry = Registry(web_cache=web_cache, **registry_args)
@@ -0,0 +1,296 @@
+# Content-addressed storage for cached response bodies.
+import gzip
+import hashlib
+import logging
+import mmap
+import os
+from pathlib import Path
+import shutil
+import tempfile
+import time
+import zlib
+
+
+_logger = logging.getLogger(__name__)
+
+
+# The size of reads and writes when copying files.
+CHUNK_SIZE = 1 << 16
+
+
+def content_digest(content):
+    """Return the hex SHA-256 digest used to address `content`."""
+    return hashlib.sha256(content).hexdigest()
+
+
+def file_digest(path):
+    """Return the hex SHA-256 digest of the file's contents, reading it
+    in chunks.
+    """
+    hasher = hashlib.sha256()
+    with open(str(path), 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _read_chunks(path):
+    with open(str(path), 'rb') as f:
+        yield from iter(lambda: f.read(CHUNK_SIZE), b'')
+
+
+def _gzip_chunks(chunks, compresslevel):
+    """Generate the gzip-compressed form of chunks, compressing them
+    one at a time.
+    """
+    # wbits=31 selects the gzip container, which gzip.decompress reads.
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        yield compressor.compress(chunk)
+    yield compressor.flush()
+
+
+class BlobStore(object):
+    """Stores bodies as files named by the SHA-256 of their contents, so
+    identical bodies are stored once.
+
+    Bodies that compress well (HTML, JSON, CSV) are stored gzipped.
+    Bodies that do not (PDFs, zip files, Excel workbooks, images) are
+    stored as-is, so they can be memory-mapped by `open`.
+
+    Files are laid out as `path/ab/abcdef...` or `path/ab/abcdef....gz`.
+
+    """
+    # Bodies smaller than this are not worth compressing.
+    MIN_COMPRESS_SIZE = 1024
+    # How much of a body to test-compress when deciding whether to
+    # compress it all.
+    COMPRESS_SAMPLE_SIZE = 64 * 1024
+    # Compress if the sample shrinks to this fraction or less.
+    COMPRESS_RATIO = 0.8
+
+    def __init__(self, path, compresslevel=6):
+        self.path = Path(path)
+        self.compresslevel = compresslevel
+        os.makedirs(str(self.path), exist_ok=True)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} path={self.path}>'
+
+    def _blob_path(self, digest, compressed):
+        name = f'{digest}.gz' if compressed else digest
+        return self.path / digest[:2] / name
+
+    def _find(self, digest):
+        """Return the path to the stored blob, and whether it is
+        compressed, or (None, None) if it is not stored.
+        """
+        for compressed in (False, True):
+            path = self._blob_path(digest, compressed)
+            if path.exists():
+                return path, compressed
+        return None, None
+
+    def _should_compress(self, content):
+        if len(content) < self.MIN_COMPRESS_SIZE:
+            return False
+        sample = bytes(content[:self.COMPRESS_SAMPLE_SIZE])
+        return (len(gzip.compress(sample, compresslevel=1))
+                <= self.COMPRESS_RATIO * len(sample))
+
+    def _write_atomically(self, path, chunks):
+        """Write chunks to a temporary file and move it to path, so
+        concurrent writers and readers never see a partial blob.
+        """
+        os.makedirs(str(path.parent), exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=str(path.parent),
+                                        prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp_name, str(path))
+        except BaseException:
+            os.remove(tmp_name)
+            raise
+
+    def contains(self, digest):
+        return self._find(digest)[0] is not None
+
+    def put(self, content):
+        """Store content if it is not already stored, and return its
+        digest.
+        """
+        digest = content_digest(content)
+        path, _ = self._find(digest)
+        if path is not None:
+            _logger.debug(f'Blob already stored: {digest}')
+            # Mark the blob as recently stored, so a concurrent sweep
+            # of unreferenced blobs leaves it alone.
+            os.utime(str(path))
+            return digest
+        compressed = self._should_compress(content)
+        path = self._blob_path(digest, compressed)
+        if compressed:
+            content = gzip.compress(content, compresslevel=self.compresslevel)
+        _logger.debug(f'Storing blob: {path}')
+        self._write_atomically(path, [content])
+        return digest
+
+    def put_file(self, path, digest=None):
+        """Store the contents of the file at path if they are not already
+        stored, and return their digest.  The file is copied in chunks,
+        so it need not fit in memory.
+
+        Arguments:
+          path: the file to store.
+          digest: optional, the file's digest, if already computed.
+
+        """
+        digest = digest or file_digest(path)
+        stored, _ = self._find(digest)
+        if stored is not None:
+            _logger.debug(f'Blob already stored: {digest}')
+            os.utime(str(stored))
+            return digest
+        with open(str(path), 'rb') as f:
+            compressed = self._should_compress(
+                f.read(self.COMPRESS_SAMPLE_SIZE))
+        chunks = _read_chunks(path)
+        if compressed:
+            chunks = _gzip_chunks(chunks, self.compresslevel)
+        stored = self._blob_path(digest, compressed)
+        _logger.debug(f'Storing blob: {stored}')
+        self._write_atomically(stored, chunks)
+        return digest
+
+    def copy_to(self, digest, path):
+        """Write the stored content to the file at path in chunks, and
+        return whether it was stored.
+        """
+        stored, compressed = self._find(digest)
+        if stored is None:
+            return False
+        if compressed:
+            with gzip.open(str(stored), 'rb') as src, \
+                    open(str(path), 'wb') as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        else:
+            shutil.copyfile(str(stored), str(path))
+        return True
+
+    def get(self, digest):
+        """Return the stored content as bytes, or None if it is not
+        stored.
+        """
+        path, compressed = self._find(digest)
+        if path is None:
+            return None
+        with path.open('rb') as f:
+            if compressed:
+                return gzip.decompress(f.read())
+            return f.read()
+
+    def open(self, digest):
+        """Return a read-only buffer of the stored content, or None if it is
+        not stored.
+
+        Uncompressed blobs are memory-mapped rather than read into
+        memory.  The returned mmap can be sliced, written to a file,
+        or wrapped in a memoryview.
+        """
+        path, compressed = self._find(digest)
+        if path is None:
+            return None
+        if compressed or path.stat().st_size == 0:
+            # Compressed content has to be decompressed into memory,
+            # and empty files cannot be mapped.
+            return self.get(digest)
+        with path.open('rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def size(self, digest):
+        """Return the number of bytes the stored blob uses on disk, or
+        None if it is not stored.
+        """
+        path, _ = self._find(digest)
+        if path is not None:
+            return path.stat().st_size
+
+    def digests(self):
+        """Generate pairs of digest and time last stored for all stored
+        blobs.
+        """
+        for path in self.path.glob('*/*'):
+            if path.name.startswith('.tmp-'):
+                continue
+            try:
+                mtime = path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            yield path.name.split('.')[0], mtime
+
+    def delete(self, digest):
+        path, _ = self._find(digest)
+        if path is not None:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        """Remove all stored blobs."""
+        shutil.rmtree(str(self.path), ignore_errors=True)
+        os.makedirs(str(self.path), exist_ok=True)
+
+
+class MemoryBlobStore(object):
+    """An in-memory counterpart of BlobStore, for in-memory caches."""
+
+    def __init__(self):
+        self._blobs = {}
+        self._stored = {}
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} blobs={len(self._blobs)}>'
+
+    def contains(self, digest):
+        return digest in self._blobs
+
+    def put(self, content):
+        digest = content_digest(content)
+        self._blobs.setdefault(digest, bytes(content))
+        self._stored[digest] = time.time()
+        return digest
+
+    def put_file(self, path, digest=None):
+        with open(str(path), 'rb') as f:
+            return self.put(f.read())
+
+    def copy_to(self, digest, path):
+        if digest not in self._blobs:
+            return False
+        with open(str(path), 'wb') as f:
+            f.write(self._blobs[digest])
+        return True
+
+    def get(self, digest):
+        return self._blobs.get(digest)
+
+    def open(self, digest):
+        return self._blobs.get(digest)
+
+    def size(self, digest):
+        if digest in self._blobs:
+            return len(self._blobs[digest])
+
+    def digests(self):
+        return list(self._stored.items())
+
+    def delete(self, digest):
+        self._blobs.pop(digest, None)
+        self._stored.pop(digest, None)
+
+    def clear(self):
+        self._blobs.clear()
+        self._stored.clear()
@@ -1,10 +1,25 @@
 from contextlib import contextmanager
 import logging
 import os
+import threading
 
 
 _logger = logging.getLogger(__name__)
 
+# The working directory is shared by all threads in a process, so
+# only one thread at a time may be inside a dir_context.
+_CWD_LOCK = threading.RLock()
+
+
+def _reset_cwd_lock():
+    # A forked child has only the forking thread, so the lock may be
+    # held by a thread that no longer exists.
+    global _CWD_LOCK
+    _CWD_LOCK = threading.RLock()
+
+
+os.register_at_fork(after_in_child=_reset_cwd_lock)
+
 
 @contextmanager
 def dir_context(path):
@@ -13,13 +28,19 @@ def dir_context(path):
        "with dir_context(path): ..."
     construction.
 
+    Since the cwd is process-wide, the scope holds a lock, so threads
+    entering it are serialized rather than changing each other's
+    directories.  To run scrapers concurrently, use separate processes
+    (see Registry's `jobs` argument).
+
     path: required, string or Pathlike for a directory that exists.
     """
-    oldcwd = os.getcwd()
-    try:
-        _logger.debug(f'Entering: {oldcwd} -> {path}')
-        os.chdir(str(path))
-        yield
-    finally:
-        _logger.debug(f'Exiting: {os.getcwd()} -> {oldcwd}')
-        os.chdir(oldcwd)
+    with _CWD_LOCK:
+        oldcwd = os.getcwd()
+        try:
+            _logger.debug(f'Entering: {oldcwd} -> {path}')
+            os.chdir(str(path))
+            yield
+        finally:
+            _logger.debug(f'Exiting: {os.getcwd()} -> {oldcwd}')
+            os.chdir(oldcwd)
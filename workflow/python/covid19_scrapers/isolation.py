@@ -0,0 +1,143 @@
+"""Helpers for running a scraper in its own child process, so that a
+hung browser or an oversized JVM can be killed without taking down
+the parent.
+
+"""
+import logging
+import multiprocessing
+import os
+from pathlib import Path
+import signal
+import time
+
+from covid19_scrapers.utils import UTILS_WEB_CACHE
+from covid19_scrapers.web_cache import WebCache
+
+
+_logger = logging.getLogger(__name__)
+
+# How often the parent checks on the child, in seconds.
+_POLL_INTERVAL = 1.0
+_PROC = Path('/proc')
+
+
+def get_process_group_rss(pgid):
+    """Return the total resident memory in bytes of the processes in
+    the process group, or None if this cannot be determined on this
+    platform.
+
+    This counts the whole group, since Chrome, chromedriver and
+    tabula's JVM run as subprocesses of the scraper.
+    """
+    if not _PROC.is_dir():
+        return None
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    total = 0
+    for stat in _PROC.glob('[0-9]*/stat'):
+        try:
+            # The command name can contain spaces and parens, so
+            # split the remaining fields after its closing paren.
+            fields = stat.read_text().rsplit(')', 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        # These are fields 5 (pgrp) and 24 (rss) in proc(5).
+        if int(fields[2]) == pgid:
+            total += int(fields[21]) * page_size
+    return total
+
+
+def _kill_process_group(pgid):
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _child_main(conn, cwd, web_cache_state, scraper, kwargs):
+    """Entry point for the child process: run the scraper and send its
+    results back to the parent.
+    """
+    # Lead a new process group, so the parent can kill the scraper's
+    # browsers and JVMs along with it.
+    os.setpgrp()
+    os.chdir(cwd)
+    # Open our own connection, with the parent cache's settings.
+    web_cache = WebCache(**web_cache_state)
+    with UTILS_WEB_CACHE.with_instance(web_cache):
+        df = scraper.run(**kwargs)
+    web_cache.sessions.log_stats(scraper.name())
+    web_cache.sessions.close()
+    web_cache.close()
+    conn.send(df)
+    conn.close()
+
+
+def run_isolated(scraper, *, web_cache, cwd=None, timeout=None,
+                 memory_limit=None, **kwargs):
+    """Run the scraper in a child process, and return its results.
+
+    Keyword arguments:
+      scraper: the ScraperBase instance to run.
+      web_cache: the WebCache whose DB and settings the child should
+        use.
+      cwd: the directory the scraper's home_dir is relative to.
+        Defaults to the current working directory.
+      timeout: if set, the wall-clock limit in seconds for the child.
+      memory_limit: if set, the limit in bytes on the combined
+        resident memory of the child and its subprocesses. This is
+        only enforced where /proc is available.
+      kwargs: passed to `scraper.run`.
+
+    Raises TimeoutError or MemoryError if the child exceeded a limit
+    and was killed, or RuntimeError if it exited without returning
+    results.
+    """
+    name = scraper.name()
+    reader, writer = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(
+        target=_child_main,
+        args=(writer, cwd or os.getcwd(), web_cache.__getstate__(),
+              scraper, kwargs),
+        name=f'isolated-{scraper.__class__.__name__}',
+        daemon=True)
+    start = time.monotonic()
+    process.start()
+    # Close our copy of the write end, so we see EOF if the child
+    # dies.
+    writer.close()
+    _logger.info(f'Started isolated scraper {name}: pid={process.pid}')
+    try:
+        while not reader.poll(_POLL_INTERVAL):
+            elapsed = time.monotonic() - start
+            if timeout and elapsed > timeout:
+                raise TimeoutError(
+                    f'Isolated scraper {name} timed out after {elapsed:.0f}s')
+            if memory_limit:
+                rss = get_process_group_rss(process.pid)
+                if rss is not None and rss > memory_limit:
+                    raise MemoryError(
+                        f'Isolated scraper {name} exceeded memory limit: '
+                        f'{rss} > {memory_limit} bytes')
+        try:
+            df = reader.recv()
+        except EOFError:
+            process.join()
+            raise RuntimeError(
+                f'Isolated scraper {name} exited with code '
+                f'{process.exitcode} without returning results')
+        process.join()
+        _logger.info(f'Isolated scraper {name} finished in '
+                     f'{time.monotonic() - start:.1f}s')
+        return df
+    except Exception as e:
+        _logger.warning(f'Isolated scraper {name} failed: {e}')
+        raise
+    finally:
+        reader.close()
+        # Clean up the group even on success, in case the scraper
+        # leaked a browser.
+        _kill_process_group(process.pid)
+        if process.is_alive():
+            # The child may not have made its group yet.
+            process.kill()
+        process.join()
@@ -1,13 +1,31 @@
-from functools import reduce
+from concurrent.futures import (
+    FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait)
+from contextlib import ExitStack, closing
 import logging
+import os
 import pandas as pd
 
+from covid19_scrapers.isolation import run_isolated
 from covid19_scrapers.utils import UTILS_WEB_CACHE
 
 
 _logger = logging.getLogger(__name__)
 
 
+def _run_in_worker(web_cache, scraper, kwargs):
+    """Run a scraper in a worker process.
+
+    The WebCache arrives pickled, so the worker has its own connection
+    to the cache DB, and its own UTILS_WEB_CACHE scope.
+    """
+    with UTILS_WEB_CACHE.with_instance(web_cache):
+        df = scraper.run(**kwargs)
+    web_cache.sessions.log_stats(scraper.name())
+    web_cache.sessions.close()
+    web_cache.close()
+    return df
+
+
 class Registry(object):
     """A registry for scrapers.
 
@@ -16,7 +34,10 @@ class Registry(object):
     scrapers, and collecting their results.
     """
 
-    def __init__(self, *, web_cache, enable_beta_scrapers=False, **kwargs):
+    def __init__(self, *, web_cache, enable_beta_scrapers=False, jobs=1,
+                 isolate_scrapers=True, isolated_jobs=1,
+                 isolated_timeout=None, isolated_memory_limit=None,
+                 **kwargs):
         """Returns a Registry instance with all the per-state scrapers
         registered.
 
@@ -24,10 +45,34 @@ class Registry(object):
           web_cache: the WebCache instance to use for scraping.
           enable_beta_scrapers: optional, a bool indicating whether to
             include scrapers with the BETA_SCRAPER class variable set.
+          jobs: optional, the number of scrapers to run concurrently
+            in run_scrapers and run_all_scrapers.  If greater than 1,
+            scrapers run in a pool of that many worker processes,
+            since scrapers change the process's working directory.
+          isolate_scrapers: optional, a bool indicating whether to run
+            scrapers with the ISOLATED_SCRAPER class variable set
+            (those that start a browser or JVM) each in their own
+            child process, with the limits below.  Other scrapers run
+            as described for `jobs`.
+          isolated_jobs: optional, the number of isolated scrapers to
+            run concurrently.
+          isolated_timeout: optional, the wall-clock limit in seconds
+            for each isolated scraper.
+          isolated_memory_limit: optional, the limit in bytes on the
+            resident memory of each isolated scraper, including its
+            browser or JVM.
+
+        Isolated scrapers that exceed a limit are killed, and produce
+        an error row as if they had raised an exception.
 
         """
         self.enable_beta_scrapers = enable_beta_scrapers
         self.web_cache = web_cache
+        self.jobs = jobs
+        self.isolate_scrapers = isolate_scrapers
+        self.isolated_jobs = isolated_jobs
+        self.isolated_timeout = isolated_timeout
+        self.isolated_memory_limit = isolated_memory_limit
         self._scrapers = {}
 
     def register_scraper(self, instance):
@@ -57,34 +102,173 @@ class Registry(object):
                     _logger.warn(f'Running beta scraper: {scraper.name()}')
                 return scraper.run(**kwargs)
 
-    def run_scrapers(self, names, **kwargs):
-        """Return the results of running the specified scrapers, or an empty
-        Dataframe if no such scrapers are registered.
+    @staticmethod
+    def _get_result(scraper, future):
+        """Return the result of a future running the scraper, or an error
+        row if it failed.
         """
-        ret = []
-        for name in names:
-            df = self.run_scraper(name, **kwargs)
-            if df is not None:
-                ret.append(df)
-        if ret:
-            # Append the DFs in the list together, going from left
-            # to right.
-            return reduce((lambda df1, df2: df1.append(df2)), ret)
-        return pd.DataFrame()
+        try:
+            return future.result()
+        except Exception as e:
+            # Scrapers handle their own errors, so this is a failure
+            # in running the scraper, e.g. a crashed or killed worker.
+            return pd.DataFrame(scraper._handle_error(e))
 
-    def run_all_scrapers(self, **kwargs):
-        """Return the results of running all registered scrapers, or an empty
-        Dataframe if no scrapers are registered.
+    def _iter_run(self, scrapers, **kwargs):
+        """Generator for pairs of the index in `scrapers` and the results of
+        running that scraper, in the order the scrapers finish.
+
+        Isolated scrapers are started first, since they tend to be
+        the slowest, and run alongside the others.  If `self.jobs` is
+        greater than 1, the others run in a pool of worker processes;
+        otherwise they run one at a time in this process.
+
+        If the generator is closed before it is exhausted, scrapers
+        that have not started are cancelled, and it returns without
+        waiting for those still running, which finish in the
+        background.
         """
-        ret = []
-        with UTILS_WEB_CACHE.with_instance(self.web_cache):
+        executors = []
+        futures = {}
+        stopped = False
+
+        def shutdown():
+            for executor in executors:
+                executor.shutdown(wait=not stopped)
+
+        with ExitStack() as stack:
+            # Error rows for failed workers are made in this process,
+            # so we enter the web cache scope either way.
+            stack.enter_context(
+                UTILS_WEB_CACHE.with_instance(self.web_cache))
+            # The executors are not entered as contexts, since their
+            # exits wait for all their scrapers.
+            stack.callback(shutdown)
+            try:
+                isolated_executor = ThreadPoolExecutor(
+                    max_workers=self.isolated_jobs)
+                executors.append(isolated_executor)
+                # Isolated scrapers' home_dirs are relative to our cwd.
+                cwd = os.getcwd()
+                unisolated = []
+                for idx, scraper in enumerate(scrapers):
+                    if self.isolate_scrapers and scraper.is_isolated():
+                        future = isolated_executor.submit(
+                            run_isolated, scraper, web_cache=self.web_cache,
+                            cwd=cwd, timeout=self.isolated_timeout,
+                            memory_limit=self.isolated_memory_limit,
+                            **kwargs)
+                        futures[future] = idx
+                    else:
+                        unisolated.append(idx)
+                if futures:
+                    _logger.info(f'Running {len(futures)} isolated scrapers '
+                                 f'with {self.isolated_jobs} jobs')
+
+                if self.jobs > 1 and len(unisolated) > 1:
+                    _logger.info(f'Running {len(unisolated)} scrapers with '
+                                 f'{self.jobs} jobs')
+                    executor = ProcessPoolExecutor(max_workers=self.jobs)
+                    executors.append(executor)
+                    for idx in unisolated:
+                        future = executor.submit(
+                            _run_in_worker, self.web_cache, scrapers[idx],
+                            kwargs)
+                        futures[future] = idx
+                else:
+                    for idx in unisolated:
+                        yield idx, scrapers[idx].run(**kwargs)
+                        # Pass along any isolated scrapers that finished
+                        # meanwhile.
+                        for future in [f for f in futures if f.done()]:
+                            yield futures[future], self._get_result(
+                                scrapers[futures[future]], future)
+                            del futures[future]
+
+                while futures:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield futures[future], self._get_result(
+                            scrapers[futures[future]], future)
+                        del futures[future]
+            except GeneratorExit:
+                # The caller stopped early.  Futures are cancelled
+                # explicitly, as Python 3.8's shutdown cannot.
+                stopped = True
+                _logger.info(f'Stopped early; cancelling {len(futures)} '
+                             'unfinished scrapers')
+                for future in futures:
+                    future.cancel()
+                raise
+            # Workers log their own stats.
+            self.web_cache.sessions.log_stats('the registry process')
+
+    def _select_scrapers(self, names=None):
+        """Return a list of the registered scrapers with the specified names,
+        or all non-beta ones (unless enabled) if names is None.
+        """
+        scrapers = []
+        if names is None:
             for scraper in self._scrapers.values():
                 if scraper.is_beta() and not self.enable_beta_scrapers:
                     _logger.debug(f'Skipping beta scraper: {scraper.name()}')
                     continue
-                ret.append(scraper.run(**kwargs))
+                scrapers.append(scraper)
+        else:
+            for name in names:
+                scraper = self._scrapers.get(name)
+                if scraper:
+                    if scraper.is_beta() and not self.enable_beta_scrapers:
+                        _logger.warn(f'Running beta scraper: {scraper.name()}')
+                    scrapers.append(scraper)
+        return scrapers
+
+    def _collect(self, scrapers, **kwargs):
+        """Return a DataFrame of the results of running the scrapers, in the
+        same order as `scrapers`, or an empty DataFrame if there are
+        none.
+        """
+        ret = [None] * len(scrapers)
+        for idx, df in self._iter_run(scrapers, **kwargs):
+            ret[idx] = df
         if ret:
-            # Append the DFs in the list together, going from left
-            # to right.
-            return reduce((lambda df1, df2: df1.append(df2)), ret)
+            # Concatenate once at the end, rather than copying the
+            # accumulated rows for each scraper.
+            return pd.concat(ret)
         return pd.DataFrame()
+
+    def iter_results(self, names=None, **kwargs):
+        """Generator for pairs of scraper name and the results of running
+        that scraper, yielded as soon as each scraper finishes.  This
+        lets callers write out results incrementally.
+
+        A caller that stops early (e.g. breaks out of its loop, or
+        closes the generator) does not wait for the remaining
+        scrapers: those not yet started are cancelled, and those
+        still running finish in the background, isolated ones within
+        `isolated_timeout`.
+
+        Keyword arguments:
+          names: optional, an iterable of the names of the scrapers to
+            run.  If omitted, all registered scrapers are run, as in
+            run_all_scrapers.
+          kwargs: passed to each scraper's `run` method.
+
+        """
+        scrapers = self._select_scrapers(names)
+        # Close the inner generator as soon as this one is closed.
+        with closing(self._iter_run(scrapers, **kwargs)) as results:
+            for idx, df in results:
+                yield scrapers[idx].__class__.__name__, df
+
+    def run_scrapers(self, names, **kwargs):
+        """Return the results of running the specified scrapers, or an empty
+        Dataframe if no such scrapers are registered.
+        """
+        return self._collect(self._select_scrapers(names), **kwargs)
+
+    def run_all_scrapers(self, **kwargs):
+        """Return the results of running all registered scrapers, or an empty
+        Dataframe if no scrapers are registered.
+        """
+        return self._collect(self._select_scrapers(), **kwargs)
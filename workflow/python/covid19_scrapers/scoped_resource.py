@@ -1,4 +1,5 @@
 import logging
+import threading
 
 
 _logger = logging.getLogger(__name__)
@@ -23,14 +24,25 @@ class ScopedResource(object):
         with resource.with_instance(instance):
             use_resource()
 
+    The current instance is tracked per thread, so concurrent scopes
+    in different threads do not replace each other's instances.
+
     """
 
     def __init__(self, cls, *args, **kwargs):
         self.cls = cls
-        self.instance = None
+        self._local = threading.local()
         self.args = args
         self.kwargs = kwargs
 
+    @property
+    def instance(self):
+        return getattr(self._local, 'instance', None)
+
+    @instance.setter
+    def instance(self, instance):
+        self._local.instance = instance
+
     def __call__(self, *args, **kwargs):
         _logger.debug('Creating new instance: '
                       f'{self.cls.__name__}(*args={args}, **kwargs={kwargs})')
@@ -5,6 +5,7 @@ import pandas as pd
 
 from covid19_scrapers.dir_context import dir_context
 from covid19_scrapers.census import get_aa_pop_stats
+from covid19_scrapers.webdriver import recording
 
 
 ERROR = 'An error occurred.'
@@ -17,7 +18,8 @@ class ScraperBase(object):
     such as error handling.
     """
 
-    def __init__(self, *, home_dir, census_api, **kwargs):
+    def __init__(self, *, home_dir, census_api, webdriver_mode=recording.LIVE,
+                 **kwargs):
         """Arguments:
           home_dir: Pathlike to a directory that will contain any
             working files this scraper writes.  This includes any
@@ -29,9 +31,15 @@ class ScraperBase(object):
           start_date: start date for scraper output, or None.
           end_date: end date for scraper output.
 
+        Keyword arguments:
+          webdriver_mode: the mode for this scraper's WebdriverRunners:
+            'live', 'record' (to save their results in home_dir), or
+            'replay' (to load the saved results without a browser).
+
         """
         self.home_dir = home_dir
         self.census_api = census_api
+        self.webdriver_mode = webdriver_mode
         os.makedirs(str(home_dir), exist_ok=True)
 
     def name(self):
@@ -49,7 +57,8 @@ class ScraperBase(object):
         In case of exceptions, _handle_error is used to produce an error row.
         """
         # dir_context is a helper to change to the home_dir and back.
-        with dir_context(self.home_dir):
+        with dir_context(self.home_dir), \
+                recording.webdriver_mode(self.webdriver_mode):
             try:
                 _logger.info(f'Scraping {self.name()}')
                 rows = self._scrape(start_date=start_date, end_date=end_date,
@@ -62,6 +71,14 @@ class ScraperBase(object):
     def is_beta(cls):
         return getattr(cls, 'BETA_SCRAPER', False)
 
+    @classmethod
+    def is_isolated(cls):
+        """Returns whether the registry should run this scraper in its own
+        process.  Set the ISOLATED_SCRAPER class variable on scrapers
+        that start a browser or JVM.
+        """
+        return getattr(cls, 'ISOLATED_SCRAPER', False)
+
     def _get_aa_pop_stats(self):
         """This default will retrieve AA population stats for state
         scrapers. For city/county scrapers, you will need to override
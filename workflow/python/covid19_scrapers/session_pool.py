@@ -0,0 +1,128 @@
+# Shared HTTP sessions for the web cache.
+from http.cookiejar import DefaultCookiePolicy
+import logging
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+_logger = logging.getLogger(__name__)
+
+
+class SessionPool(object):
+    """Keeps one requests.Session per scheme and host, so requests to the
+    same server reuse kept-alive connections instead of each paying
+    for a new TCP and TLS handshake.
+
+    Pooled sessions do not store cookies from responses, so requests
+    behave as they would with a fresh session.  Cookies passed to a
+    request are still sent.
+
+    Keyword arguments:
+      pool_maxsize: the number of connections to keep open to each
+        host.
+      max_retries: how many times to retry failed connections, reads,
+        and responses with a status in `retry_statuses`, for
+        idempotent requests.
+      backoff_factor: the base in seconds of the exponential delay
+        between retries.
+      retry_statuses: the response status codes to retry.
+      timeout: the default (connect, read) timeout in seconds for
+        requests.
+
+    """
+
+    def __init__(self, *, pool_maxsize=10, max_retries=3,
+                 backoff_factor=0.5, retry_statuses=(429, 500, 502, 503, 504),
+                 timeout=(10.0, 120.0)):
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.retry_statuses = retry_statuses
+        self.timeout = timeout
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} hosts={len(self._sessions)}>'
+
+    def __getstate__(self):
+        # Sessions hold sockets, so a pickled pool starts empty.
+        return {
+            'pool_maxsize': self.pool_maxsize,
+            'max_retries': self.max_retries,
+            'backoff_factor': self.backoff_factor,
+            'retry_statuses': self.retry_statuses,
+            'timeout': self.timeout,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _make_session(self):
+        retry = Retry(total=self.max_retries,
+                      backoff_factor=self.backoff_factor,
+                      status_forcelist=self.retry_statuses,
+                      # Return the last response, so the caller's
+                      # raise_for_status reports it.
+                      raise_on_status=False)
+        # Each session only talks to one host, so it needs one
+        # connection pool per scheme.
+        adapter = HTTPAdapter(pool_connections=1,
+                              pool_maxsize=self.pool_maxsize,
+                              max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        return session
+
+    def get_session(self, url):
+        """Return the session for the URL's scheme and host."""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        session = self._sessions.get(key)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is None:
+                    _logger.debug(f'Creating session for {parts.netloc}')
+                    session = self._sessions[key] = self._make_session()
+        return session
+
+    def get_stats(self):
+        """Return a dict mapping each host to the number of requests sent
+        and connections opened to it.  Requests beyond the number of
+        connections reused a kept-alive connection.
+        """
+        stats = {}
+        for (_, host), session in list(self._sessions.items()):
+            host_stats = stats.setdefault(host,
+                                          {'requests': 0, 'connections': 0})
+            for adapter in set(session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for key in list(pools.keys()):
+                    pool = pools.get(key)
+                    if pool is not None:
+                        host_stats['requests'] += pool.num_requests
+                        host_stats['connections'] += pool.num_connections
+        return stats
+
+    def log_stats(self, label):
+        """Log the total requests and connections, for run stats."""
+        stats = self.get_stats()
+        requests_sent = sum(s['requests'] for s in stats.values())
+        connections = sum(s['connections'] for s in stats.values())
+        _logger.info(f'HTTP stats for {label}: {requests_sent} requests over '
+                     f'{connections} connections to {len(stats)} hosts')
+        _logger.debug(f'HTTP stats by host for {label}: {stats}')
+
+    def close(self):
+        """Close all sessions and their connections."""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
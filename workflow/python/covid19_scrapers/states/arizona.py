@@ -5,19 +5,19 @@ import pandas as pd
 
 from covid19_scrapers.scraper import ScraperBase
 from covid19_scrapers.utils import misc
-from covid19_scrapers.utils.tableau import TableauParser, find_tableau_request
-from covid19_scrapers.webdriver import WebdriverRunner, WebdriverSteps
+from covid19_scrapers.utils.tableau import get_parser
 
 
 class Arizona(ScraperBase):
     """Arizona data is extracted from two Tableau dashboards: cases and deaths.
 
     The way this is extracted is by going to each of the Tableau links.
-    When a request is made to the Tableau URL, several requests are made back and forth between the client and server.
-    One of the requests made will contain a giant blob that contains 2 pieces of data in json
+    When a Tableau view is loaded, several requests are made back and forth between the client and server.
+    The bootstrapSession request will return a giant blob that contains 2 pieces of data in json
 
     The data can then be extracted through a custom parser. From there the needed data can be extracted.
     """
+    ISOLATED_SCRAPER = True
     CASES_URL = 'https://tableau.azdhs.gov/views/COVID19Demographics/EpiData?:embed=y&:showVizHome=y'
     DEATHS_URL = 'https://tableau.azdhs.gov/views/COVID-19Deaths/Deaths?:embed=y&:showVizHome=y'
 
@@ -25,20 +25,8 @@ class Arizona(ScraperBase):
         super().__init__(**kwargs)
 
     def _scrape(self, **kwargs):
-        runner = WebdriverRunner()
-        cases_results = runner.run(
-            WebdriverSteps()
-            .go_to_url(self.CASES_URL)
-            .find_request(key='cases', find_by=find_tableau_request))
-
-        deaths_results = runner.run(
-            WebdriverSteps()
-            .go_to_url(self.DEATHS_URL)
-            .find_request(key='deaths', find_by=find_tableau_request))
-
-        assert cases_results.requests['cases'], 'No results found for `cases`'
-        resp_body = cases_results.requests['cases'].response.body.decode('utf8')
-        tableau_parser = TableauParser(resp_body)
+        tableau_parser = get_parser(
+            self.CASES_URL, keys=['Date Updated', 'Number of Cases', 'Race/Ethnicity Epi'])
 
         parsed_date = tableau_parser.extract_data_from_key('Date Updated')
         assert 'Date Updated' in parsed_date, 'Unable to parse date'
@@ -56,9 +44,7 @@ class Arizona(ScraperBase):
         aa_cases = parsed_race_eth_df.loc['Black, non-Hispanic']['AGG(RecordCount)']
         known_race_cases = cases - parsed_race_eth_df.loc['Unknown']['AGG(RecordCount)']
 
-        assert deaths_results.requests['deaths'], 'No results found for `deaths`'
-        resp_body = deaths_results.requests['deaths'].response.body.decode('utf8')
-        tableau_parser = TableauParser(resp_body)
+        tableau_parser = get_parser(self.DEATHS_URL, keys=['Number of deaths', 'Death Race/Ethnicity'])
         parsed_death_cases = tableau_parser.extract_data_from_key('Number of deaths')
         assert 'SUM(Death count)' in parsed_death_cases, 'Death count not found'
         assert len(parsed_death_cases['SUM(Death count)']) == 1, 'Parsing error might have occurred.'
@@ -1,3 +1,4 @@
+import asyncio
 import datetime
 import logging
 import re
@@ -7,7 +8,7 @@ from tabula import read_pdf
 
 from covid19_scrapers.census import get_aa_pop_stats
 from covid19_scrapers.scraper import ScraperBase
-from covid19_scrapers.utils.http import download_file
+from covid19_scrapers.utils.http import adownload_file
 from covid19_scrapers.utils.misc import (as_list, to_percentage)
 
 
@@ -20,6 +21,7 @@ class CaliforniaSanDiego(ScraperBase):
     combined race and ethnicity, with "Hispanic" as well as OMB race
     categories (which appear to only include non-Hispanic counts).
     """
+    ISOLATED_SCRAPER = True
 
     CASES_URL = 'https://www.sandiegocounty.gov/content/dam/sdc/hhsa/programs/phs/Epidemiology/COVID-19%20Race%20and%20Ethnicity%20Summary.pdf'
     DEATHS_URL = 'https://www.sandiegocounty.gov/content/dam/sdc/hhsa/programs/phs/Epidemiology/COVID-19%20Deaths%20by%20Demographics.pdf'
@@ -48,10 +50,13 @@ class CaliforniaSanDiego(ScraperBase):
             _logger.warning(f'X is "{x}": {e}')
             return 0
 
+    async def _download_files(self):
+        await asyncio.gather(adownload_file(self.CASES_URL, 'cases.pdf'),
+                             adownload_file(self.DEATHS_URL, 'deaths.pdf'))
+
     def _scrape(self, **kwargs):
         # Download the files
-        download_file(self.CASES_URL, 'cases.pdf')
-        download_file(self.DEATHS_URL, 'deaths.pdf')
+        asyncio.run(self._download_files())
 
         # Extract the date
         pdf = fitz.Document(filename='cases.pdf', filetype='pdf')
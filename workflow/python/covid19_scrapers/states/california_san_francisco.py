@@ -14,6 +14,7 @@ class CaliforniaSanFrancisco(ScraperBase):
     Request/Responses from PowerBI can be searched for and found such that
     the needed data can be extracted. This is done so with the `PowerBIParser` util
     """
+    ISOLATED_SCRAPER = True
     URL = 'https://app.powerbigov.us/view?r=eyJrIjoiMWEyYTRhYTAtMTdjYi00YTE1LWJiMTQtYTY3NmJmMjJhOThkIiwidCI6IjIyZDVjMmNmLWNlM2UtNDQzZC05YTdmLWRmY2MwMjMxZjczZiJ9'
 
     def __init__(self, **kwargs):
@@ -61,22 +62,22 @@ class CaliforniaSanFrancisco(ScraperBase):
 
         # Cases
         parser = powerbi.PowerBIParser(results.requests['cases_by_race'])
-        cases_by_race_df = parser.get_dataframe_by_key('Cases_Ethnicity').set_index('CountNonNull(Cases_Ethnicity.Total Cases)')
-        cases = cases_by_race_df['Cases_Ethnicity.raceethnicity'].sum()
-        aa_cases = cases_by_race_df.loc['Black or African American']['Cases_Ethnicity.raceethnicity']
-        known_cases = cases - cases_by_race_df.loc['Unknown']['Cases_Ethnicity.raceethnicity']
+        cases_by_race_df = parser.get_dataframe_by_key('Cases_Ethnicity').set_index('Cases_Ethnicity.raceethnicity')
+        cases = cases_by_race_df['CountNonNull(Cases_Ethnicity.Total Cases)1'].sum()
+        aa_cases = cases_by_race_df.loc['Black or African American']['CountNonNull(Cases_Ethnicity.Total Cases)1']
+        known_cases = cases - cases_by_race_df.loc['Unknown']['CountNonNull(Cases_Ethnicity.Total Cases)1']
         pct_aa_cases = misc.to_percentage(aa_cases, known_cases)
 
         # Deaths
         parser = powerbi.PowerBIParser(results.requests['deaths_by_race'])
         deaths_by_race_df = (parser.get_dataframe_by_key(key='Deaths_Ethnicity')
-                             .set_index('Sum(Deaths_Ethnicity.Total Cases)'))
-        deaths = deaths_by_race_df['Deaths_Ethnicity.raceethnicity'].sum()
-        aa_deaths = deaths_by_race_df.loc['Black or African American']['Deaths_Ethnicity.raceethnicity']
+                             .set_index('Deaths_Ethnicity.raceethnicity'))
+        deaths = deaths_by_race_df['Sum(Deaths_Ethnicity.Total Cases)'].sum()
+        aa_deaths = deaths_by_race_df.loc['Black or African American']['Sum(Deaths_Ethnicity.Total Cases)']
         # if there are no unknown deaths, it will not appear in the dataframe.
         known_deaths = deaths
         if 'Unknown' in deaths_by_race_df.index:
-            known_deaths -= deaths_by_race_df.loc['Unknown']['Deaths_Ethnicity.raceethnicity']
+            known_deaths -= deaths_by_race_df.loc['Unknown']['Sum(Deaths_Ethnicity.Total Cases)']
         pct_aa_deaths = misc.to_percentage(aa_deaths, known_deaths)
 
         return [self._make_series(
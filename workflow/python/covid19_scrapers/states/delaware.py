@@ -20,6 +20,7 @@ class Delaware(ScraperBase):
     After submitting the acceptable use agreement, the browser will redirect to:
     'https://myhealthycommunity.dhss.delaware.gov/locations/state' which is where the dashboard lives.
     '''
+    ISOLATED_SCRAPER = True
 
     ACCEPTABLE_USE_URL = 'https://myhealthycommunity.dhss.delaware.gov/about/acceptable-use'
 
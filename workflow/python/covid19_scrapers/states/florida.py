@@ -122,6 +122,7 @@ class Florida(ScraperBase):
     whether we can load it in a streaming fashion, eg if there is a
     streaming parser for linearized PDFs in python.
     """
+    ISOLATED_SCRAPER = True
 
     REPORTING_URL = 'https://floridadisaster.org/covid19/'
 
@@ -104,6 +104,9 @@ def _make_florida_county_scraper(
             )]
 
     FloridaCounty.__name__ = f'Florida{camel_case_name}'
+    # Match the module-level name so instances can be pickled for
+    # parallel runs.
+    FloridaCounty.__qualname__ = FloridaCounty.__name__
     return FloridaCounty
 
 
@@ -16,6 +16,7 @@ class Hawaii(ScraperBase):
 
     At the time of implementation, Hawaii does not report deaths by race data.
     """
+    ISOLATED_SCRAPER = True
     SUMMARY_QUERY = dict(
         flc_id='20126c66ea9c479f9a4279722f418f05',
         layer_name='covid_county_counts',
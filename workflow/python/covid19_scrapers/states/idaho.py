@@ -14,6 +14,7 @@ class Idaho(ScraperBase):
     Separate requests are then made out to the individual Tableau dashboards
     where the demographic data is obtained.
     """
+    ISOLATED_SCRAPER = True
     HOME_PAGE_URL = 'https://coronavirus.idaho.gov/'
     DEMOGRAPHIC_CASES_URL = 'https://public.tableau.com/profile/idaho.division.of.public.health#!/vizhome/DPHIdahoCOVID-19Dashboard/Demographics'
     DEMOGRAPHIC_DEATHS_URL = 'https://public.tableau.com/profile/idaho.division.of.public.health#!/vizhome/DPHIdahoCOVID-19Dashboard/DeathDemographics'
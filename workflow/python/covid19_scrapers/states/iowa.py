@@ -17,6 +17,7 @@ class Iowa(ScraperBase):
     In each of those requests that returns dashboard data, there is a "card" number associated with each that does not change.
     By collecting the requests that are associated with the card number, the data from the requests can be extracted and parsed
     """
+    ISOLATED_SCRAPER = True
     CASES_DASHBOARD_URL = 'https://public.domo.com/embed/pages/aQVpq'
     CASES_CARD_PATH = 'cards/1232797918'
     AA_CASES_CARD_PATH = 'cards/1598583432'
@@ -42,21 +43,19 @@ class Iowa(ScraperBase):
 
     def _scrape(self, **kwargs):
         runner = WebdriverRunner()
-        cases_results = runner.run(
+        cases_results, deaths_results = runner.run_all([
             WebdriverSteps()
             .go_to_url(self.CASES_DASHBOARD_URL)
             .wait_for_number_of_elements((By.XPATH, "//div[@class='badge-content-shield']"), 10)
             .wait_for_presence_of_elements((By.XPATH, '//summary-number'))
             .find_request(key='cases', find_by=lambda r: self.CASES_CARD_PATH in r.path)
             .find_request(key='cases_by_race', find_by=lambda r: self.AA_CASES_CARD_PATH in r.path)
-            .get_page_source())
-
-        deaths_results = runner.run(
+            .get_page_source(),
             WebdriverSteps()
             .go_to_url(self.DEATHS_DASHBOARD_URL)
             .wait_for_number_of_elements((By.XPATH, "//div[@class='kpi_chart']"), 14)
             .find_request(key='deaths', find_by=lambda r: self.DEATHS_CARD_PATH in r.path)
-            .find_request(key='deaths_by_race', find_by=lambda r: self.AA_DEATHS_CARD_PATH in r.path))
+            .find_request(key='deaths_by_race', find_by=lambda r: self.AA_DEATHS_CARD_PATH in r.path)])
 
         date = self.get_date(cases_results.page_source)
 
@@ -7,7 +7,7 @@ from selenium.webdriver.common.by import By
 
 from covid19_scrapers.scraper import ScraperBase
 from covid19_scrapers.utils import misc, parse
-from covid19_scrapers.utils.tableau import TableauParser, find_tableau_request
+from covid19_scrapers.utils.tableau import get_parser
 from covid19_scrapers.webdriver import WebdriverRunner, WebdriverSteps
 
 
@@ -20,6 +20,7 @@ class Kansas(ScraperBase):
 
     The data can then be extracted through a custom parser. From there the needed data can be extracted.
     """
+    ISOLATED_SCRAPER = True
     SUMMARY_URL = 'https://public.tableau.com/views/COVID-19TableauVersion2/COVID-19Overview?:embed=y&:showVizHome=no'
     RACE_CASES_URL = 'https://public.tableau.com/views/COVID-19TableauVersion2/CaseCharacteristics?%3Aembed=y&%3AshowVizHome=no'
     RACE_DEATHS_URL = 'https://public.tableau.com/views/COVID-19TableauVersion2/DeathSummary?%3Aembed=y&%3AshowVizHome=no'
@@ -61,28 +62,16 @@ class Kansas(ScraperBase):
         date = self.get_date(cases_results.page_source)
 
         # Cases for Race
-        cases_by_race_results = runner.run(
-            WebdriverSteps()
-            .go_to_url(self.RACE_CASES_URL)
-            .find_request('race_cases', find_by=find_tableau_request))
-
-        assert cases_by_race_results.requests['race_cases'], 'No results for race_cases found'
-        resp_body = cases_by_race_results.requests['race_cases'].response.body.decode('utf8')
-        cases_for_race_json = TableauParser(resp_body).extract_data_from_key(key='Rates by Race for All Cases')
+        parser = get_parser(self.RACE_CASES_URL, keys=['Rates by Race for All Cases'])
+        cases_for_race_json = parser.extract_data_from_key(key='Rates by Race for All Cases')
         cases_df = self.to_df(cases_for_race_json)
         cases = cases_df['Measure Values'].sum()
         known_race_cases = cases_df.drop('Not Reported/Missing')['Measure Values'].sum()
         aa_cases = cases_df.loc['Black or African American', 'Measure Values'].sum()
 
         # Deaths for Race
-        deaths_by_race_results = runner.run(
-            WebdriverSteps()
-            .go_to_url(self.RACE_DEATHS_URL)
-            .find_request('race_deaths', find_by=find_tableau_request))
-
-        assert deaths_by_race_results.requests['race_deaths'], 'No results for race_deaths found'
-        resp_body = deaths_by_race_results.requests['race_deaths'].response.body.decode('utf8')
-        deaths_for_race_json = TableauParser(resp_body).extract_data_from_key(key='Mortality by Race')
+        parser = get_parser(self.RACE_DEATHS_URL, keys=['Mortality by Race'])
+        deaths_for_race_json = parser.extract_data_from_key(key='Mortality by Race')
         deaths_df = self.to_df(deaths_for_race_json)
         deaths = deaths_df['Measure Values'].sum()
         known_race_deaths = deaths_df.drop('Not Reported/Missing')['Measure Values'].sum()
@@ -36,6 +36,7 @@ class Kentucky(ScraperBase):
 
     We use these to compute approximate Black/AA case/death counts.
     """
+    ISOLATED_SCRAPER = True
 
     REPORT_URL = 'https://chfs.ky.gov/agencies/dph/covid19/COVID19DailyReport.pdf'
     REPORT_DATE_TEMPLATE = 'https://chfs.ky.gov/cvdaily/COVID19DailyReport{mm}{dd}.pdf'
@@ -15,6 +15,7 @@ _logger = logging.getLogger(__name__)
 
 
 class Maryland(ScraperBase):
+    ISOLATED_SCRAPER = True
     DATA_URL = 'https://coronavirus.maryland.gov'
 
     def __init__(self, **kwargs):
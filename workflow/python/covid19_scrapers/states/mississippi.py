@@ -21,6 +21,7 @@ class Mississippi(ScraperBase):
     the latest PDF URL, and extract the tables from it.
 
     """
+    ISOLATED_SCRAPER = True
     REPORTING_URL = 'https://msdh.ms.gov/msdhsite/_static/14,0,420,884.html'
 
     def __init__(self, **kwargs):
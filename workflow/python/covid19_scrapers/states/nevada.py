@@ -13,6 +13,7 @@ class Nevada(ScraperBase):
 
     We use the webdriver to go to the individual pages, parse the necessary responses with the PowerBIScraper and extract the results.
     """
+    ISOLATED_SCRAPER = True
     URL = 'https://app.powerbigov.us/view?r=eyJrIjoiMjA2ZThiOWUtM2FlNS00MGY5LWFmYjUtNmQwNTQ3Nzg5N2I2IiwidCI6ImU0YTM0MGU2LWI4OWUtNGU2OC04ZWFhLTE1NDRkMjcwMzk4MCJ9'
 
     @property
@@ -18,6 +18,7 @@ class NewHampshire(ScraperBase):
 
     The data can then be extracted through a custom parser. From there the needed data can be extracted.
     """
+    ISOLATED_SCRAPER = True
     URL = 'https://nh.gov/t/DHHS/views/COVID-19Dashboard/Summary?%3Aembed=y'
 
     def __init__(self, **kwargs):
@@ -6,7 +6,6 @@ import pydash
 
 from covid19_scrapers.scraper import ScraperBase
 from covid19_scrapers.utils import misc, parse, tableau
-from covid19_scrapers.webdriver import WebdriverRunner, WebdriverSteps
 
 
 class NewYork(ScraperBase):
@@ -16,6 +15,7 @@ class NewYork(ScraperBase):
     The Fatality Race information however, only reports NY State excluding NYC.
     As a result, we need to pull NYC info seperately and add it to the information in NYS
     """
+    ISOLATED_SCRAPER = True
     SUMMARY_URL = 'https://covid19tracker.health.ny.gov/views/NYS-COVID19-Tracker/NYSDOHCOVID-19Tracker-TableView?%3Aembed=yes&%3Atoolbar=no&%3Atabs=n'
     DEATHS_URL = 'https://covid19tracker.health.ny.gov/views/NYS-COVID19-Tracker/NYSDOHCOVID-19Tracker-Fatalities?%3Aembed=yes&%3Atoolbar=no&%3Atabs=n'
     NYS_RACE_DEATHS_URL = 'https://covid19tracker.health.ny.gov/views/NYS-COVID19-Tracker/NYSDOHCOVID-19Tracker-FatalityDetail?%3Aembed=yes&%3Atoolbar=no&%3Atabs=n'
@@ -46,19 +46,7 @@ class NewYork(ScraperBase):
         return df
 
     def _scrape(self, **kwargs):
-        runner = WebdriverRunner()
-        results = runner.run(
-            WebdriverSteps()
-            .go_to_url(self.SUMMARY_URL)
-            .find_request('summary', find_by=tableau.find_tableau_request)
-            .clear_request_history()
-            .go_to_url(self.DEATHS_URL)
-            .find_request('deaths', find_by=tableau.find_tableau_request)
-            .clear_request_history()
-            .go_to_url(self.NYS_RACE_DEATHS_URL)
-            .find_request('race_deaths', find_by=tableau.find_tableau_request))
-
-        parser = tableau.TableauParser(request=results.requests['summary'])
+        parser = tableau.get_parser(self.SUMMARY_URL, keys=['DASHBOARD 1 DATE (2)', 'TABLE VIEW (LARGE)'])
         date_info = parser.extract_data_from_key('DASHBOARD 1 DATE (2)')
         date_str = pydash.get(date_info, 'MAX(Last_Reported_Test_Formatted).0')
         date = datetime.strptime(date_str, '%m/%d/%Y').date()
@@ -66,11 +54,11 @@ class NewYork(ScraperBase):
         cases_df = self.get_cases_df(parser.extract_data_from_key('TABLE VIEW (LARGE)'))
         cases = cases_df.loc['%all%']['Measure Values']
 
-        parser = tableau.TableauParser(request=results.requests['deaths'])
+        parser = tableau.get_parser(self.DEATHS_URL, keys=['Fatalaties by County'])
         deaths_df = self.get_deaths_df(parser.extract_data_from_key('Fatalaties by County'))
         deaths = deaths_df.loc['%all%']['Measure Values']
 
-        parser = tableau.TableauParser(request=results.requests['race_deaths'])
+        parser = tableau.get_parser(self.NYS_RACE_DEATHS_URL, keys=['Race/Ethnicity Table (2)'])
         nys_race_deaths_df = self.get_nys_race_deaths_df(parser.extract_data_from_key('Race/Ethnicity Table (2)'))
         nyc_race_deaths_df = pd.read_csv(self.NYC_RACE_DEATHS_URL).set_index('RACE_GROUP')
         aa_deaths = (nys_race_deaths_df.loc['Black']['Measure Values']
@@ -22,7 +22,8 @@ def get_demographic_dataframe():
     In order to scrape this data, several steps have to be done:
     1. Issue a request to the `BASE_URL.` Selenium is used here
        because multiple back and forth requests are needed to generate
-       a valid "session"
+       a valid "session", and the download page in step 3 is opened in
+       the same browser, which needs its cookies.
     2. After a valid session is generated, we scrape the X-Session-Id
        from the response headers.  Selenium-wire is used specifically
        used here because it allows for request/response inspection.
@@ -55,7 +56,9 @@ def get_demographic_dataframe():
     results = runner.run(
         WebdriverSteps()
         .go_to_url(DOWNLOAD_URL.format(session_id))
-        .wait_for_presence_of_elements([(By.XPATH, "//div[@id='tabBootErrTitle' and contains(text(),'Unexpected Error')]")])
+        # The first request fails by design, so this waits for the error marker.
+        .wait_for_presence_of_elements([(By.XPATH, "//div[@id='tabBootErrTitle' and contains(text(),'Unexpected Error')]")],
+                                       error_locators=[])
         .go_to_url(DOWNLOAD_URL.format(session_id))
         .wait_for_presence_of_elements([(By.CLASS_NAME, 'csvLink_summary')])
         .get_page_source())
@@ -82,6 +85,7 @@ class NorthCarolina(ScraperBase):
     The dashboard consists of information pertaining to demographics, which is scraped
     via the `get_demographic_dataframe` function in this file.
     """
+    ISOLATED_SCRAPER = True
     URL = 'https://covid19.ncdhhs.gov/'
 
     def __init__(self, **kwargs):
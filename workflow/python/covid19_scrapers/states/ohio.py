@@ -4,7 +4,6 @@ import pydash
 import pandas as pd
 
 from covid19_scrapers.scraper import ScraperBase
-from covid19_scrapers.webdriver import WebdriverRunner, WebdriverSteps
 from covid19_scrapers.utils import misc, tableau
 
 
@@ -14,6 +13,7 @@ class Ohio(ScraperBase):
     The first dashboard contains Total Cases, Total Deaths and cases by racial breakdown
     The second dashboard contains deaths by racial breakdown
     """
+    ISOLATED_SCRAPER = True
 
     CASES_URL = 'https://public.tableau.com/views/KeyMetrics_15859581976410/DashboardKeyMetrics?%3Aembed=y&%3AshowVizHome=no'
     DEATHS_URL = 'https://public.tableau.com/views/MortalityMetrics/DashboardMortalityMetrics?%3Aembed=y&%3AshowVizHome=no'
@@ -22,16 +22,8 @@ class Ohio(ScraperBase):
         super().__init__(**kwargs)
 
     def _scrape(self, **kwargs):
-        runner = WebdriverRunner()
-        results = runner.run(
-            WebdriverSteps()
-            .go_to_url(self.CASES_URL)
-            .find_request('cases', find_by=tableau.find_tableau_request)
-            .clear_request_history()
-            .go_to_url(self.DEATHS_URL)
-            .find_request('deaths', find_by=tableau.find_tableau_request))
-
-        parser = tableau.TableauParser(request=results.requests['cases'])
+        parser = tableau.get_parser(
+            self.CASES_URL, keys=['Footer', 'Total Cases', 'Total  Deaths', 'Race Breakdown '])
 
         date_str = pydash.head(parser.extract_data_from_key('Footer')['AGG(Today)'])
         date = datetime.strptime(date_str, '%m-%d-%y').date()
@@ -43,7 +35,7 @@ class Ohio(ScraperBase):
         aa_cases = cases_df.loc['Black']['Count']
         known_race_cases = cases - cases_df.loc['Unknown']['Count']
 
-        parser = tableau.TableauParser(request=results.requests['deaths'])
+        parser = tableau.get_parser(self.DEATHS_URL, keys=['Bar | Race'])
         deaths_pct_df = pd.DataFrame.from_dict(parser.extract_data_from_key('Bar | Race')).set_index('Race')
         deaths_df = deaths_pct_df.assign(Count=[round(v * deaths) for v in deaths_pct_df['SUM(Death Count)'].values])
         aa_deaths = deaths_df.loc['Black']['Count']
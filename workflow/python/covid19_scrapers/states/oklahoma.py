@@ -13,6 +13,7 @@ class Oklahoma(ScraperBase):
     The COVID-19 datasets are at
     https://coronavirus.health.ok.gov/
     """
+    ISOLATED_SCRAPER = True
 
     OVERALL_DASHBOARD = 'https://looker-dashboards.ok.gov/embed/dashboards-next/40'
     CASES_DASHBOARD_OK = 'https://looker-dashboards.ok.gov/embed/dashboards/75'
@@ -23,34 +24,21 @@ class Oklahoma(ScraperBase):
 
     def _scrape(self, **kwargs):
 
-        # Pulling date, total cases, and deaths.
+        # Pulling date, total cases, and deaths from the overall dashboard.
+        # OK demographic breakdowns have to be obtained through WebdriverRunner
+        # and by scraping the Looker dashboard. The dashboards are loaded at once.
         runner = WebdriverRunner()
-        cases_results_dashboard = runner.run(
+        cases_results_dashboard, cases_results, death_results = runner.run_all([
             WebdriverSteps()
-            .go_to_url(self.OVERALL_DASHBOARD)
+            .go_to_url(dashboard)
             .wait_for_presence_of_elements([(By.XPATH, "//a[@target='_self']")])
-            .get_page_source())
+            .get_page_source()
+            for dashboard in [self.OVERALL_DASHBOARD, self.CASES_DASHBOARD_OK, self.DEATH_DASHBOARD_OK]])
 
         date = cases_results_dashboard.page_source.find(text='OK Summary').findNext('a').text
         total_cases = int(cases_results_dashboard.page_source.find(text='OK Cases').findNext('a').text.replace(',', ''))
         total_deaths = int(cases_results_dashboard.page_source.find(text='OK Deaths').findNext('a').text.replace(',', ''))
 
-        # OK demographic breakdowns have to be obtained through WebdriverRunner
-        # and by scraping the Looker dashboard
-        runner = WebdriverRunner()
-        cases_results = runner.run(
-            WebdriverSteps()
-            .go_to_url(self.CASES_DASHBOARD_OK)
-            .wait_for_presence_of_elements([(By.XPATH, "//a[@target='_self']")])
-            .get_page_source())
-
-        runner = WebdriverRunner()
-        death_results = runner.run(
-            WebdriverSteps()
-            .go_to_url(self.DEATH_DASHBOARD_OK)
-            .wait_for_presence_of_elements([(By.XPATH, "//a[@target='_self']")])
-            .get_page_source())
-
         # Once we have the page source for both dashboard, I'm extracting the "tspan"
         # tags which include the percentages for black lives
         def _get_demographic_data(page):
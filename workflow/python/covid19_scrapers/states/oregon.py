@@ -6,7 +6,6 @@ from covid19_scrapers.scraper import ScraperBase
 from covid19_scrapers.utils import tableau
 from covid19_scrapers.utils.misc import to_percentage
 from covid19_scrapers.utils.parse import raw_string_to_int
-from covid19_scrapers.webdriver import WebdriverRunner, WebdriverSteps
 
 
 _logger = logging.getLogger(__name__)
@@ -15,22 +14,18 @@ _logger = logging.getLogger(__name__)
 class Oregon(ScraperBase):
     """Oregon data comes from a Tableau Dashboard
 
-    We search requests for the response, then parse using the TableauParser, and extract the needed data.
+    We fetch the dashboard's bootstrapSession response, then parse using the TableauParser, and extract the needed data.
     """
+    ISOLATED_SCRAPER = True
     URL = 'https://public.tableau.com/views/OregonCOVID-19CaseDemographicsandDiseaseSeverityStatewide-SummaryTable/DemographicDataSummaryTable?%3Aembed=y&%3AshowVizHome=no'
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
     def _scrape(self, **kwargs):
-        runner = WebdriverRunner()
-        results = runner.run(
-            WebdriverSteps()
-            .go_to_url(self.URL)
-            .find_request('summary', find_by=tableau.find_tableau_request))
-
-        parser = tableau.TableauParser(request=results.requests['summary'])
-        date_str = parser.get_dataframe_from_key('Date Stamp').loc[0]['Date Stamp']
+        parser = tableau.get_parser(self.URL, keys=[
+            'Date Stamp', 'Demographic Data - Hospitalizaton Status', 'Demographic Data - Death Status'])
+        date_str = parser.extract_data_from_key('Date Stamp')['Date Stamp'][0]
         match = re.search(r'\d{1,2}\/\d{1,2}\/\d{4}', date_str)
         date = datetime.strptime(match.group(), '%m/%d/%Y').date()
 
@@ -15,6 +15,7 @@ class SouthCarolina(ScraperBase):
 
     We search the request for the Tableau data, parse it and extract the needed info.
     """
+    ISOLATED_SCRAPER = True
     HOME_URL = 'https://www.scdhec.gov/infectious-diseases/viruses/coronavirus-disease-2019-covid-19/sc-demographic-data-covid-19'
     URL = 'https://public.tableau.com/views/EpiProfile/DemoStory?:embed=y&:showVizHome=no'
 
@@ -32,10 +33,8 @@ class SouthCarolina(ScraperBase):
     def _scrape(self, **kwargs):
         runner = WebdriverRunner()
 
-        results = runner.run(WebdriverSteps().go_to_url(self.HOME_URL).get_page_source())
-        date = self.parse_date(results.page_source)
-
-        results = runner.run(
+        home_results, results = runner.run_all([
+            WebdriverSteps().go_to_url(self.HOME_URL).get_page_source(),
             WebdriverSteps()
             .go_to_url(self.URL)
             .wait_for_number_of_elements((By.XPATH, '//canvas'), 32)
@@ -45,7 +44,8 @@ class SouthCarolina(ScraperBase):
             .click_on_last_element_found()
             .wait_for_number_of_elements((By.XPATH, "//span[contains(text(), 'Deaths')]"), 6)
             .find_request('deaths', find_by=lambda r: 'set-active-story-point' in r.path)
-        )
+        ])
+        date = self.parse_date(home_results.page_source)
 
         parser = tableau.TableauParser(request=results.requests['cases'])
         cases = pydash.head(parser.extract_data_from_key('Cases')['SUM(Number of Records)'])
@@ -13,6 +13,7 @@ class SouthDakota(ScraperBase):
 
     At the time of writing this, they currently do not report deaths by race.
     """
+    ISOLATED_SCRAPER = True
     URL = 'https://app.powerbigov.us/view?r=eyJrIjoiZWU2Mjc5NDgtMTNkMC00Nzc2LTk1NjktYWFjYzQyZjc5NjMxIiwidCI6IjcwYWY1NDdjLTY5YWItNDE2ZC1iNGE2LTU0M2I1Y2U1MmI5OSJ9&pageName=ReportSectionaa9a40163c6346cbafef'
 
     def __init__(self, **kwargs):
@@ -35,7 +36,7 @@ class SouthDakota(ScraperBase):
         )
         date = self.parse_date(results.page_source)
         parser = powerbi.PowerBIParser(results.requests['summary_cases'])
-        df = parser.get_dataframe_by_key('Custom Totals').set_index('Label')
+        df = parser.get_dataframe_by_key('Custom Totals').set_index('Custom Totals.Test Results')
         cases = df.loc['Total Positive Cases*']['Sum(Custom Totals.# of Cases)']
         deaths = df.loc['Deaths***']['Sum(Custom Totals.# of Cases)']
 
@@ -11,6 +11,7 @@ class WestVirginia(ScraperBase):
 
     At the time of writing this, deaths by race seems unavailable.
     """
+    ISOLATED_SCRAPER = True
     URL = 'https://app.powerbigov.us/view?r=eyJrIjoiNGNjNzRjNWEtMzViYi00ZmEwLWI3NzItZmEyYzc1MDQ0MmYyIiwidCI6IjhhMjZjZjAyLTQzNGEtNDMxZS04Y2FkLTdlYWVmOTdlZjQ4NCJ9'
 
     def __init__(self, **kwargs):
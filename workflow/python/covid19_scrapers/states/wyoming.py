@@ -5,7 +5,6 @@ import pydash
 
 from covid19_scrapers.scraper import ScraperBase
 from covid19_scrapers.utils import misc, tableau
-from covid19_scrapers.webdriver import WebdriverRunner, WebdriverSteps
 
 
 class Wyoming(ScraperBase):
@@ -13,6 +12,7 @@ class Wyoming(ScraperBase):
     The other dashboard contains the deaths and deaths for ethnicity data. We extract the data from the requests
     and parse it using the TableauParser.
     """
+    ISOLATED_SCRAPER = True
 
     CASES_URL = 'https://public.tableau.com/views/EpiCOVIDtest/Dashboard?:embed=y&:showVizHome=no'
     DEATHS_URL = 'https://public.tableau.com/views/EpiCOVIDtest/COVID-19RelatedDeaths?%3Aembed=y&%3AshowVizHome=no'
@@ -21,16 +21,7 @@ class Wyoming(ScraperBase):
         super().__init__(**kwargs)
 
     def _scrape(self, **kwargs):
-        runner = WebdriverRunner()
-        results = runner.run(
-            WebdriverSteps()
-            .go_to_url(self.CASES_URL)
-            .find_request('cases', find_by=tableau.find_tableau_request)
-            .clear_request_history()
-            .go_to_url(self.DEATHS_URL)
-            .find_request('deaths', find_by=tableau.find_tableau_request))
-
-        parser = tableau.TableauParser(request=results.requests['cases'])
+        parser = tableau.get_parser(self.CASES_URL, keys=['cases', 'raceth'])
         raw_date_str = pydash.head(parser.extract_data_from_key('cases')['ATTR(dateupdated)'])
         date = datetime.strptime(raw_date_str, '%m/%d/%Y').date()
 
@@ -39,7 +30,7 @@ class Wyoming(ScraperBase):
         aa_cases = cases_df.loc['Black']['SUM(count)']
         known_race_cases = cases - cases_df.loc['Unknown']['SUM(count)']
 
-        parser = tableau.TableauParser(request=results.requests['deaths'])
+        parser = tableau.get_parser(self.DEATHS_URL, keys=['death (2)', 'raceth (death)'])
         deaths = pydash.head(parser.extract_data_from_key('death (2)')['SUM(Deaths)'])
         deaths_df = pd.DataFrame.from_dict(parser.extract_data_from_key('raceth (death)')).set_index('subcategory')
         aa_deaths = deaths_df.loc['Black']['SUM(count)']
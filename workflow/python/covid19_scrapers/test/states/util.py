@@ -70,6 +70,9 @@ class MockWebdriverRunner(object):
             requests=self.requests,
             page_source=self.template)
 
+    def run_all(self, webdriver_steps_list, **kwargs):
+        return [self.run(webdriver_steps) for webdriver_steps in webdriver_steps_list]
+
 
 def mock_response(*, json_file=None, blob_file=None):
     assert bool(json_file) != bool(blob_file), 'Exactly one of `json_file` or `blob_file` should be passed in'
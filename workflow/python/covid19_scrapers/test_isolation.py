@@ -0,0 +1,38 @@
+from datetime import date
+import os
+
+import pytest
+
+from covid19_scrapers.isolation import get_process_group_rss, run_isolated
+from covid19_scrapers.test_registry import (
+    MockHangingScraper, MockIsolatedScraper)
+from covid19_scrapers.utils.testing import fake_webcache
+
+
+DATES = {
+    'start_date': None,
+    'end_date': date.today()
+}
+
+
+def test_process_group_rss():
+    assert get_process_group_rss(os.getpgrp()) > 0
+
+
+def test_run_isolated():
+    df = run_isolated(MockIsolatedScraper(), web_cache=fake_webcache()[0],
+                      **DATES)
+    assert df.shape[0] == 1
+    assert df.loc[0, 'Status code'] != f'pid {os.getpid()}'
+
+
+def test_run_isolated_timeout():
+    with pytest.raises(TimeoutError):
+        run_isolated(MockHangingScraper(), web_cache=fake_webcache()[0],
+                     timeout=1, **DATES)
+
+
+def test_run_isolated_memory_limit():
+    with pytest.raises(MemoryError):
+        run_isolated(MockHangingScraper(), web_cache=fake_webcache()[0],
+                     memory_limit=1, **DATES)
@@ -1,5 +1,7 @@
 from datetime import date
+import os
 from pathlib import Path
+import time
 
 from covid19_scrapers.registry import Registry
 from covid19_scrapers.scraper import ScraperBase
@@ -28,6 +30,28 @@ class MockScraperTwoSeries(ScraperBase):
         return [self._make_series(), self._make_series()]
 
 
+class MockIsolatedScraper(MockScraperOneSeries):
+    ISOLATED_SCRAPER = True
+
+    def _scrape(self, start_date, end_date):
+        return [self._make_series(status=f'pid {os.getpid()}')]
+
+
+class MockHangingScraper(MockScraperOneSeries):
+    ISOLATED_SCRAPER = True
+
+    def _scrape(self, start_date, end_date):
+        time.sleep(60)
+        return [self._make_series()]
+
+
+class MockCrashingScraper(MockScraperOneSeries):
+    ISOLATED_SCRAPER = True
+
+    def _scrape(self, start_date, end_date):
+        os._exit(1)
+
+
 class TestRegistry(object):
     DATES = {
         'start_date': None,
@@ -86,3 +110,95 @@ class TestRegistry(object):
 
         df = self.registry.run_all_scrapers(**self.DATES)
         assert df.shape[0] == 3
+
+    def test_iter_results(self):
+        self.registry.register_scraper(MockScraperOneSeries())
+        self.registry.register_scraper(MockScraperTwoSeries())
+
+        results = list(self.registry.iter_results(**self.DATES))
+        assert [name for name, _ in results] == ['MockScraperOneSeries',
+                                                 'MockScraperTwoSeries']
+        assert [df.shape[0] for _, df in results] == [1, 2]
+
+        results = list(self.registry.iter_results(['MockScraperTwoSeries'],
+                                                  **self.DATES))
+        assert [name for name, _ in results] == ['MockScraperTwoSeries']
+
+
+class TestParallelRegistry(object):
+    DATES = {
+        'start_date': None,
+        'end_date': date.today()
+    }
+
+    def setup(self):
+        self.registry = Registry(
+            web_cache=fake_webcache()[0], jobs=2)
+
+    def test_multi_registry(self):
+        self.registry.register_scraper(MockScraperTwoSeries())
+        self.registry.register_scraper(MockScraperOneSeries())
+
+        df = self.registry.run_scrapers(['MockScraperOneSeries',
+                                         'MockScraperTwoSeries'], **self.DATES)
+        assert list(df['Location']) == ['MockScraperOneSeries',
+                                        'MockScraperTwoSeries',
+                                        'MockScraperTwoSeries']
+
+        df = self.registry.run_all_scrapers(**self.DATES)
+        assert list(df['Location']) == ['MockScraperTwoSeries',
+                                        'MockScraperTwoSeries',
+                                        'MockScraperOneSeries']
+
+
+class TestIsolatedRegistry(object):
+    DATES = {
+        'start_date': None,
+        'end_date': date.today()
+    }
+
+    def setup(self):
+        self.registry = Registry(
+            web_cache=fake_webcache()[0], isolated_timeout=3)
+
+    def test_isolated_scraper(self):
+        self.registry.register_scraper(MockScraperOneSeries())
+        self.registry.register_scraper(MockIsolatedScraper())
+        df = self.registry.run_all_scrapers(**self.DATES)
+        assert list(df['Location']) == ['MockScraperOneSeries',
+                                        'MockIsolatedScraper']
+        assert df['Status code'].iloc[1] != f'pid {os.getpid()}'
+
+    def test_hanging_scraper(self):
+        self.registry.register_scraper(MockHangingScraper())
+        self.registry.register_scraper(MockScraperOneSeries())
+        start = time.monotonic()
+        df = self.registry.run_all_scrapers(**self.DATES)
+        assert time.monotonic() - start < 30
+        assert list(df['Location']) == ['MockHangingScraper',
+                                        'MockScraperOneSeries']
+        assert 'TimeoutError' in df['Status code'].iloc[0]
+
+    def test_crashing_scraper(self):
+        self.registry.register_scraper(MockCrashingScraper())
+        df = self.registry.run_all_scrapers(**self.DATES)
+        assert df.shape[0] == 1
+        assert 'exited with code 1' in df['Status code'].iloc[0]
+
+    def test_iter_results(self):
+        self.registry.register_scraper(MockHangingScraper())
+        self.registry.register_scraper(MockScraperOneSeries())
+        results = self.registry.iter_results(**self.DATES)
+        # The in-process scraper finishes first.
+        assert next(results)[0] == 'MockScraperOneSeries'
+        assert next(results)[0] == 'MockHangingScraper'
+
+    def test_iter_results_stopped_early(self):
+        self.registry.register_scraper(MockHangingScraper())
+        self.registry.register_scraper(MockScraperOneSeries())
+        results = self.registry.iter_results(**self.DATES)
+        assert next(results)[0] == 'MockScraperOneSeries'
+        # Closing the generator does not wait for the hanging scraper.
+        start = time.monotonic()
+        results.close()
+        assert time.monotonic() - start < 1
@@ -0,0 +1,64 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pickle
+import threading
+
+from covid19_scrapers.session_pool import SessionPool
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Statuses to return before succeeding, shared by all requests.
+    failures = []
+
+    def do_GET(self):
+        status = self.failures.pop() if self.failures else 200
+        body = b'Content'
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Set-Cookie', 'session=1')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestSessionPool(object):
+    def setup(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+        self.thread.start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}/'
+        self.pool = SessionPool(backoff_factor=0)
+
+    def teardown(self):
+        self.pool.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_reuses_connections(self):
+        session = self.pool.get_session(self.url)
+        for i in range(3):
+            assert session.get(self.url + str(i)).content == b'Content'
+        assert self.pool.get_session(self.url + 'other') is session
+        host = f'127.0.0.1:{self.server.server_port}'
+        assert self.pool.get_stats() == {
+            host: {'requests': 3, 'connections': 1}}
+
+    def test_retries_server_errors(self):
+        KeepAliveHandler.failures[:] = [503, 502]
+        r = self.pool.get_session(self.url).get(self.url)
+        assert r.status_code == 200
+        assert KeepAliveHandler.failures == []
+
+    def test_does_not_store_cookies(self):
+        session = self.pool.get_session(self.url)
+        session.get(self.url)
+        assert len(session.cookies) == 0
+
+    def test_pickle_starts_empty(self):
+        self.pool.get_session(self.url)
+        pool = pickle.loads(pickle.dumps(self.pool))
+        assert pool.get_stats() == {}
+        assert pool.timeout == self.pool.timeout
@@ -1,13 +1,28 @@
+import hashlib
+import json
 import os
+import pickle
+import shutil
 import sqlite3
+import threading
+import time
 
 import pytest
 import requests
 
-from covid19_scrapers.web_cache import WebCache
+from covid19_scrapers.dir_context import dir_context
+from covid19_scrapers.web_cache import (
+    CachedResponse, EvictionPolicy, WebCache)
 from covid19_scrapers.utils.testing import MockSession, fake_webcache
 
 
+def remove_db(db_name):
+    for suffix in ['', '-wal', '-shm']:
+        if os.path.exists(db_name + suffix):
+            os.remove(db_name + suffix)
+    shutil.rmtree(db_name.replace('.db', '.blobs'), ignore_errors=True)
+
+
 def test_webcache_delete_uncached_fails():
     webcache = WebCache(':memory:')
     with pytest.raises(sqlite3.DatabaseError):
@@ -66,7 +81,7 @@ def test_reset():
         webcache.conn.close()
         assert r3 is None
     finally:
-        os.remove('test.db')
+        remove_db('test.db')
 
 
 def test_webcache_fetch_nocache():
@@ -152,3 +167,369 @@ def test_webcache_fetch_uncached_cache_only():
     session.add_response(r)
     with pytest.raises(RuntimeError):
         webcache.fetch('http://fake/', cache_only=True)
+
+
+def test_webcache_pickle_reconnects():
+    try:
+        webcache = WebCache('test.db', reset=True)
+        r = requests.Response()
+        r.status_code = 200
+        r._content = b'Content'
+        r.headers['ETag'] = 'fake-etag'
+        webcache.cache_response('http://fake/', r, force_cache=True)
+
+        webcache2 = pickle.loads(pickle.dumps(webcache))
+        assert webcache2.conn is not webcache.conn
+        r2 = webcache2.get_cached_response('http://fake/')
+        webcache.conn.close()
+        webcache2.conn.close()
+        assert r2['response'].content == b'Content'
+    finally:
+        remove_db('test.db')
+
+
+def _make_etag_response(content=b'Content'):
+    r = requests.Response()
+    r.status_code = 200
+    r._content = content
+    r.headers['ETag'] = 'fake-etag'
+    return r
+
+
+def test_webcache_threads_share_file_db():
+    try:
+        webcache = WebCache('test.db', reset=True)
+        errors = []
+
+        def worker(n):
+            try:
+                for i in range(20):
+                    url = f'http://fake/{n}/{i}'
+                    webcache.cache_response(url, _make_etag_response(),
+                                            force_cache=True)
+                    assert webcache.get_cached_response(url) is not None
+                webcache.close()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(n,))
+                   for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        count = webcache.conn.execute(
+            'SELECT COUNT(*) FROM web_cache').fetchone()[0]
+        assert count == 8 * 20
+        mode = webcache.conn.execute('PRAGMA journal_mode').fetchone()[0]
+        assert mode == 'wal'
+        webcache.close()
+    finally:
+        remove_db('test.db')
+
+
+def test_webcache_threads_connect_inside_dir_context(tmp_path):
+    (tmp_path / 'scraper').mkdir()
+    with dir_context(tmp_path):
+        webcache = WebCache('test.db', reset=True)
+    errors = []
+
+    def worker():
+        try:
+            webcache.cache_response('http://fake/', _make_etag_response(),
+                                    force_cache=True)
+            webcache.close()
+        except Exception as e:
+            errors.append(e)
+
+    # The thread's first connection is opened in another directory.
+    with dir_context(tmp_path / 'scraper'):
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+    assert errors == []
+    assert not (tmp_path / 'scraper' / 'test.db').exists()
+    assert webcache.get_cached_response('http://fake/') is not None
+    webcache.close()
+
+
+def test_webcache_memory_db_shared_across_threads():
+    webcache = WebCache(':memory:')
+    webcache.cache_response('http://fake/', _make_etag_response(),
+                            force_cache=True)
+    found = []
+    thread = threading.Thread(
+        target=lambda: found.append(
+            webcache.get_cached_response('http://fake/')))
+    thread.start()
+    thread.join()
+    assert found[0] is not None
+
+
+def test_webcache_batch_defers_commit():
+    try:
+        webcache = WebCache('test.db', reset=True)
+        reader = WebCache('test.db')
+        with webcache.batch():
+            webcache.cache_response('http://fake/', _make_etag_response(),
+                                    force_cache=True)
+            assert reader.get_cached_response('http://fake/') is None
+        assert reader.get_cached_response('http://fake/') is not None
+        webcache.close()
+        reader.close()
+    finally:
+        remove_db('test.db')
+
+
+def test_webcache_commit_interval():
+    try:
+        webcache = WebCache('test.db', reset=True, commit_interval=3600)
+        reader = WebCache('test.db')
+        webcache.cache_response('http://fake/', _make_etag_response(),
+                                force_cache=True)
+        assert reader.get_cached_response('http://fake/') is None
+        webcache.flush()
+        assert reader.get_cached_response('http://fake/') is not None
+        webcache.close()
+        reader.close()
+    finally:
+        remove_db('test.db')
+
+
+def test_webcache_bodies_stored_as_blobs():
+    try:
+        webcache = WebCache('test.db', reset=True)
+        compressible = b'Content ' * 1000
+        incompressible = os.urandom(10000)
+        for url, content in [('http://fake/1', compressible),
+                             ('http://fake/2', compressible),
+                             ('http://fake/3', incompressible)]:
+            webcache.cache_response(url, _make_etag_response(content),
+                                    force_cache=True)
+        # Identical bodies are stored once.
+        blobs = sorted(p.name for p in webcache.blob_dir.glob('*/*'))
+        assert len(blobs) == 2
+        assert len([b for b in blobs if b.endswith('.gz')]) == 1
+        row = webcache.conn.execute('SELECT * FROM web_cache').fetchone()
+        assert len(row['response']) < len(compressible)
+
+        r = webcache.get_cached_response('http://fake/2')
+        assert r['response'].content == compressible
+        assert webcache.get_cached_body('http://fake/2') == compressible
+        body = webcache.get_cached_body('http://fake/3')
+        assert body[:] == incompressible
+        body.close()
+        assert webcache.get_cached_body('http://fake/4') is None
+        webcache.close()
+    finally:
+        remove_db('test.db')
+
+
+@pytest.mark.parametrize('blob_dir', [None, 'bodies'])
+def test_webcache_blobs_stored_inside_dir_context(tmp_path, blob_dir):
+    (tmp_path / 'work' / 'Scraper').mkdir(parents=True)
+    with dir_context(tmp_path):
+        webcache = WebCache('work/web_cache.db', reset=True,
+                            blob_dir=blob_dir)
+        with dir_context('work/Scraper'):
+            webcache.cache_response('http://fake/',
+                                    _make_etag_response(b'body'),
+                                    force_cache=True)
+        assert not (tmp_path / 'work' / 'Scraper' / 'work').exists()
+        assert not (tmp_path / 'work' / 'Scraper' / 'bodies').exists()
+        assert bytes(webcache.get_cached_body('http://fake/')) == b'body'
+        webcache.close()
+
+
+def test_webcache_touch_keeps_blob():
+    try:
+        webcache = WebCache('test.db', reset=True)
+        webcache.cache_response('http://fake/', _make_etag_response(),
+                                force_cache=True)
+        cached = webcache.get_cached_response('http://fake/')
+        webcache.touch_response('http://fake/', cached['response'],
+                                {'ETag': 'new-etag'})
+        r = webcache.get_cached_response('http://fake/')
+        assert r['response'].headers['ETag'] == 'new-etag'
+        assert r['response'].content == b'Content'
+        webcache.close()
+    finally:
+        remove_db('test.db')
+
+
+def test_webcache_drops_old_schema():
+    try:
+        conn = sqlite3.connect('test.db')
+        conn.execute('CREATE TABLE web_cache (url TEXT PRIMARY KEY, '
+                     'etag TEXT, last_modified TEXT, response BLOB NOT NULL)')
+        conn.commit()
+        conn.close()
+        webcache = WebCache('test.db')
+        webcache.cache_response('http://fake/', _make_etag_response(),
+                                force_cache=True)
+        assert webcache.get_cached_response('http://fake/') is not None
+        webcache.close()
+    finally:
+        remove_db('test.db')
+
+
+def _cache_urls(webcache, urls, content=b'Content'):
+    for url in urls:
+        webcache.cache_response(url, _make_etag_response(content),
+                                force_cache=True)
+
+
+def _cached_urls(webcache):
+    return set(row['url'] for row in webcache.conn.execute(
+        'SELECT url FROM web_cache'))
+
+
+def test_webcache_stats():
+    webcache = WebCache(':memory:')
+    _cache_urls(webcache, ['http://a/1', 'http://a/2', 'http://b/1'])
+    stats = webcache.get_stats()
+    assert stats['entries'] == 3
+    assert stats['hosts']['a']['entries'] == 2
+    assert stats['hosts']['b']['entries'] == 1
+    assert stats['bytes'] == sum(h['bytes'] for h in stats['hosts'].values())
+
+
+def test_webcache_gc_max_age():
+    webcache = WebCache(':memory:')
+    _cache_urls(webcache, ['http://a/old', 'http://a/new'])
+    webcache.conn.execute(
+        'UPDATE web_cache SET cached_at = ? WHERE url = ?',
+        (time.time() - 7200, 'http://a/old'))
+    stats = webcache.collect_garbage(EvictionPolicy(max_age=3600))
+    assert stats['entries'] == 1
+    assert _cached_urls(webcache) == {'http://a/new'}
+
+
+def test_webcache_gc_evicts_least_recently_used():
+    webcache = WebCache(':memory:')
+    urls = [f'http://a/{i}' for i in range(4)]
+    _cache_urls(webcache, urls)
+    for i, url in enumerate(urls):
+        webcache.conn.execute(
+            'UPDATE web_cache SET accessed_at = ? WHERE url = ?', (i, url))
+    size = webcache.get_stats()['bytes'] // 4
+    webcache.collect_garbage(EvictionPolicy(max_bytes=2 * size))
+    assert _cached_urls(webcache) == {'http://a/2', 'http://a/3'}
+
+    # Reading an entry makes it the most recently used.
+    webcache.get_cached_response('http://a/2')
+    webcache.collect_garbage(EvictionPolicy(max_bytes=size))
+    assert _cached_urls(webcache) == {'http://a/2'}
+
+
+def test_webcache_gc_per_host():
+    webcache = WebCache(':memory:')
+    _cache_urls(webcache, ['http://a/1', 'http://a/2', 'http://b/1',
+                           'http://b/2'])
+    size = webcache.get_stats()['bytes'] // 4
+    webcache.collect_garbage(EvictionPolicy(max_host_bytes={'a': size}))
+    stats = webcache.get_stats()
+    assert stats['hosts']['a']['entries'] == 1
+    assert stats['hosts']['b']['entries'] == 2
+
+    webcache.collect_garbage(EvictionPolicy(max_host_bytes=size))
+    assert webcache.get_stats()['hosts']['b']['entries'] == 1
+
+
+def test_webcache_gc_deletes_orphaned_blobs():
+    try:
+        webcache = WebCache('test.db', reset=True)
+        _cache_urls(webcache, ['http://a/1'], b'one')
+        _cache_urls(webcache, ['http://a/2', 'http://a/3'], b'two')
+        webcache.delete_from_cache('url IN (?, ?)',
+                                   ('http://a/1', 'http://a/2'))
+        # Recently stored bodies are kept.
+        assert webcache.collect_garbage()['blobs'] == 0
+        webcache.ORPHAN_GRACE_PERIOD = -1
+        assert webcache.collect_garbage(vacuum=True)['blobs'] == 1
+        assert len(list(webcache.blob_dir.glob('*/*'))) == 1
+        assert webcache.get_cached_response(
+            'http://a/3')['response'].content == b'two'
+        webcache.close()
+    finally:
+        remove_db('test.db')
+
+
+def test_webcache_gc_runs_automatically():
+    webcache = WebCache(':memory:', eviction_policy=EvictionPolicy(
+        max_bytes=0, interval=0))
+    _cache_urls(webcache, ['http://a/1'])
+    assert webcache.get_stats()['entries'] == 0
+
+
+def test_webcache_cached_body_loaded_lazily():
+    webcache = WebCache(':memory:')
+    r = _make_etag_response(b'{"a": 1}')
+    r.headers['Last-Modified'] = 'Mon, 01 Jun 2020 00:00:00 GMT'
+    webcache.cache_response('http://fake/', r, force_cache=True)
+    loads = []
+    blobs_get = webcache.blobs.get
+    webcache.blobs.get = lambda digest: loads.append(digest) or blobs_get(
+        digest)
+
+    cached = webcache.get_cached_response('http://fake/')['response']
+    assert isinstance(cached, CachedResponse)
+    assert cached.headers['last-modified'] == r.headers['Last-Modified']
+    assert cached.status_code == 200
+    assert loads == []
+    assert cached.json() == {'a': 1}
+    assert cached.text == '{"a": 1}'
+    assert b''.join(cached.iter_content(2)) == b'{"a": 1}'
+    assert len(loads) == 1
+
+
+def test_webcache_metadata_is_versioned_json():
+    webcache = WebCache(':memory:')
+    webcache.cache_response('http://fake/', _make_etag_response(),
+                            force_cache=True)
+    meta = json.loads(webcache._get_row('http://fake/')['response'])
+    assert meta['version'] == 1
+    assert ['ETag', 'fake-etag'] in meta['headers']
+
+    meta['version'] = 0
+    webcache.conn.execute('UPDATE web_cache SET response = ?',
+                          (json.dumps(meta),))
+    assert webcache.get_cached_response('http://fake/') is None
+
+
+def test_webcache_fetch_to_file(tmp_path):
+    try:
+        webcache = WebCache('test.db', reset=True)
+        session = MockSession()
+        content = b'Content ' * 100000
+        r = session.make_response(content=content)
+        r.headers['ETag'] = 'fake-etag'
+        session.add_response(r)
+
+        resp = webcache.fetch('http://fake/file.pdf', session=session,
+                              to_file=tmp_path / 'file.pdf')
+        assert (tmp_path / 'file.pdf').read_bytes() == content
+        assert resp.body_digest == hashlib.sha256(content).hexdigest()
+        assert list(tmp_path.iterdir()) == [tmp_path / 'file.pdf']
+        # The body was stored compressed.
+        assert list(webcache.blob_dir.glob('*/*.gz'))
+
+        resp = webcache.fetch('http://fake/file.pdf', session=session,
+                              cache_only=True, to_file=tmp_path / 'copy.pdf')
+        assert isinstance(resp, CachedResponse)
+        assert resp.body_digest == hashlib.sha256(content).hexdigest()
+        assert '_body' not in resp.__dict__ or resp.__dict__['_body'] is None
+        assert (tmp_path / 'copy.pdf').read_bytes() == content
+        webcache.close()
+    finally:
+        remove_db('test.db')
+
+
+def test_webcache_fetch_to_file_failure_keeps_file(tmp_path):
+    webcache, session = fake_webcache()
+    (tmp_path / 'file.pdf').write_bytes(b'old')
+    session.add_response(status_code=404)
+    with pytest.raises(requests.HTTPError):
+        webcache.fetch('http://fake/file.pdf', to_file=tmp_path / 'file.pdf')
+    assert (tmp_path / 'file.pdf').read_bytes() == b'old'
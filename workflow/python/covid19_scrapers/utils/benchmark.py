@@ -0,0 +1,244 @@
+"""Offline benchmarks for the Tableau and PowerBI response parsers.
+
+The benchmarks parse synthetic responses shaped like large real ones
+(many worksheets, large data dictionaries, many DM0 rows), so they run
+without network access. Each run's results are appended to a JSON lines
+file, and compared with the previous run's, to make regressions in the
+parsers visible.
+"""
+
+from collections import namedtuple
+import datetime
+import json
+import logging
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+
+from covid19_scrapers.utils.powerbi import PowerBIParser
+from covid19_scrapers.utils.tableau import TableauParser
+
+
+_logger = logging.getLogger(__name__)
+
+
+# The result of a benchmark: the best time in seconds of its runs, and
+# the peak memory in bytes allocated during one run.
+BenchmarkResult = namedtuple('BenchmarkResult',
+                             ['name', 'params', 'seconds', 'peak_bytes'])
+
+
+def _frame(data):
+    text = json.dumps(data)
+    return f'{len(text)};{text}'
+
+
+def make_tableau_blob(num_worksheets=50, num_rows=2000, num_values=20000,
+                      seed=0):
+    """Returns a synthetic bootstrapSession blob, in the format
+    TableauParser handles as v1, whose worksheets are keyed 'Sheet <n>'.
+
+    Arguments:
+      num_worksheets: the number of worksheets (keys) in the dashboard.
+      num_rows: the number of marks in each worksheet.
+      num_values: the number of values of each data type in the data
+        dictionary, which the worksheets' alias indices refer to.
+      seed: the seed for the random values and indices.
+    """
+    rng = np.random.RandomState(seed)
+    dates = [str(datetime.date(2020, 3, 1) + datetime.timedelta(days=i))
+             for i in range(num_values // 10)]
+    data_columns = [
+        {'dataType': 'cstring',
+         'dataValues': [f'County {i}' for i in range(num_values)] + dates},
+        {'dataType': 'integer',
+         'dataValues': rng.randint(0, 100000, num_values).tolist()},
+        {'dataType': 'real',
+         'dataValues': rng.random_sample(num_values).round(6).tolist()},
+    ]
+    fields = [
+        ('County', 'dimension', 'cstring', 0, num_values),
+        ('Day', 'dimension', 'date', num_values, num_values + len(dates)),
+        ('SUM(Cases)', 'measure', 'integer', 0, num_values),
+        ('AGG(Rate)', 'measure', 'real', 0, num_values),
+    ]
+    sections = {}
+    for n in range(num_worksheets):
+        columns = [{'fieldCaption': caption, 'fieldRole': role,
+                    'dataType': data_type}
+                   for caption, role, data_type, _, _ in fields]
+        pane_columns = [{'aliasIndices': rng.randint(low, high,
+                                                     num_rows).tolist()}
+                        for _, _, _, low, high in fields]
+        sections[f'Sheet {n}'] = {'presModelHolder': {'genVizDataPresModel': {
+            'paneColumnsData': {
+                'vizDataColumns': columns,
+                'paneColumnsList': [{'vizPaneColumns': pane_columns}],
+            }}}}
+    info = {'sheetName': 'Dashboard', 'worldUpdate': {}}
+    data = {'secondaryInfo': {'presModelMap': {
+        'vizData': {'presModelHolder': {'genPresModelMapPresModel': {
+            'presModelMap': sections}}},
+        'dataDictionary': {'presModelHolder': {'genDataDictionaryPresModel': {
+            'dataSegments': {'0': {'dataColumns': data_columns}}}}},
+    }}}
+    return _frame(info) + _frame(data)
+
+
+def make_powerbi_body(num_rows=50000, num_measures=3, num_groups=100,
+                      null_fraction=0.05, seed=0):
+    """Returns a synthetic querydata response body, with one result of
+    num_rows DM0 rows, each of a group value and num_measures measures,
+    compressed like PowerBI's: group values are indices into a value
+    dictionary, and rows leave out group values that repeat the previous
+    row's (the R bitmask) and null measures (the Ø bitmask).
+    """
+    rng = np.random.RandomState(seed)
+    selects = [{'Kind': 1, 'Value': 'G0', 'Name': 'Cases.County'}]
+    selects += [{'Kind': 2, 'Value': f'M{i}', 'Name': f'Sum(Cases.Measure{i})'}
+                for i in range(num_measures)]
+    groups = np.sort(rng.randint(0, num_groups, num_rows)).tolist()
+    measures = rng.randint(0, 100000, (num_rows, num_measures)).tolist()
+    nulls = (rng.random_sample((num_rows, num_measures))
+             < null_fraction).tolist()
+    rows = []
+    for i in range(num_rows):
+        row = {}
+        values = []
+        if i and groups[i] == groups[i - 1]:
+            row['R'] = 1
+        else:
+            values.append(groups[i])
+        null_mask = sum(2 ** (j + 1) for j in range(num_measures)
+                        if nulls[i][j])
+        if null_mask:
+            row['Ø'] = null_mask
+        values += [value for value, null in zip(measures[i], nulls[i])
+                   if not null]
+        row['C'] = values
+        rows.append(row)
+    rows[0]['S'] = ([{'N': 'G0', 'T': 1, 'DN': 'D0'}]
+                    + [{'N': f'M{i}', 'T': 4} for i in range(num_measures)])
+    return json.dumps({'results': [{'result': {'data': {
+        'descriptor': {'Select': selects},
+        'dsr': {'DS': [{
+            'N': 'DS0',
+            'PH': [{'DM0': rows}],
+            'ValueDicts': {'D0': [f'County {i}' for i in range(num_groups)]},
+        }]},
+    }}}]})
+
+
+def measure(func, setup=None, repeat=3):
+    """Returns (seconds, peak_bytes): the best time of repeat calls of
+    func, and the peak memory allocated by one more call, traced with
+    tracemalloc (which slows it down, so it is not timed).
+
+    Arguments:
+      func: the function to call, with setup's result if setup is set.
+      setup: optional, a function whose result is passed to func,
+        called before each call and not timed.
+      repeat: the number of timed calls.
+    """
+    def call():
+        args = (setup(),) if setup else ()
+        start = time.perf_counter()
+        func(*args)
+        return time.perf_counter() - start
+
+    seconds = min(call() for _ in range(repeat))
+    args = (setup(),) if setup else ()
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, peak_bytes
+
+
+def run_benchmarks(scale=1.0, repeat=3):
+    """Runs the parser benchmarks, and returns a list of
+    BenchmarkResults.
+
+    Arguments:
+      scale: optional, a multiplier for the size of the synthetic
+        responses.
+      repeat: optional, the number of timed runs of each benchmark.
+    """
+    results = []
+
+    def run(name, params, func, setup=None):
+        seconds, peak_bytes = measure(func, setup=setup, repeat=repeat)
+        _logger.info(f'{name} {params}: {seconds:.4f}s, '
+                     f'{peak_bytes / 2**20:.1f}MB peak')
+        results.append(BenchmarkResult(name, params, seconds, peak_bytes))
+
+    tableau_params = {'num_worksheets': max(1, int(50 * scale)),
+                      'num_rows': max(1, int(2000 * scale)),
+                      'num_values': max(10, int(20000 * scale))}
+    blob = make_tableau_blob(**tableau_params)
+    run('tableau_parse', tableau_params, lambda: TableauParser(blob))
+    run('tableau_extract_key', tableau_params,
+        lambda parser: parser.extract_data_from_key('Sheet 0'),
+        setup=lambda: TableauParser(blob))
+    run('tableau_dataframe_from_key', tableau_params,
+        lambda parser: parser.get_dataframe_from_key('Sheet 0'),
+        setup=lambda: TableauParser(blob))
+
+    powerbi_params = {'num_rows': max(1, int(50000 * scale)),
+                      'num_measures': 3,
+                      'num_groups': max(1, int(100 * scale)),
+                      'null_fraction': 0.05}
+    body = make_powerbi_body(**powerbi_params)
+    run('powerbi_parse', powerbi_params, lambda: PowerBIParser(body=body))
+    run('powerbi_dataframe_by_key', powerbi_params,
+        lambda parser: parser.get_dataframe_by_key('Cases.County'),
+        setup=lambda: PowerBIParser(body=body))
+    return results
+
+
+def load_results(path):
+    """Returns the list of runs saved in the JSON lines file at path,
+    oldest first, or an empty list if there is none.
+    """
+    try:
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def save_results(path, results):
+    """Appends a run of results, with the time and Python version, to
+    the JSON lines file at path.
+    """
+    run = {
+        'time': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'results': [result._asdict() for result in results],
+    }
+    with open(path, 'a') as f:
+        f.write(json.dumps(run) + '\n')
+
+
+def compare_results(previous_run, results, threshold=1.25):
+    """Returns a list of (result, seconds ratio, peak bytes ratio) for
+    the results whose time or peak memory is more than threshold times
+    that of the same benchmark, with the same params, in previous_run.
+    """
+    previous = {(r['name'], json.dumps(r['params'], sort_keys=True)): r
+                for r in (previous_run or {}).get('results', [])}
+    regressions = []
+    for result in results:
+        old = previous.get(
+            (result.name, json.dumps(result.params, sort_keys=True)))
+        if not old:
+            continue
+        seconds_ratio = result.seconds / max(old['seconds'], 1e-9)
+        bytes_ratio = result.peak_bytes / max(old['peak_bytes'], 1)
+        if seconds_ratio > threshold or bytes_ratio > threshold:
+            regressions.append((result, seconds_ratio, bytes_ratio))
+    return regressions
@@ -1,11 +1,13 @@
+import asyncio
 import email.utils as eut
+import functools
 from io import BytesIO
 from pathlib import Path
 import os
 import logging
 from urllib.parse import urlsplit
+import weakref
 
-import requests
 import ssl
 
 from covid19_scrapers.utils import UTILS_WEB_CACHE
@@ -14,6 +16,11 @@ from covid19_scrapers.utils import UTILS_WEB_CACHE
 ssl._create_default_https_context = ssl._create_unverified_context
 _logger = logging.getLogger(__name__)
 
+# The number of concurrent async requests allowed to each host.
+MAX_REQUESTS_PER_HOST = 4
+# Per-host semaphores for each event loop.
+_HOST_SEMAPHORES = weakref.WeakKeyDictionary()
+
 
 # Helpers for HTTP data retrieval.
 def get_http_datetime(url):
@@ -25,7 +32,8 @@ def get_http_datetime(url):
         r = get_cached_url(url, cache_only=True)
     except RuntimeError:
         _logger.debug(f'trying HEAD request for {url}')
-        r = requests.head(url)
+        r = UTILS_WEB_CACHE.sessions.get_session(url).head(
+            url, timeout=UTILS_WEB_CACHE.sessions.timeout)
         r.raise_for_status()
     date = r.headers.get('last-modified')
     if date:
@@ -60,18 +68,23 @@ def get_cached_url(url, **kwargs):
 
 
 def download_file(file_url, new_file_name=None, **kwargs):
-    """Save the url contents in the specified file."""
+    """Save the url contents in the specified file.
+
+    The contents are streamed to the file and the cache in chunks, so
+    large files are not read into memory.
+
+    Returns the SHA-256 hex digest of the file.
+    """
     if new_file_name is None:
         new_file_name = Path(urlsplit(file_url).path).name
     try:
-        response = get_cached_url(file_url, **kwargs)
         new_file = Path(new_file_name)
-        _logger.debug(f'Saving response content to: {new_file}')
         if new_file.parent and not new_file.parent.exists():
             _logger.debug(f'Making {new_file.parent}')
             os.makedirs(str(new_file.parent), exist_ok=True)
-        with new_file.open('wb') as f:
-            f.write(response.content)
+        _logger.debug(f'Saving response content to: {new_file}')
+        response = get_cached_url(file_url, to_file=new_file, **kwargs)
+        return response.body_digest
     except Exception as e:
         _logger.warn(f'File download failed: {new_file_name}: {e}')
         raise
@@ -98,3 +111,82 @@ def get_content(url, **kwargs):
 def get_content_as_file(url, **kwargs):
     """Return the url's reponse contents as a BytesIO."""
     return BytesIO(get_content(url, **kwargs))
+
+
+# Async versions of the above.  These run the blocking versions in the
+# event loop's default thread pool, with the caller's web cache, so
+# they share its caching behavior (conditional requests, force_cache,
+# cache_only, etc.).  At most MAX_REQUESTS_PER_HOST run at once for
+# each host.
+def _get_host_semaphore(url):
+    loop = asyncio.get_running_loop()
+    semaphores = _HOST_SEMAPHORES.setdefault(loop, {})
+    host = urlsplit(url).netloc
+    if host not in semaphores:
+        semaphores[host] = asyncio.Semaphore(MAX_REQUESTS_PER_HOST)
+    return semaphores[host]
+
+
+def _call_with_web_cache(web_cache, func, args, kwargs):
+    # UTILS_WEB_CACHE is per thread, so set it in the pool thread.
+    with UTILS_WEB_CACHE.with_instance(web_cache):
+        return func(*args, **kwargs)
+
+
+async def _run_for_url(url, func, *args, **kwargs):
+    web_cache = UTILS_WEB_CACHE.instance
+    async with _get_host_semaphore(url):
+        return await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(_call_with_web_cache, web_cache, func,
+                                    args, kwargs))
+
+
+async def aget_cached_url(url, **kwargs):
+    """Async version of get_cached_url."""
+    return await _run_for_url(url, get_cached_url, url, **kwargs)
+
+
+async def adownload_file(file_url, new_file_name=None, **kwargs):
+    """Async version of download_file."""
+    return await _run_for_url(file_url, download_file, file_url,
+                              new_file_name, **kwargs)
+
+
+async def aget_json(url, **kwargs):
+    """Async version of get_json."""
+    return await _run_for_url(url, get_json, url, **kwargs)
+
+
+async def aget_content(url, **kwargs):
+    """Async version of get_content."""
+    return await _run_for_url(url, get_content, url, **kwargs)
+
+
+async def agather_urls(urls, fetch=aget_cached_url, return_exceptions=False,
+                       **kwargs):
+    """Fetch the URLs concurrently, and return a list of the results in
+    the same order.
+
+    Arguments:
+      urls: an iterable of the URLs to fetch.
+      fetch: optional, the async function to fetch each URL with,
+        e.g. aget_json.  Defaults to aget_cached_url.
+      return_exceptions: optional, if True, exceptions are returned
+        in place of the results of failed fetches instead of raised.
+      kwargs: passed to fetch.
+
+    """
+    return await asyncio.gather(*[fetch(url, **kwargs) for url in urls],
+                                return_exceptions=return_exceptions)
+
+
+def gather_urls(urls, **kwargs):
+    """Blocking version of agather_urls, for scrapers that need several
+    resources.
+
+    This must be called inside
+      with UTILS_WEB_CACHE(...):
+         ...
+
+    """
+    return asyncio.run(agather_urls(urls, **kwargs))
@@ -1,9 +1,21 @@
+import base64
+import hashlib
+from itertools import chain
 import json
+import logging
+import re
+from urllib.parse import parse_qs, urlsplit
 
+import numpy as np
 import pandas as pd
 import pydash
 
+from covid19_scrapers.utils import UTILS_WEB_CACHE
 from covid19_scrapers.utils.misc import as_list
+from covid19_scrapers.web_cache import get_current_age
+
+
+_logger = logging.getLogger(__name__)
 
 
 def filter_requests(*, entity=None, selects=None):
@@ -67,19 +79,86 @@ class PowerBIParserException(Exception):
     pass
 
 
+def _split_by_schema(rows):
+    """Returns a list of (schema, rows) for each run of DSR rows with the
+    same schema; a row with an `S` key starts a new schema.
+    """
+    runs = []
+    for row in rows:
+        if 'S' in row or not runs:
+            runs.append((row.get('S', []), []))
+        runs[-1][1].append(row)
+    return runs
+
+
+def _get_row_values(row, names):
+    if 'C' in row:
+        return row['C']
+    # Some rows have their values keyed by column name instead.
+    return [row[name] for name in names if name in row]
+
+
+def _get_bitmask(rows, key, num_columns):
+    masks = np.array([row.get(key, 0) for row in rows], dtype=np.int64)
+    return (masks[:, None] & (1 << np.arange(num_columns, dtype=np.int64))) != 0
+
+
+def _decode_rows(schema, rows, value_dicts):
+    """Decodes DSR rows with the same schema, and returns a dict of each
+    column name in the schema to an object array of its values.
+
+    Each row's `C` list holds the values of its columns, in order, except
+    those whose bits are set in the row's `R` bitmask, which repeat the
+    previous row's value, or in its `Ø` bitmask, which are null. Columns
+    with a `DN` in the schema hold indices into that value dictionary.
+    """
+    names = [column['N'] for column in schema]
+    repeat = _get_bitmask(rows, 'R', len(names))
+    null = _get_bitmask(rows, 'Ø', len(names))
+    present = ~(repeat | null)
+
+    row_values = list(chain.from_iterable(_get_row_values(row, names) for row in rows))
+    if len(row_values) != present.sum():
+        raise PowerBIParserException(
+            f'DSR rows have {len(row_values)} values for {present.sum()} present columns')
+    flat_values = np.empty(len(row_values), dtype=object)
+    flat_values[:] = row_values
+    values = np.empty(present.shape, dtype=object)
+    values[present] = flat_values
+
+    # Take each repeated value from the last row where its column was not repeated.
+    source_rows = np.where(repeat, 0, np.arange(len(rows))[:, None])
+    np.maximum.accumulate(source_rows, axis=0, out=source_rows)
+    values = values[source_rows, np.arange(len(names))]
+
+    columns = {}
+    for i, column in enumerate(schema):
+        column_values = values[:, i]
+        if column.get('DN') in value_dicts:
+            not_null = np.array([v is not None for v in column_values], dtype=bool)
+            lookup = np.empty(len(value_dicts[column['DN']]), dtype=object)
+            lookup[:] = value_dicts[column['DN']]
+            column_values[not_null] = lookup[column_values[not_null].astype(np.int64)]
+        columns[column['N']] = column_values
+    return columns
+
+
 class PowerBIParser(object):
     """This class makes it so parsing out responses from PowerBI is easier
 
-    This class takes an input of a seleniumwire Request (usually obtained via the WebdriverResults)
+    This class takes an input of a seleniumwire Request (usually obtained via the WebdriverResults),
+    or the `body` of a querydata response (e.g. from `PowerBIClient.query`)
 
     A PowerBI response, is usually composed of 2 parts:
         1. A query select (the client essentially writes a PowerBI query to query for the needed data)
-        2. the queried data
+        2. the queried data, in PowerBI's DSR format, which compresses rows by leaving out values
+           that repeat the previous row's or are null, and by replacing values with indices into
+           value dictionaries.
 
     This parser parses out the names of the selects and pairs them with the data.
-    To obtain the data that is needed, use the `get_data_by_key` function.
+    To obtain the data that is needed, use the `get_dataframe_by_key` function.
 
-    get_data_by_key takes a substring of a key, and when there is a match on the substring,
+    get_dataframe_by_key takes a substring of a key, and when there is a match on the substring,
     it returns the data associated with the match.
 
     i.e. if the parsed_data looks like:
@@ -87,33 +166,57 @@ class PowerBIParser(object):
          {'keys': ['123', '456'], data: ['kinda cool data!']}]
 
     the way the desired data can be obtained by:
-        parser.get_data_by_key(key='AB')
+        parser.get_dataframe_by_key(key='AB')
 
     this would return ['really cool data']
+
+    Each result's rows are only decoded when its dataframe is first requested, and are decoded
+    a column at a time, with numeric columns converted to numbers.
     """
 
-    def __init__(self, request):
-        self._dataframes = self._parse_data_from_request(request)
+    # DSR value types of numeric columns: decimal, double and integer.
+    NUMERIC_TYPES = {2, 3, 4}
 
-    def _parse_data_from_request(self, request):
-        json = self._get_json_from_request(request)
-        return self._build_dataframe(json)
+    def __init__(self, request=None, *, body=None):
+        if request:
+            body = request.response.body
+        self._results = {' '.join(self._get_column_names(result)): result
+                         for result in self._get_results(body)}
+        self._dataframes = {}
 
-    def _get_json_from_request(self, request):
-        json_data = json.loads(request.response.body.decode('utf8'))
+    def _get_results(self, body):
+        if isinstance(body, bytes):
+            body = body.decode('utf8')
+        json_data = json.loads(body)
         return json_data['results']
 
-    def _build_dataframe(self, results):
-        dataframes = {}
-        for result in results:
-            column_names = self._get_column_names(result)
-            data_rows = self._get_data(result)
-            value_labels = self._get_value_labels(result)
-            df = pd.DataFrame(**{'columns': column_names, 'data': data_rows})
-            if value_labels:
-                df['Label'] = value_labels
-            dataframes[' '.join(column_names)] = df
-        return dataframes
+    def _build_dataframe(self, result):
+        dataset = pydash.get(result, 'result.data.dsr.DS.0') or {}
+        rows = pydash.get(dataset, 'PH.0.DM0') or []
+        value_dicts = dataset.get('ValueDicts', {})
+        runs = _split_by_schema(rows)
+        decoded_runs = [_decode_rows(schema, run, value_dicts) for schema, run in runs]
+        value_types = {column['N']: column.get('T') for schema, _ in runs for column in schema}
+
+        data = {}
+        for select in self._get_selects(result):
+            if 'Name' not in select:
+                continue
+            name = select.get('Value')
+            # Columns missing from a run's schema are null in its rows.
+            values = np.concatenate(
+                [columns.get(name, np.full(len(run), None)) for (_, run), columns in zip(runs, decoded_runs)]
+                or [np.array([], dtype=object)])
+            data[select['Name']] = self._to_column(values, value_types.get(name))
+        return pd.DataFrame(data)
+
+    def _to_column(self, values, value_type):
+        if value_type in self.NUMERIC_TYPES:
+            try:
+                return pd.to_numeric(values)
+            except (ValueError, TypeError):
+                return values
+        return values
 
     def _get_selects(self, result):
         return pydash.get(result, 'result.data.descriptor.Select', [])
@@ -122,29 +225,209 @@ class PowerBIParser(object):
         selects = self._get_selects(result)
         return [select.get('Name') for select in selects if 'Name' in select]
 
-    def _get_data(self, result):
-        selects = self._get_selects(result)
-        select_values = [select.get('Value') for select in selects]
-        data_rows = pydash.get(result, 'result.data.dsr.DS.0.PH.0.DM0')
-        return [self._get_values(select_values, dr) for dr in data_rows]
-
-    def _get_values(self, select_value, data_row):
-        row = []
-        for sv in select_value:
-            if sv and sv in data_row:
-                row.append(data_row[sv])
-            else:
-                return as_list(data_row.get('C', [])) + as_list(data_row.get('R', []))
-        return row
-
-    def _get_value_labels(self, result):
-        return pydash.get(result, 'result.data.dsr.DS.0.ValueDicts.D0')
-
     def list_keys(self):
-        return list(self._dataframes.keys())
+        return list(self._results.keys())
 
     def get_dataframe_by_key(self, key):
-        for key_string, df in self._dataframes.items():
+        for key_string, result in self._results.items():
             if key in key_string:
-                return df
+                if key_string not in self._dataframes:
+                    self._dataframes[key_string] = self._build_dataframe(result)
+                return self._dataframes[key_string]
         raise PowerBIParserException('Key not found')
+
+
+class PowerBIClientException(Exception):
+    pass
+
+
+# Codes for the aggregation functions in PowerBI semantic queries.
+AGGREGATION_FUNCTIONS = {
+    'Sum': 0,
+    'Avg': 1,
+    'Count': 2,
+    'Min': 3,
+    'Max': 4,
+    'CountNonNull': 5,
+    'Median': 6,
+}
+
+
+def column(entity, prop, name=None):
+    """Returns a semantic query select for a column of the entity."""
+    return {
+        'Column': {'Expression': {'SourceRef': {'Entity': entity}}, 'Property': prop},
+        'Name': name or f'{entity}.{prop}',
+    }
+
+
+def measure(entity, prop, name=None):
+    """Returns a semantic query select for a measure of the entity."""
+    return {
+        'Measure': {'Expression': {'SourceRef': {'Entity': entity}}, 'Property': prop},
+        'Name': name or f'{entity}.{prop}',
+    }
+
+
+def aggregation(function, entity, prop, name=None):
+    """Returns a semantic query select for an aggregation (e.g. 'Sum' or
+    'CountNonNull') of a column of the entity.
+    """
+    return {
+        'Aggregation': {
+            'Expression': {'Column': {'Expression': {'SourceRef': {'Entity': entity}},
+                                      'Property': prop}},
+            'Function': AGGREGATION_FUNCTIONS[function],
+        },
+        'Name': name or f'{function}({entity}.{prop})',
+    }
+
+
+class PowerBIClient(object):
+    """PowerBIClient queries a public PowerBI report's data over plain HTTP, as the
+    report's visuals do, so scrapers can get querydata responses without starting
+    Chrome.
+
+    The report's public URL (https://app.powerbigov.us/view?r=...) encodes its
+    resource key and tenant. The client finds the tenant's cluster and the report's
+    model, then posts semantic queries to the cluster's `querydata` endpoint.
+    Results are cached in the UTILS_WEB_CACHE, keyed on the query body, and reused
+    for `max_age` seconds.
+
+    Usage:
+        client = PowerBIClient(URL)
+        body = client.query([powerbi.column('Cases_Ethnicity', 'raceethnicity'),
+                             powerbi.aggregation('Sum', 'Cases_Ethnicity', 'Total Cases')])
+        parser = PowerBIParser(body=body)
+
+    A query body captured from the report in a browser (the request body that
+    `filter_requests` matches) can also be posted with `query_body`.
+
+    Params:
+        url: the public URL of the report.
+        max_age: how long, in seconds, to reuse cached query results.
+        timeout: the (connect, read) timeout in seconds for each request.
+    """
+
+    def __init__(self, url, max_age=3600, timeout=(10, 120)):
+        self.url = url
+        self.max_age = max_age
+        self.timeout = timeout
+        parts = urlsplit(url)
+        try:
+            key = json.loads(base64.b64decode(parse_qs(parts.query)['r'][0] + '=='))
+            self.resource_key = key['k']
+            self.tenant_id = key['t']
+        except (KeyError, ValueError) as e:
+            raise PowerBIClientException(f'Unable to parse PowerBI report key from {url}: {e}')
+        if parts.netloc.endswith('powerbigov.us'):
+            self.api_url = 'https://api.powerbigov.us'
+        else:
+            self.api_url = 'https://api.powerbi.com'
+        self._cluster_url = None
+        self._model = None
+
+    def __repr__(self):
+        return f'PowerBIClient(resource_key={self.resource_key})'
+
+    def _get(self, url):
+        session = UTILS_WEB_CACHE.sessions.get_session(url)
+        response = session.get(url, headers={'X-PowerBI-ResourceKey': self.resource_key},
+                               timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def get_cluster_url(self):
+        """Returns the URL of the API cluster serving the report's tenant."""
+        if not self._cluster_url:
+            cluster = self._get(f'{self.api_url}/public/routing/cluster/{self.tenant_id}')
+            redirect_url = cluster.get('FixedClusterUri')
+            if not redirect_url:
+                raise PowerBIClientException(f'No cluster for PowerBI tenant {self.tenant_id}')
+            self._cluster_url = redirect_url.replace('-redirect.', '-api.').rstrip('/')
+        return self._cluster_url
+
+    def get_model(self):
+        """Returns the ids of the report's model, dataset and report, which queries
+        refer to.
+        """
+        if not self._model:
+            models = self._get(f'{self.get_cluster_url()}/public/reports/{self.resource_key}/'
+                               'modelsAndExploration?preferReadOnlySession=true')
+            try:
+                self._model = {
+                    'model_id': models['models'][0]['id'],
+                    'dataset_id': models['models'][0]['dbName'],
+                    'report_id': models['exploration']['report']['objectId'],
+                }
+            except (KeyError, IndexError) as e:
+                raise PowerBIClientException(f'Unable to find PowerBI model: {e}')
+        return self._model
+
+    def make_query_body(self, selects, max_rows=500):
+        """Returns the querydata request body for a semantic query of the selects
+        (see `column`, `measure` and `aggregation`), grouped by all of them.
+        """
+        entities = []
+        for select in selects:
+            entity = pydash.get(select, 'Column.Expression.SourceRef.Entity') or \
+                pydash.get(select, 'Measure.Expression.SourceRef.Entity') or \
+                pydash.get(select, 'Aggregation.Expression.Column.Expression.SourceRef.Entity')
+            if entity not in entities:
+                entities.append(entity)
+        model = self.get_model()
+        return {
+            'version': '1.0.0',
+            'queries': [{
+                'Query': {'Commands': [{'SemanticQueryDataShapeCommand': {
+                    'Query': {
+                        'Version': 2,
+                        'From': [{'Entity': entity, 'Type': 0} for entity in entities],
+                        'Select': selects,
+                    },
+                    'Binding': {
+                        'Primary': {'Groupings': [{'Projections': list(range(len(selects)))}]},
+                        'DataReduction': {'DataVolume': 3, 'Primary': {'Window': {'Count': max_rows}}},
+                        'Version': 1,
+                    },
+                }}]},
+                'QueryId': '',
+                'ApplicationContext': {
+                    'DatasetId': model['dataset_id'],
+                    'Sources': [{'ReportId': model['report_id']}],
+                },
+            }],
+            'cancelQueries': [],
+            'modelId': model['model_id'],
+        }
+
+    def query(self, selects, max_rows=500):
+        """Returns the body of the querydata response for a semantic query of the
+        selects, for `PowerBIParser(body=...)`.
+        """
+        return self.query_body(self.make_query_body(selects, max_rows))
+
+    def query_body(self, body):
+        """Returns the body of the querydata response to the request body (a JSON
+        string or dict), from the web cache if it was fetched in the last
+        `max_age` seconds.
+        """
+        if not isinstance(body, str):
+            body = json.dumps(body, sort_keys=True)
+        url = f'{self.get_cluster_url()}/public/reports/querydata?synchronous=true'
+        digest = hashlib.sha256(body.encode('utf8')).hexdigest()
+        cache_key = f'{url}&resourceKey={self.resource_key}&query={digest}'
+        cached = UTILS_WEB_CACHE.get_cached_response(cache_key)
+        if cached and get_current_age(cached['response']) < self.max_age:
+            _logger.debug(f'Using cached PowerBI query result: {digest}')
+            return cached['response'].content
+        session = UTILS_WEB_CACHE.sessions.get_session(url)
+        response = session.post(
+            url, data=body, timeout=self.timeout,
+            headers={'X-PowerBI-ResourceKey': self.resource_key,
+                     'Content-Type': 'application/json;charset=UTF-8'})
+        response.raise_for_status()
+        if not re.search(rb'"results"\s*:', response.content):
+            raise PowerBIClientException(f'No results in PowerBI query response: {response.text[:200]}')
+        UTILS_WEB_CACHE.cache_response(cache_key, response, force_cache=True)
+        return response.content
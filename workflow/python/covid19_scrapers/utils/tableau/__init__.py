@@ -1,12 +1,7 @@
-__all__ = ['TableauParser', 'find_tableau_request']
+__all__ = ['TableauClient', 'TableauParser', 'find_tableau_request', 'get_bootstrap_blob',
+           'get_parser', 'get_x_session_id']
 
 
+from covid19_scrapers.utils.tableau.client import (
+    TableauClient, find_tableau_request, get_bootstrap_blob, get_parser, get_x_session_id)
 from covid19_scrapers.utils.tableau.parser import TableauParser
-
-
-def find_tableau_request(request):
-    if '/bootstrapSession/sessions/' not in request.path:
-        return False
-    if request.response and request.response.body:
-        return 'sheetName' in request.response.body.decode('utf8')
-    return False
@@ -0,0 +1,327 @@
+import json
+import logging
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from bs4 import BeautifulSoup
+import requests
+from requests.cookies import RequestsCookieJar
+
+from covid19_scrapers.utils import UTILS_WEB_CACHE
+from covid19_scrapers.utils.tableau.parser import TableauParser
+from covid19_scrapers.webdriver import WebdriverRunner, WebdriverSteps
+from covid19_scrapers.webdriver.recording import LIVE, get_webdriver_mode
+
+
+_logger = logging.getLogger(__name__)
+
+
+class TableauClientException(Exception):
+    pass
+
+
+class TableauClient(object):
+    """TableauClient loads a Tableau view over plain HTTP, performing the same
+    handshake as the browser, so scrapers can get the `bootstrapSession` blob
+    that `find_tableau_request` looks for without starting Chrome.
+
+    The handshake is:
+    1. GET the embedded view, whose `tsConfigContainer` holds the session
+       configuration (the vizql root path, the sheet id, and usually the
+       session id, which is also sent as the X-Session-Id response header).
+    2. If no session id was sent, POST `startSession/viewing` for one.
+    3. POST `bootstrapSession/sessions/<session id>`, which returns the
+       data for the view as `<len>;{json}<len>;{json}`.
+
+    Usage:
+        with TableauClient(URL) as client:
+            parser = TableauParser(client.get_bootstrap_blob())
+
+    Params:
+        url: the URL of the Tableau view, e.g.
+            https://public.tableau.com/views/<workbook>/<view>
+        session: the requests.Session to use; by default, the web cache's pooled
+            session for the view's host, so requests are retried and timed out as
+            the web cache's are. The cookies Tableau sets during the handshake are
+            kept by the client, not the session, and sent with its later requests.
+        timeout: the (connect, read) timeout in seconds for each request; by
+            default, the session pool's.
+    """
+
+    # Parameters the embedded view needs to return its session config
+    # instead of the Tableau Public profile page.
+    EMBED_PARAMS = {':embed': 'y', ':showVizHome': 'no'}
+
+    def __init__(self, url, session=None, timeout=None):
+        self.url = self._get_embed_url(url)
+        web_cache = UTILS_WEB_CACHE.instance
+        self._owns_session = False
+        if session is None and web_cache is not None:
+            session = web_cache.sessions.get_session(self.url)
+            timeout = timeout or web_cache.sessions.timeout
+        elif session is None:
+            session = requests.Session()
+            self._owns_session = True
+        self.session = session
+        self.timeout = timeout or (10, 120)
+        self.cookies = RequestsCookieJar()
+        self.config = None
+        self.x_session_id = None
+
+    def __repr__(self):
+        return f'TableauClient(url={self.url}, x_session_id={self.x_session_id})'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Closes the client's session, if it created one."""
+        if self._owns_session:
+            self.session.close()
+
+    @classmethod
+    def _get_embed_url(cls, url):
+        parts = urlsplit(url)
+        query = dict(parse_qsl(parts.query))
+        for key, value in cls.EMBED_PARAMS.items():
+            query.setdefault(key, value)
+        return urlunsplit(parts._replace(query=urlencode(query, safe=':'),
+                                         fragment=''))
+
+    def _get_vizql_url(self, path):
+        parts = urlsplit(self.url)
+        root = self.config['vizql_root']
+        return f'{parts.scheme}://{parts.netloc}{root}/{path}'
+
+    def _request(self, method, url, **kwargs):
+        response = self.session.request(method, url, cookies=self.cookies,
+                                        timeout=self.timeout, **kwargs)
+        response.raise_for_status()
+        self.cookies.update(response.cookies)
+        return response
+
+    def _post(self, url, data):
+        return self._request('POST', url, data=data)
+
+    @staticmethod
+    def _parse_config(html):
+        soup = BeautifulSoup(html, 'lxml')
+        container = soup.find('textarea', id='tsConfigContainer')
+        if not container:
+            raise TableauClientException('No tsConfigContainer in Tableau view')
+        try:
+            return json.loads(container.text)
+        except json.JSONDecodeError as e:
+            raise TableauClientException(f'Unable to parse tsConfigContainer: {e}')
+
+    def start_session(self):
+        """Loads the view and starts a session for it, and returns its X-Session-Id."""
+        response = self._request('GET', self.url)
+        self.config = self._parse_config(response.text)
+        if 'vizql_root' not in self.config:
+            raise TableauClientException('No vizql_root in tsConfigContainer')
+        self.x_session_id = (self.config.get('sessionid')
+                             or response.headers.get('X-Session-Id'))
+        if not self.x_session_id:
+            response = self._post(self._get_vizql_url('startSession/viewing'), {})
+            self.x_session_id = response.headers.get('X-Session-Id')
+        if not self.x_session_id:
+            raise TableauClientException('No X-Session-Id for Tableau view')
+        _logger.debug(f'Started Tableau session {self.x_session_id} for {self.url}')
+        return self.x_session_id
+
+    def get_bootstrap_blob(self):
+        """Returns the body of the view's bootstrapSession response, for
+        `TableauParser(blob)`, starting a session if needed.
+        """
+        if not self.x_session_id:
+            self.start_session()
+        data = {
+            'sheet_id': self.config.get('sheetId', ''),
+            'showParams': self.config.get('showParams', '{}'),
+            'stickySessionKey': self.config.get('stickySessionKey', ''),
+            'worksheetPortSize': json.dumps({'w': 1920, 'h': 1080}),
+            'dashboardPortSize': json.dumps({'w': 1920, 'h': 1080}),
+            'clientDimension': json.dumps({'w': 1920, 'h': 1080}),
+            'renderMapsClientSide': 'true',
+            'isBrowserRendering': 'true',
+            'browserRenderingThreshold': '100',
+            'formatDataValueLocally': 'false',
+            'clientNum': '',
+            'navType': 'Reload',
+            'navSrc': 'Top',
+            'devicePixelRatio': '1',
+            'clientRenderPixelLimit': '25000000',
+            'allowAutogenWorksheetPhoneLayouts': 'true',
+            'locale': 'en_US',
+            'language': 'en',
+            'verboseMode': 'false',
+            ':session_feature_flags': '{}',
+            'keychain_version': '1',
+        }
+        response = self._post(
+            self._get_vizql_url(f'bootstrapSession/sessions/{self.x_session_id}'), data)
+        blob = response.content.decode('utf8')
+        if 'sheetName' not in blob:
+            raise TableauClientException('No sheet data in bootstrapSession response')
+        return blob
+
+    def run_command(self, command, data):
+        """Runs a VizQL command (e.g., 'tabdoc/select') in the session, and returns its
+        response, the changes to the view, for `TableauParser.apply_update`.
+
+        Params:
+            command: the command's path, e.g. 'tabdoc/categorical-filter-by-index'.
+            data: a dict of the command's form data.
+        """
+        if not self.x_session_id:
+            raise TableauClientException('No Tableau session; get the bootstrap blob first')
+        response = self._post(
+            self._get_vizql_url(f'sessions/{self.x_session_id}/commands/{command}'), data)
+        return response.content.decode('utf8')
+
+    def categorical_filter(self, worksheet, field, indices, dashboard=None,
+                           update_type='filter-replace'):
+        """Filters the worksheet's field to the values at indices (in the filter's list
+        of values), and returns the changes to the view, for `TableauParser.apply_update`.
+
+        Params:
+            worksheet: the name of the worksheet the filter applies to.
+            field: the filter's global field name, e.g. '[federated.abc].[none:County:nk]'.
+            indices: a list of the indices of the values to keep.
+            dashboard: the name of the worksheet's dashboard; by default, the view's sheet.
+            update_type: how to combine indices with the current filter.
+        """
+        visual_id = {'worksheet': worksheet,
+                     'dashboard': dashboard or (self.config or {}).get('sheetId', '')}
+        return self.run_command('tabdoc/categorical-filter-by-index', {
+            'visualIdPresModel': json.dumps(visual_id),
+            'globalFieldName': field,
+            'membershipTarget': 'filter',
+            'filterIndices': json.dumps(indices),
+            'filterUpdateType': update_type,
+        })
+
+
+def get_bootstrap_blob_from_browser(url):
+    """Returns the bootstrapSession blob for the Tableau view at url, captured from
+    a browser loading it.
+    """
+    results = WebdriverRunner().run(
+        WebdriverSteps()
+        .go_to_url(url)
+        .find_request('bootstrap', find_by=find_tableau_request))
+    request = results.requests['bootstrap']
+    if not request:
+        raise TableauClientException(f'No bootstrapSession request for Tableau view: {url}')
+    return request.response.body.decode('utf8')
+
+
+def get_x_session_id_from_browser(url):
+    """Returns the X-Session-Id for the Tableau view at url, captured from a
+    browser loading it.
+    """
+    results = WebdriverRunner().run(
+        WebdriverSteps()
+        .go_to_url(url)
+        .find_request('bootstrap', find_by=find_tableau_request)
+        .get_x_session_id())
+    if not results.x_session_id:
+        raise TableauClientException(f'No X-Session-Id for Tableau view: {url}')
+    return results.x_session_id
+
+
+def _call_with_fallback(url, func, fallback):
+    if get_webdriver_mode() != LIVE:
+        return fallback()
+    try:
+        return func()
+    except (requests.RequestException, TableauClientException) as e:
+        _logger.warning(f'Unable to load Tableau view directly, using fallback: {url}: {e}')
+        return fallback()
+
+
+def get_bootstrap_blob(url, fallback=None, **kwargs):
+    """Returns the bootstrapSession blob for the Tableau view at url, fetched with
+    a TableauClient.
+
+    If that fails, returns `fallback()` instead, which by default loads the view in
+    a browser. The fallback is also used when WebdriverRunners are recording or
+    replaying, so recorded browser runs stay complete. Scrapers that need particular
+    worksheets should use `get_parser`, which also falls back when they are missing.
+
+    Params:
+        url: the URL of the Tableau view.
+        fallback: a function with no arguments that returns the blob, for views that
+            need more browser steps than loading url.
+        kwargs: passed to TableauClient.
+    """
+    def get_blob():
+        with TableauClient(url, **kwargs) as tableau_client:
+            return tableau_client.get_bootstrap_blob()
+
+    return _call_with_fallback(
+        url, get_blob, fallback or (lambda: get_bootstrap_blob_from_browser(url)))
+
+
+def get_parser(url, keys=(), fallback=None, **kwargs):
+    """Returns a TableauParser for the bootstrapSession blob of the Tableau view at url,
+    as returned by `get_bootstrap_blob`.
+
+    The blob fetched with a TableauClient is only used if it parses and has all the
+    worksheets named in keys; otherwise, the fallback's blob is parsed instead. So a
+    view that serves plain HTTP clients less data than browsers is still scraped.
+
+    Params:
+        url: the URL of the Tableau view.
+        keys: the names of the worksheets the scraper needs.
+        fallback: a function with no arguments that returns the blob, as for
+            `get_bootstrap_blob`.
+        kwargs: passed to TableauClient.
+    """
+    def parse_direct():
+        with TableauClient(url, **kwargs) as tableau_client:
+            blob = tableau_client.get_bootstrap_blob()
+        try:
+            parser = TableauParser(blob)
+        except Exception as e:
+            raise TableauClientException(f'Unable to parse bootstrapSession response: {e}')
+        missing = [key for key in keys if key not in parser.list_keys()]
+        if missing:
+            raise TableauClientException(f'Missing worksheets in bootstrapSession response: {missing}')
+        return parser
+
+    fallback = fallback or (lambda: get_bootstrap_blob_from_browser(url))
+    return _call_with_fallback(url, parse_direct, lambda: TableauParser(fallback()))
+
+
+def get_x_session_id(url, fallback=None, **kwargs):
+    """Returns the X-Session-Id of a new, bootstrapped session for the Tableau view
+    at url, started with a TableauClient, for HTTP requests to the view's other
+    vizql URLs.
+
+    The session's cookies stay with the client, so a browser cannot use it: steps
+    that open the view's URLs in a browser need the session the browser starts
+    itself (see `get_x_session_id_from_browser`).
+
+    If that fails, returns `fallback()` instead, which by default loads the view in
+    a browser, as for `get_bootstrap_blob`.
+    """
+    def start_session():
+        with TableauClient(url, **kwargs) as tableau_client:
+            # The session only serves other requests once it is bootstrapped.
+            tableau_client.get_bootstrap_blob()
+            return tableau_client.x_session_id
+
+    return _call_with_fallback(
+        url, start_session, fallback or (lambda: get_x_session_id_from_browser(url)))
+
+
+def find_tableau_request(request):
+    if '/bootstrapSession/sessions/' not in request.path:
+        return False
+    if request.response and request.response.body:
+        return 'sheetName' in request.response.body.decode('utf8')
+    return False
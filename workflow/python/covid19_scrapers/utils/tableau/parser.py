@@ -1,7 +1,9 @@
+import numpy as np
 import pydash
 import pandas as pd
 
-from covid19_scrapers.utils.tableau.response_handler import get_response_handler
+from covid19_scrapers.utils.tableau.response_handler import (
+    get_response_handler, get_update_handler, merge_data_segments)
 
 
 class TableauParserException(Exception):
@@ -15,16 +17,66 @@ class TableauParser(object):
 
     This class takes the body of the response (`blob`) or a request and parses it. Afterward,
     calls to `extract_data_from_key` can be used to extract needed data.
+
+    The blob is parsed once, when the parser is created, but each key's data is only extracted
+    when it is first requested. Values are looked up with NumPy indexing into an array per data
+    type, so `get_dataframe_from_key` returns typed columns: integer and real values as numbers,
+    and dates as datetime64.
+
+    Once parsed, a dashboard can be updated with the responses to VizQL commands (e.g., a filter
+    change, via `TableauClient.categorical_filter`), using `apply_update`, rather than loaded again.
     """
 
+    # NumPy dtypes of Tableau data types; others (e.g., cstring) are stored as objects.
+    VALUE_DTYPES = {'integer': np.int64, 'real': np.float64, 'bool': np.bool_}
+
+    NO_ZONE_COLUMNS_PATH = ['presModelHolder', 'genVizDataPresModel', 'paneColumnsData']
+    ZONE_COLUMNS_PATH = ['presModelHolder', 'visual', 'vizData', 'paneColumnsData']
+
     def __init__(self, blob=None, *, request=None):
         if request:
             blob = request.response.body.decode('utf8')
         self.blob = blob
         response_handler = get_response_handler(self.blob)
         self.values_lookup = response_handler.get_values_lookup()
-        self.dashboard_sections = response_handler.get_dashboard_sections()
+        self.dashboard_sections = response_handler.get_dashboard_sections() or {}
         self.zone_lookup = response_handler.get_zone_lookup()
+        self._segment_ids = set(response_handler.get_data_segments())
+        self._keys = set(self.list_keys())
+        self._values = {}
+        self._columns = {}
+
+    def apply_update(self, blob=None, *, request=None):
+        """Applies an incremental vqlCmdResponse, the response to a VizQL command, to the parsed
+        dashboard: its new data segments are added to the values lookup, and its worksheets replace
+        those with the same names.
+
+        Returns the list of the updated keys.
+        """
+        if request:
+            blob = request.response.body.decode('utf8')
+        update_handler = get_update_handler(blob)
+        segments = {segment_id: segment for segment_id, segment in update_handler.get_data_segments().items()
+                    if segment_id not in self._segment_ids}
+        if segments:
+            merge_data_segments(self.values_lookup, segments)
+            self._segment_ids.update(segments)
+            self._values = {}
+
+        # Dashboards without zones are keyed by worksheet name.
+        keyed_by_zone = bool(self.zone_lookup or not self.dashboard_sections)
+        updated_keys = []
+        for zone_id, zone in update_handler.get_dashboard_sections().items():
+            key = pydash.get(zone, 'zoneCommon.name')
+            if keyed_by_zone:
+                self.dashboard_sections[zone_id] = zone
+                self.zone_lookup[key] = zone_id
+            else:
+                self.dashboard_sections[key] = zone
+            self._columns.pop(key, None)
+            updated_keys.append(key)
+        self._keys = set(self.list_keys())
+        return updated_keys
 
     def list_keys(self):
         """A debugging function used for checking which keys are extractable via
@@ -35,50 +87,75 @@ class TableauParser(object):
         else:
             return list(self.dashboard_sections.keys())
 
-    def _no_zone_meta_lookup(self, key):
-        return pydash.get(self.dashboard_sections, f'{key}.presModelHolder.genVizDataPresModel'
-                          '.paneColumnsData.vizDataColumns')
-
-    def _zone_meta_lookup(self, key):
-        zone = self.zone_lookup[key]
-        return pydash.get(self.dashboard_sections, f'{zone}.presModelHolder.visual.vizData.'
-                          'paneColumnsData.vizDataColumns')
+    def _get_columns_data(self, key):
+        section = self.dashboard_sections.get(self.zone_lookup.get(key, key))
+        return (pydash.get(section, self.NO_ZONE_COLUMNS_PATH)
+                or pydash.get(section, self.ZONE_COLUMNS_PATH)
+                or {})
 
     def get_metadata(self, key):
-        return self._no_zone_meta_lookup(key) or self._zone_meta_lookup(key)
-
-    def _no_zone_aliased_values(self, key):
-        return pydash.get(self.dashboard_sections, f'{key}.presModelHolder.genVizDataPresModel.paneColumnsData.'
-                          'paneColumnsList.0.vizPaneColumns')
-
-    def _zone_aliased_values(self, key):
-        zone = self.zone_lookup[key]
-        return pydash.get(self.dashboard_sections, f'{zone}.presModelHolder.visual.vizData.paneColumnsData.'
-                          'paneColumnsList.0.vizPaneColumns')
+        return self._get_columns_data(key).get('vizDataColumns')
 
     def get_aliased_values(self, key):
-        return self._no_zone_aliased_values(key) or self._zone_aliased_values(key)
+        return pydash.get(self._get_columns_data(key), ['paneColumnsList', 0, 'vizPaneColumns'])
+
+    def _get_columns(self, key):
+        """Returns a dict of each field caption to its (values array, Tableau data type)."""
+        assert key in self._keys, 'Key not in dashboard_sections. Valid keys for this data: %s' % self.list_keys()
+        if key not in self._columns:
+            columns_data = self._get_columns_data(key)
+            metadata = columns_data.get('vizDataColumns')
+            aliased_values = pydash.get(columns_data, ['paneColumnsList', 0, 'vizPaneColumns'])
+            columns = {}
+            for meta, aliased_value in zip(metadata, aliased_values):
+                if 'fieldCaption' not in meta:
+                    continue
+                alias_indices = aliased_value.get('aliasIndices')
+                columns[meta['fieldCaption'].strip()] = (self._try_to_unalias(alias_indices, meta),
+                                                         meta.get('dataType'))
+            self._columns[key] = columns
+        return self._columns[key]
 
     def extract_data_from_key(self, key):
         """As the json blobs are extracted from Tableau, the second piece of information from the extracted data
         contains data about each dashboard that is shown.
 
         Each dashboard is partioned off by a specific key. This function reads the json data and makes
-        the data from the key available in a dictionary format.
+        the data from the key available in a dictionary format, of each field to a list of its values.
         """
-        assert key in self.list_keys(), 'Key not in dashboard_sections. Valid keys for this data: %s' % self.list_keys()
-        metadata = self.get_metadata(key)
-        aliased_values = self.get_aliased_values(key)
-        data = {}
-        for meta, aliased_value in zip(metadata, aliased_values):
-            if 'fieldCaption' not in meta:
-                continue
-            alias_indices = aliased_value.get('aliasIndices')
-            data[meta['fieldCaption'].strip()] = self._try_to_unalias(alias_indices, meta)
-        return data
+        return {caption: values.tolist() for caption, (values, _) in self._get_columns(key).items()}
 
     def get_dataframe_from_key(self, key):
-        return pd.DataFrame.from_dict(self.extract_data_from_key(key))
+        """Returns the data from the key as a DataFrame, with date fields as datetime64 columns."""
+        return pd.DataFrame({caption: self._to_column(values, data_type)
+                             for caption, (values, data_type) in self._get_columns(key).items()})
+
+    @staticmethod
+    def _to_column(values, data_type):
+        if data_type == 'date':
+            try:
+                return pd.to_datetime(values)
+            except (ValueError, TypeError, OverflowError):
+                return values
+        return values
+
+    def _get_values(self, data_type):
+        """Returns the values of the data type as an array, raising KeyError if there are none."""
+        if data_type not in self._values:
+            values = self.values_lookup[data_type]
+            try:
+                self._values[data_type] = np.asarray(values, dtype=self.VALUE_DTYPES.get(data_type, object))
+            except (ValueError, TypeError, OverflowError):
+                self._values[data_type] = np.asarray(values, dtype=object)
+        return self._values[data_type]
+
+    @staticmethod
+    def _to_value_indices(alias_indices, offset_negative):
+        # Negative indices of measures and dates count from -1, rather than 0.
+        indices = np.asarray(alias_indices, dtype=np.int64)
+        if offset_negative:
+            indices = np.where(indices < 0, -indices - 1, indices)
+        return np.abs(indices)
 
     def _try_to_unalias(self, alias_indices, meta):
         try:
@@ -88,18 +165,17 @@ class TableauParser(object):
             return self._try_hard_to_unalias(alias_indices, meta)
 
     def _unalias_by_data_type(self, alias_indices, meta, data_type):
-        if meta['fieldRole'] == 'measure' or meta['dataType'] == 'date':
-            alias_indices = [abs(idx) - 1 if idx < 0 else idx for idx in alias_indices]
+        indices = self._to_value_indices(
+            alias_indices, meta['fieldRole'] == 'measure' or meta['dataType'] == 'date')
         if meta['dataType'] == 'date':
             data_type = 'cstring'
-        return [self.values_lookup[data_type][abs(idx)] for idx in alias_indices]
+        return self._get_values(data_type)[indices]
 
     def _try_hard_to_unalias(self, alias_indices, meta):
-        for data_type, lookup in self.values_lookup.items():
+        indices = self._to_value_indices(alias_indices, meta['fieldRole'] == 'measure')
+        for data_type in self.values_lookup:
             try:
-                if meta['fieldRole'] == 'measure':
-                    alias_indices = [abs(idx) - 1 if idx < 0 else idx for idx in alias_indices]
-                return [self.values_lookup[data_type][abs(idx)] for idx in alias_indices]
+                return self._get_values(data_type)[indices]
             except (IndexError, KeyError):
                 continue
         raise TableauParserException('Could not unalias values.')
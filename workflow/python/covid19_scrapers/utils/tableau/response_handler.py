@@ -2,7 +2,7 @@ import json
 
 import pydash
 
-from covid19_scrapers.utils.tableau.tableau_util import extract_json_from_blob
+from covid19_scrapers.utils.tableau.tableau_util import decode_frame, find_frames
 
 
 def get_response_handler(blob):
@@ -14,47 +14,75 @@ def get_response_handler(blob):
         - get_values_lookup
         - get_zone_lookup
     which the TableauParser uses to obtain the needed data to continue extracting data.
+    (The values lookup is built from the data segments returned by `get_data_segments`.)
+
+    The first json blob of a bootstrap response is only decoded if the format needs it (v2).
     """
-    json1, json2 = extract_json_from_blob(blob)
-    if json1 and json2:  # this is either v1 or v2
-        if pydash.get(json2, 'secondaryInfo.presModelMap.vizData'):
-            return TableauV1Handler(json1, json2)
+    frames = find_frames(blob)
+    if len(frames) == 2:  # this is either v1 or v2
+        json_data = decode_frame(blob, frames[1])
+        if pydash.get(json_data, ['secondaryInfo', 'presModelMap', 'vizData']):
+            return TableauV1Handler(json_data)
         else:
-            return TableauV2Handler(json1, json2)
+            return TableauV2Handler(decode_frame(blob, frames[0]), json_data)
     else:  # VSQL info
         return TableauVSQLHandler(json.loads(blob))
 
 
+def merge_data_segments(values_lookup, data_segments):
+    """Appends the values of each data segment to values_lookup, a dict of data type to values.
+
+    Tableau numbers data segments in the order it sends them, and alias indices refer to
+    the values of all segments so far, so segments are appended in numeric order.
+    """
+    for _, segment in sorted(data_segments.items(), key=lambda item: int(item[0])):
+        for column in segment.get('dataColumns', []):
+            values_lookup.setdefault(column.get('dataType'), []).extend(column.get('dataValues', []))
+    return values_lookup
+
+
+def get_update_handler(blob):
+    """Returns a TableauUpdateHandler for the response to a VizQL command (e.g., a filter
+    change or a selection), which is either plain json or framed like a bootstrap response.
+    """
+    frames = find_frames(blob)
+    if frames:
+        return TableauUpdateHandler(decode_frame(blob, frames[-1]))
+    return TableauUpdateHandler(json.loads(blob))
+
+
 class TableauResponseHandler(object):
+    DATA_SEGMENTS_KEY = None
+
     def __init__(self, *args, **kwargs):
         pass
 
     def get_dashboard_sections(self):
         raise NotImplementedError()
 
+    def get_data_segments(self):
+        return pydash.get(self.json_data, self.DATA_SEGMENTS_KEY) or {}
+
     def get_values_lookup(self):
-        raise NotImplementedError()
+        return merge_data_segments({}, self.get_data_segments())
 
     def get_zone_lookup(self):
         return {}
 
 
 class TableauV1Handler(TableauResponseHandler):
-    def __init__(self, viz_data, json_data):
-        self.viz_data = viz_data
+    DATA_SEGMENTS_KEY = 'secondaryInfo.presModelMap.dataDictionary.presModelHolder.genDataDictionaryPresModel.dataSegments'
+
+    def __init__(self, json_data):
         self.json_data = json_data
 
     def get_dashboard_sections(self):
         return pydash.get(self.json_data, 'secondaryInfo.presModelMap.vizData.presModelHolder.'
                                           'genPresModelMapPresModel.presModelMap')
 
-    def get_values_lookup(self):
-        lookup = pydash.get(self.json_data, 'secondaryInfo.presModelMap.dataDictionary.presModelHolder.'
-                                            'genDataDictionaryPresModel.dataSegments.0.dataColumns')
-        return {v.get('dataType'): v.get('dataValues') for v in lookup}
-
 
 class TableauV2Handler(TableauResponseHandler):
+    DATA_SEGMENTS_KEY = TableauV1Handler.DATA_SEGMENTS_KEY
     SECTION_KEY = 'worldUpdate.applicationPresModel.workbookPresModel.dashboardPresModel.zones'
 
     def __init__(self, viz_data, json_data):
@@ -67,11 +95,6 @@ class TableauV2Handler(TableauResponseHandler):
         return pydash.get(
             self.section_with_data, 'presModelHolder.flipboard.storyPoints.1.dashboardPresModel.zones')
 
-    def get_values_lookup(self):
-        lookup = pydash.get(self.json_data, 'secondaryInfo.presModelMap.dataDictionary.presModelHolder.'
-                                            'genDataDictionaryPresModel.dataSegments.0.dataColumns')
-        return {v.get('dataType'): v.get('dataValues') for v in lookup}
-
     def get_zone_lookup(self):
         return {pydash.get(v, 'zoneCommon.name'): k
                 for k, v in pydash.get(self.section_with_data, 'presModelHolder.flipboard.storyPoints.'
@@ -79,22 +102,44 @@ class TableauV2Handler(TableauResponseHandler):
 
 
 class TableauVSQLHandler(TableauResponseHandler):
+    DATA_SEGMENTS_KEY = 'vqlCmdResponse.layoutStatus.applicationPresModel.dataDictionary.dataSegments'
     SECTION_KEY = 'vqlCmdResponse.layoutStatus.applicationPresModel.workbookPresModel.dashboardPresModel.zones'
 
     def __init__(self, vql_response):
         self.vql_response = vql_response
+        self.json_data = vql_response
         self.section_with_data = pydash.head([v for _, v in pydash.get(self.vql_response, self.SECTION_KEY, {}).items()
                                               if pydash.get(v, 'presModelHolder.flipboard')])
 
     def get_dashboard_sections(self):
         return pydash.get(self.section_with_data, 'presModelHolder.flipboard.storyPoints.2.dashboardPresModel.zones')
 
-    def get_values_lookup(self):
-        lookup = pydash.get(self.vql_response, 'vqlCmdResponse.layoutStatus.applicationPresModel.'
-                                               'dataDictionary.dataSegments.0.dataColumns', {})
-        return {v.get('dataType'): v.get('dataValues') for v in lookup}
-
     def get_zone_lookup(self):
         return {pydash.get(v, 'zoneCommon.name'): k
                 for k, v in pydash.get(self.section_with_data, 'presModelHolder.flipboard.storyPoints.'
                                                                '2.dashboardPresModel.zones', {}).items()}
+
+
+class TableauUpdateHandler(TableauResponseHandler):
+    """Handles an incremental vqlCmdResponse, which contains only the data segments and zones
+    that changed, for TableauParser.apply_update.
+    """
+    DATA_SEGMENTS_KEY = TableauVSQLHandler.DATA_SEGMENTS_KEY
+    SECTION_KEY = TableauVSQLHandler.SECTION_KEY
+
+    def __init__(self, vql_response):
+        self.json_data = vql_response
+
+    def _iter_zones(self, zones):
+        for zone_id, zone in zones.items():
+            yield zone_id, zone
+            for story_point in pydash.get(zone, 'presModelHolder.flipboard.storyPoints', {}).values():
+                yield from self._iter_zones(pydash.get(story_point, 'dashboardPresModel.zones', {}))
+
+    def get_dashboard_sections(self):
+        """Returns the zones with worksheet data, including those in story points, by zone id."""
+        return {zone_id: zone for zone_id, zone in self._iter_zones(pydash.get(self.json_data, self.SECTION_KEY, {}))
+                if pydash.get(zone, 'zoneCommon.name') and pydash.get(zone, 'presModelHolder.visual.vizData')}
+
+    def get_zone_lookup(self):
+        return {pydash.get(v, 'zoneCommon.name'): k for k, v in self.get_dashboard_sections().items()}
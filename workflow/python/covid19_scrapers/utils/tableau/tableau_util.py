@@ -2,26 +2,56 @@ import json
 import re
 
 
+_FRAME_HEADER = re.compile(r'\s*(\d+);')
+_TRAILING_SPACE = re.compile(r'\s*$')
+_DECODER = json.JSONDecoder()
+
+
+def find_frames(blob):
+    """Given a blob returned from a specific Tableau request, this function returns
+    the (start, end) positions of each json blob in it.
+
+    Tableau prefixes each json response with its length and a semicolon
+    (`<len>;{json}`), so the blob is scanned frame by frame without decoding or
+    copying it. Returns an empty list if the blob is not framed this way.
+    """
+    frames = []
+    pos = 0
+    while not _TRAILING_SPACE.match(blob, pos):
+        match = _FRAME_HEADER.match(blob, pos)
+        if not match:
+            return []
+        start = match.end()
+        end = start + int(match.group(1))
+        if not (_FRAME_HEADER.match(blob, end) or _TRAILING_SPACE.match(blob, end)):
+            # The length did not land on the next frame (it may count characters
+            # differently), so find the end of this frame by decoding it.
+            try:
+                _, end = _DECODER.raw_decode(blob, start)
+            except json.JSONDecodeError:
+                return []
+        frames.append((start, min(end, len(blob))))
+        pos = end
+    return frames
+
+
+def decode_frame(blob, frame):
+    """Decodes the json blob at the (start, end) positions returned by `find_frames`."""
+    start, end = frame
+    obj, _ = _DECODER.raw_decode(blob, start)
+    return obj
+
+
 def extract_json_from_blob(blob):
     """Given a blob returned from a specific Tableau request, this function aims to
     return back the various json blobs back as a list.
 
-    There is some id attached to the beginning of each json response,
-    so look for that number with a curly brace and replace it with a curly brace.
-
-    Then parse out the json data.
+    Returns a pair of empty dicts unless the blob contains exactly 2 json blobs.
     """
-    expr = r'(\d+;)(\{)'
-    json_str_blobs = re.sub(expr, '{', blob)
-    decoder = json.JSONDecoder()
-    pos = 0
-    json_data = []
-    while True:
-        try:
-            obj, pos = decoder.raw_decode(json_str_blobs, pos)
-            json_data.append(obj)
-        except json.JSONDecodeError:
-            break
-    if len(json_data) != 2:
+    frames = find_frames(blob)
+    if len(frames) != 2:
+        return ({}, {})
+    try:
+        return [decode_frame(blob, frame) for frame in frames]
+    except json.JSONDecodeError:
         return ({}, {})
-    return json_data
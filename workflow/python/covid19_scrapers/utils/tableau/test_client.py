@@ -0,0 +1,151 @@
+import json
+
+import pytest
+import requests
+
+from covid19_scrapers.session_pool import SessionPool
+from covid19_scrapers.utils import UTILS_WEB_CACHE
+from covid19_scrapers.utils.tableau import client
+from covid19_scrapers.utils.tableau.client import TableauClient, get_bootstrap_blob, get_parser, get_x_session_id
+from covid19_scrapers.utils.tableau.test_parser import v1_blob
+from covid19_scrapers.utils.testing import MockSession
+from covid19_scrapers.web_cache import WebCache
+from covid19_scrapers.webdriver.recording import REPLAY, webdriver_mode
+
+
+BLOB = '123;{"sheetName": "Dashboard"}45;{"secondaryInfo": {}}'
+
+
+class FakeTableauSession(MockSession):
+    """Serves a Tableau view from an in-memory table of (method, url) to response."""
+
+    def __init__(self, config, headers={}, routes={}):
+        super().__init__()
+        html = f'<html><body><textarea id="tsConfigContainer">{json.dumps(config)}</textarea></body></html>'
+        self.routes = {('GET', 'https://tableau.fake/views/Book/View?:embed=y&:showVizHome=no'):
+                       self.make_response(content=html, headers=headers)}
+        self.routes.update(routes)
+        self.calls = []
+        self.cookies_sent = []
+
+    def request(self, method, url, data=None, cookies=None, **kwargs):
+        self.calls.append((method, url, data))
+        self.cookies_sent.append(dict(cookies or {}))
+        response = self.routes.get((method, url))
+        if response is None:
+            return self.make_response(status_code=404)
+        return response
+
+
+def test_bootstrap():
+    bootstrap_url = 'https://tableau.fake/vizql/w/Book/v/View/bootstrapSession/sessions/ABC'
+    session = FakeTableauSession(
+        {'vizql_root': '/vizql/w/Book/v/View', 'sessionid': 'ABC', 'sheetId': 'View'},
+        routes={('POST', bootstrap_url): MockSession().make_response(content=BLOB)})
+    tableau_client = TableauClient('https://tableau.fake/views/Book/View#tab', session=session)
+    assert tableau_client.get_bootstrap_blob() == BLOB
+    assert tableau_client.x_session_id == 'ABC'
+    method, url, data = session.calls[-1]
+    assert (method, url) == ('POST', bootstrap_url)
+    assert data['sheet_id'] == 'View'
+
+
+def test_pooled_session():
+    bootstrap_url = 'https://tableau.fake/vizql/w/Book/v/View/bootstrapSession/sessions/ABC'
+    session = FakeTableauSession(
+        {'vizql_root': '/vizql/w/Book/v/View', 'sessionid': 'ABC'},
+        routes={('POST', bootstrap_url): MockSession().make_response(content=BLOB)})
+    view_url = 'https://tableau.fake/views/Book/View?:embed=y&:showVizHome=no'
+    session.routes[('GET', view_url)].cookies.set('tableau_locale', 'en')
+    pool = SessionPool(timeout=(1, 2))
+    pool.get_session = lambda url: session
+    with UTILS_WEB_CACHE.with_instance(WebCache(':memory:', session_pool=pool)):
+        with TableauClient('https://tableau.fake/views/Book/View') as tableau_client:
+            assert tableau_client.get_bootstrap_blob() == BLOB
+            assert tableau_client.session is session
+            assert tableau_client.timeout == (1, 2)
+    # The handshake's cookies are sent with its later requests, but not kept in the
+    # shared session.
+    assert session.cookies_sent == [{}, {'tableau_locale': 'en'}]
+
+
+def test_categorical_filter():
+    command_url = 'https://tableau.fake/vizql/w/Book/v/View/sessions/ABC/commands/tabdoc/categorical-filter-by-index'
+    session = FakeTableauSession(
+        {'vizql_root': '/vizql/w/Book/v/View', 'sessionid': 'ABC', 'sheetId': 'View'},
+        routes={('POST', command_url): MockSession().make_response(content='{"vqlCmdResponse": {}}')})
+    tableau_client = TableauClient('https://tableau.fake/views/Book/View', session=session)
+    with pytest.raises(client.TableauClientException):
+        tableau_client.categorical_filter('Cases', '[none:County:nk]', [3])
+    tableau_client.start_session()
+    assert tableau_client.categorical_filter('Cases', '[none:County:nk]', [3]) == '{"vqlCmdResponse": {}}'
+    method, url, data = session.calls[-1]
+    assert (method, url) == ('POST', command_url)
+    assert json.loads(data['visualIdPresModel']) == {'worksheet': 'Cases', 'dashboard': 'View'}
+    assert json.loads(data['filterIndices']) == [3]
+
+
+def test_start_session():
+    start_url = 'https://tableau.fake/vizql/w/Book/v/View/startSession/viewing'
+    session = FakeTableauSession(
+        {'vizql_root': '/vizql/w/Book/v/View'},
+        routes={('POST', start_url): MockSession().make_response(headers={'X-Session-Id': 'DEF'})})
+    assert TableauClient('https://tableau.fake/views/Book/View', session=session).start_session() == 'DEF'
+
+
+def test_get_x_session_id():
+    bootstrap_url = 'https://tableau.fake/vizql/w/Book/v/View/bootstrapSession/sessions/ABC'
+    session = FakeTableauSession(
+        {'vizql_root': '/vizql/w/Book/v/View', 'sessionid': 'ABC'},
+        routes={('POST', bootstrap_url): MockSession().make_response(content=BLOB)})
+    assert get_x_session_id('https://tableau.fake/views/Book/View', fallback=lambda: 'from browser',
+                            session=session) == 'ABC'
+    # The session was bootstrapped before its id was returned.
+    assert session.calls[-1][:2] == ('POST', bootstrap_url)
+
+    # A session that cannot be bootstrapped is not returned.
+    session = FakeTableauSession({'vizql_root': '/vizql/w/Book/v/View', 'sessionid': 'ABC'})
+    assert get_x_session_id('https://tableau.fake/views/Book/View', fallback=lambda: 'from browser',
+                            session=session) == 'from browser'
+
+
+def test_get_parser():
+    bootstrap_url = 'https://tableau.fake/vizql/w/Book/v/View/bootstrapSession/sessions/ABC'
+    session = FakeTableauSession(
+        {'vizql_root': '/vizql/w/Book/v/View', 'sessionid': 'ABC'},
+        routes={('POST', bootstrap_url): MockSession().make_response(content=v1_blob())})
+    parser = get_parser('https://tableau.fake/views/Book/View', keys=['Race.Cases'],
+                        fallback=lambda: BLOB, session=session)
+    assert parser.list_keys() == ['Race.Cases']
+
+    # Blobs that parse, but lack a worksheet the scraper needs, are replaced by the fallback's.
+    parser = get_parser('https://tableau.fake/views/Book/View', keys=['Race.Cases', 'Race.Deaths'],
+                        fallback=v1_blob, session=session)
+    assert len(session.calls) == 4
+    assert parser.list_keys() == ['Race.Cases']
+
+    # So are blobs that do not parse.
+    session.routes[('POST', bootstrap_url)] = MockSession().make_response(content=BLOB)
+    parser = get_parser('https://tableau.fake/views/Book/View', fallback=v1_blob, session=session)
+    assert parser.list_keys() == ['Race.Cases']
+
+
+def test_fallback(monkeypatch):
+    session = FakeTableauSession({'vizql_root': '/vizql/w/Book/v/View', 'sessionid': 'ABC'})
+    with pytest.raises(requests.HTTPError):
+        TableauClient('https://tableau.fake/views/Book/View', session=session).get_bootstrap_blob()
+    assert get_bootstrap_blob('https://tableau.fake/views/Book/View',
+                              fallback=lambda: 'from browser', session=session) == 'from browser'
+
+    # The default fallback loads the view in a browser.
+    monkeypatch.setattr(client, 'get_bootstrap_blob_from_browser', lambda url: f'browser: {url}')
+    session = FakeTableauSession({})
+    assert get_bootstrap_blob('https://tableau.fake/views/Book/View',
+                              session=session) == 'browser: https://tableau.fake/views/Book/View'
+
+    # Replays always use the fallback.
+    session = FakeTableauSession({})
+    with webdriver_mode(REPLAY):
+        assert get_bootstrap_blob('https://tableau.fake/views/Book/View',
+                                  fallback=lambda: 'replayed', session=session) == 'replayed'
+    assert session.calls == []
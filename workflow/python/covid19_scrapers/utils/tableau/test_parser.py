@@ -0,0 +1,157 @@
+import json
+
+import pytest
+
+from covid19_scrapers.utils.tableau import TableauParser
+from covid19_scrapers.utils.tableau.response_handler import (
+    TableauV1Handler, TableauV2Handler, TableauVSQLHandler, get_response_handler)
+from covid19_scrapers.utils.tableau.tableau_util import extract_json_from_blob, find_frames
+
+
+DATA_DICTIONARY = {'presModelHolder': {'genDataDictionaryPresModel': {'dataSegments': {'0': {'dataColumns': [
+    {'dataType': 'cstring', 'dataValues': ['Black', 'White', 'Race', '4/1/2020']},
+    {'dataType': 'integer', 'dataValues': [10, 20]},
+]}}}}}
+
+COLUMNS_DATA = {
+    'vizDataColumns': [
+        {},
+        {'fieldCaption': 'Race ', 'fieldRole': 'dimension', 'dataType': 'cstring'},
+        {'fieldCaption': 'SUM(Cases)', 'fieldRole': 'measure', 'dataType': 'integer'},
+    ],
+    'paneColumnsList': [{'vizPaneColumns': [{}, {'aliasIndices': [0, 1]}, {'aliasIndices': [0, 1]}]}],
+}
+
+
+def frame(data):
+    text = json.dumps(data)
+    return f'{len(text)};{text}'
+
+
+def v1_blob():
+    sections = {'Race.Cases': {'presModelHolder': {'genVizDataPresModel': {'paneColumnsData': COLUMNS_DATA}}}}
+    return frame({'sheetName': 'Dashboard'}) + frame({'secondaryInfo': {'presModelMap': {
+        'vizData': {'presModelHolder': {'genPresModelMapPresModel': {'presModelMap': sections}}},
+        'dataDictionary': DATA_DICTIONARY}}})
+
+
+def zones(story_point):
+    return {'7': {'presModelHolder': {'flipboard': {'storyPoints': {story_point: {'dashboardPresModel': {'zones': {
+        '12': {'zoneCommon': {'name': 'Cases by Race'},
+               'presModelHolder': {'visual': {'vizData': {'paneColumnsData': COLUMNS_DATA}}}},
+    }}}}}}}}
+
+
+def v2_blob():
+    viz_data = {'worldUpdate': {'applicationPresModel': {'workbookPresModel': {
+        'dashboardPresModel': {'zones': zones('1')}}}}}
+    return frame(viz_data) + frame({'secondaryInfo': {'presModelMap': {'dataDictionary': DATA_DICTIONARY}}})
+
+
+def vsql_blob():
+    return json.dumps({'vqlCmdResponse': {'layoutStatus': {'applicationPresModel': {
+        'workbookPresModel': {'dashboardPresModel': {'zones': zones('2')}},
+        'dataDictionary': DATA_DICTIONARY['presModelHolder']['genDataDictionaryPresModel']}}}})
+
+
+def test_find_frames():
+    blob = v1_blob()
+    frames = find_frames(blob)
+    assert len(frames) == 2
+    assert json.loads(blob[slice(*frames[0])]) == {'sheetName': 'Dashboard'}
+    assert extract_json_from_blob(blob)[0] == {'sheetName': 'Dashboard'}
+
+    # Lengths that do not match the frames are recovered from by decoding.
+    assert find_frames('3;{"a": 1}2;{"b": 2}\n') == [(2, 10), (12, 20)]
+    assert find_frames('{"a": 1}') == []
+    assert extract_json_from_blob('12;{"a": 1}') == ({}, {})
+
+
+@pytest.mark.parametrize('blob, handler_type, key', [
+    (v1_blob(), TableauV1Handler, 'Race.Cases'),
+    (v2_blob(), TableauV2Handler, 'Cases by Race'),
+    (vsql_blob(), TableauVSQLHandler, 'Cases by Race'),
+])
+def test_parse(blob, handler_type, key):
+    assert isinstance(get_response_handler(blob), handler_type)
+    parser = TableauParser(blob)
+    assert parser.list_keys() == [key]
+    data = parser.extract_data_from_key(key)
+    assert data == {'Race': ['Black', 'White'], 'SUM(Cases)': [10, 20]}
+
+    # Changing the returned data does not change later results.
+    data['Race'] = None
+    assert parser.get_dataframe_from_key(key)['SUM(Cases)'].sum() == 30
+
+    with pytest.raises(AssertionError):
+        parser.extract_data_from_key('Missing')
+
+
+def test_typed_columns():
+    columns_data = {
+        'vizDataColumns': [
+            {'fieldCaption': 'Day', 'fieldRole': 'dimension', 'dataType': 'date'},
+            {'fieldCaption': 'SUM(Cases)', 'fieldRole': 'measure', 'dataType': 'integer'},
+            {'fieldCaption': 'AGG(Rate)', 'fieldRole': 'measure', 'dataType': 'real'},
+        ],
+        'paneColumnsList': [{'vizPaneColumns': [
+            {'aliasIndices': [3, -4]}, {'aliasIndices': [1, -1]}, {'aliasIndices': [0, 0]}]}],
+    }
+    data_dictionary = {'presModelHolder': {'genDataDictionaryPresModel': {'dataSegments': {'0': {'dataColumns': [
+        {'dataType': 'cstring', 'dataValues': ['Black', 'White', 'Race', '4/1/2020']},
+        {'dataType': 'integer', 'dataValues': [10, 20]},
+        {'dataType': 'real', 'dataValues': [0.5]},
+    ]}}}}}
+    sections = {'By Day': {'presModelHolder': {'genVizDataPresModel': {'paneColumnsData': columns_data}}}}
+    blob = frame({'sheetName': 'Dashboard'}) + frame({'secondaryInfo': {'presModelMap': {
+        'vizData': {'presModelHolder': {'genPresModelMapPresModel': {'presModelMap': sections}}},
+        'dataDictionary': data_dictionary}}})
+    parser = TableauParser(blob)
+
+    assert parser.extract_data_from_key('By Day') == {
+        'Day': ['4/1/2020', '4/1/2020'], 'SUM(Cases)': [20, 10], 'AGG(Rate)': [0.5, 0.5]}
+    df = parser.get_dataframe_from_key('By Day')
+    assert str(df['Day'].dtype) == 'datetime64[ns]'
+    assert str(df['SUM(Cases)'].dtype) == 'int64'
+    assert str(df['AGG(Rate)'].dtype) == 'float64'
+    assert df['Day'][0].day == 1
+
+
+def update_blob(zone_name):
+    # The new segment's values follow those of segment 0, so its cstring values start at 4.
+    columns_data = {
+        'vizDataColumns': COLUMNS_DATA['vizDataColumns'],
+        'paneColumnsList': [{'vizPaneColumns': [{}, {'aliasIndices': [4]}, {'aliasIndices': [2]}]}],
+    }
+    return json.dumps({'vqlCmdResponse': {'layoutStatus': {'applicationPresModel': {
+        'workbookPresModel': {'dashboardPresModel': {'zones': {
+            '3': {'zoneCommon': {'name': 'Filter'}},
+            '12': {'zoneCommon': {'name': zone_name},
+                   'presModelHolder': {'visual': {'vizData': {'paneColumnsData': columns_data}}}},
+        }}},
+        'dataDictionary': {'dataSegments': {'1': {'dataColumns': [
+            {'dataType': 'cstring', 'dataValues': ['Asian']},
+            {'dataType': 'integer', 'dataValues': [5]},
+        ]}}}}}}})
+
+
+@pytest.mark.parametrize('blob, key', [
+    (v1_blob(), 'Race.Cases'),
+    (v2_blob(), 'Cases by Race'),
+    (vsql_blob(), 'Cases by Race'),
+])
+def test_apply_update(blob, key):
+    parser = TableauParser(blob)
+    assert parser.extract_data_from_key(key)['Race'] == ['Black', 'White']
+    assert parser.apply_update(update_blob(key)) == [key]
+    assert parser.list_keys() == [key]
+    assert parser.extract_data_from_key(key) == {'Race': ['Asian'], 'SUM(Cases)': [5]}
+
+    # Applying the same update again does not add its segment twice.
+    parser.apply_update(update_blob(key))
+    assert parser.values_lookup['integer'] == [10, 20, 5]
+
+    # New worksheets are added.
+    parser.apply_update(update_blob('Cases by Race (2)'))
+    assert sorted(parser.list_keys()) == sorted([key, 'Cases by Race (2)'])
+    assert parser.extract_data_from_key('Cases by Race (2)')['Race'] == ['Asian']
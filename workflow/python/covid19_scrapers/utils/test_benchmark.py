@@ -0,0 +1,39 @@
+from covid19_scrapers.utils import benchmark
+from covid19_scrapers.utils.powerbi import PowerBIParser
+from covid19_scrapers.utils.tableau import TableauParser
+
+
+def test_tableau_blob():
+    parser = TableauParser(benchmark.make_tableau_blob(
+        num_worksheets=3, num_rows=5, num_values=20))
+    assert parser.list_keys() == ['Sheet 0', 'Sheet 1', 'Sheet 2']
+    df = parser.get_dataframe_from_key('Sheet 1')
+    assert list(df.columns) == ['County', 'Day', 'SUM(Cases)', 'AGG(Rate)']
+    assert len(df) == 5
+    assert df['County'].str.startswith('County ').all()
+    assert str(df['Day'].dtype) == 'datetime64[ns]'
+
+
+def test_powerbi_body():
+    parser = PowerBIParser(body=benchmark.make_powerbi_body(
+        num_rows=50, num_groups=5, null_fraction=0.2))
+    df = parser.get_dataframe_by_key('Cases.County')
+    assert df.shape == (50, 4)
+    assert list(df['Cases.County']) == sorted(df['Cases.County'])
+    assert df['Cases.County'].str.startswith('County ').all()
+    assert df['Sum(Cases.Measure0)'].isna().any()
+
+
+def test_run_and_compare(tmp_path):
+    results = benchmark.run_benchmarks(scale=0.01, repeat=1)
+    assert {r.name for r in results} >= {'tableau_parse', 'powerbi_parse'}
+    assert all(r.seconds > 0 and r.peak_bytes > 0 for r in results)
+
+    path = tmp_path / 'benchmarks.jsonl'
+    benchmark.save_results(path, results)
+    benchmark.save_results(path, results)
+    runs = benchmark.load_results(path)
+    assert len(runs) == 2
+    assert benchmark.compare_results(runs[-1], results) == []
+    slower = [r._replace(seconds=r.seconds * 2) for r in results]
+    assert len(benchmark.compare_results(runs[-1], slower)) == len(results)
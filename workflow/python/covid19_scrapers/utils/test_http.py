@@ -0,0 +1,112 @@
+import asyncio
+from pathlib import Path
+import threading
+import time
+
+import pytest
+import requests
+
+from covid19_scrapers.dir_context import dir_context
+from covid19_scrapers.utils import UTILS_WEB_CACHE
+import covid19_scrapers.utils.http as http
+from covid19_scrapers.utils.testing import MockSession
+from covid19_scrapers.web_cache import WebCache
+
+
+class SlowSession(MockSession):
+    """Returns each URL's path as its content, after a delay, and tracks
+    the most requests in flight at once for each host.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+        self.active = {}
+        self.max_active = {}
+
+    def send(self, request, **kwargs):
+        host = request.url.split('/')[2]
+        with self.lock:
+            self.active[host] = self.active.get(host, 0) + 1
+            self.max_active[host] = max(self.max_active.get(host, 0),
+                                        self.active[host])
+        time.sleep(0.05)
+        with self.lock:
+            self.active[host] -= 1
+        if request.url.endswith('/missing'):
+            r = self.make_response(status_code=404)
+        else:
+            r = self.make_response(content=request.url.split('/', 3)[3],
+                                   headers={'ETag': 'fake-etag'})
+        r.request = request
+        r.url = request.url
+        return r
+
+
+def test_agather_urls():
+    session = SlowSession()
+    urls = [f'http://{host}/{i}' for host in 'ab' for i in range(10)]
+    with UTILS_WEB_CACHE.with_instance(WebCache(':memory:')):
+        responses = http.gather_urls(urls, session=session)
+        assert [r.text for r in responses] == [str(i) for i in range(10)] * 2
+        # Requests ran concurrently, but within the per-host limit (and the
+        # thread pool's size, which depends on the number of CPUs).
+        assert sorted(session.max_active) == ['a', 'b']
+        assert all(1 < n <= http.MAX_REQUESTS_PER_HOST
+                   for n in session.max_active.values())
+
+        # The responses were cached.
+        cached = http.gather_urls(urls, cache_only=True)
+        assert [r.text for r in cached] == [r.text for r in responses]
+
+
+def test_agather_urls_exceptions():
+    session = SlowSession()
+    with UTILS_WEB_CACHE.with_instance(WebCache(':memory:')):
+        with pytest.raises(requests.HTTPError):
+            http.gather_urls(['http://a/1', 'http://a/missing'],
+                             session=session)
+        results = http.gather_urls(['http://a/1', 'http://a/missing'],
+                                   session=session, return_exceptions=True)
+        assert results[0].text == '1'
+        assert isinstance(results[1], requests.HTTPError)
+
+
+def test_aget_json():
+    session = MockSession()
+    session.add_response(content='{"a": 1}', headers={'ETag': 'fake-etag'})
+
+    async def get():
+        return await http.aget_json('http://fake/', session=session)
+
+    with UTILS_WEB_CACHE.with_instance(WebCache(':memory:')):
+        assert asyncio.run(get()) == {'a': 1}
+
+
+def test_async_helpers_inside_dir_context(tmp_path):
+    session = SlowSession()
+    (tmp_path / 'work' / 'Scraper').mkdir(parents=True)
+
+    async def fetch():
+        return await asyncio.gather(
+            http.aget_content('http://a/1', session=session),
+            http.aget_cached_url('http://a/2', session=session),
+            http.adownload_file('http://b/3', 'three.txt', session=session))
+
+    # Scrapers run with the cwd set to their own work directory, and the
+    # pool threads open their own connections to the cache from there.
+    with dir_context(tmp_path):
+        web_cache = WebCache('work/web_cache.db', reset=True)
+        with UTILS_WEB_CACHE.with_instance(web_cache):
+            with dir_context('work/Scraper'):
+                content, response, _ = asyncio.run(fetch())
+                assert Path('three.txt').read_text() == '3'
+            assert content == b'1'
+            assert response.text == '2'
+            assert not (tmp_path / 'work' / 'Scraper' / 'work').exists()
+
+            # The responses were cached where the cache was created.
+            cached = http.gather_urls(
+                ['http://a/1', 'http://a/2', 'http://b/3'], cache_only=True)
+            assert [r.text for r in cached] == ['1', '2', '3']
+        web_cache.close()
@@ -0,0 +1,149 @@
+import base64
+import email.utils as eut
+import json
+
+import pytest
+
+from covid19_scrapers.test.states.data import loader
+from covid19_scrapers.utils import UTILS_WEB_CACHE, powerbi
+from covid19_scrapers.utils.testing import MockSession
+from covid19_scrapers.web_cache import WebCache
+
+
+REPORT_KEY = base64.b64encode(json.dumps({'k': 'fake-key', 't': 'fake-tenant'}).encode()).decode().rstrip('=')
+URL = f'https://app.powerbigov.us/view?r={REPORT_KEY}'
+CLUSTER_URL = 'https://wabi-fake-api.analysis.usgovcloudapi.net'
+
+
+class FakePowerBISession(MockSession):
+    def __init__(self):
+        super().__init__()
+        self.posts = []
+
+    def _json_response(self, data):
+        return self.make_response(content=json.dumps(data))
+
+    def get(self, url, headers, **kwargs):
+        assert headers['X-PowerBI-ResourceKey'] == 'fake-key'
+        if url == 'https://api.powerbigov.us/public/routing/cluster/fake-tenant':
+            return self._json_response(
+                {'FixedClusterUri': 'https://wabi-fake-redirect.analysis.usgovcloudapi.net/'})
+        assert url.startswith(f'{CLUSTER_URL}/public/reports/fake-key/modelsAndExploration')
+        return self._json_response({
+            'models': [{'id': 123, 'dbName': 'fake-dataset'}],
+            'exploration': {'report': {'objectId': 'fake-report'}}})
+
+    def post(self, url, data, headers, **kwargs):
+        assert url == f'{CLUSTER_URL}/public/reports/querydata?synchronous=true'
+        self.posts.append(json.loads(data))
+        return self.make_response(
+            content=loader.get_blob('california_san_francisco_cases.txt'),
+            headers={'Date': eut.formatdate(usegmt=True)})
+
+
+@pytest.fixture
+def session(monkeypatch):
+    session = FakePowerBISession()
+    with UTILS_WEB_CACHE.with_instance(WebCache(':memory:')):
+        monkeypatch.setattr(UTILS_WEB_CACHE.sessions, 'get_session', lambda url: session)
+        yield session
+
+
+class FakeRequest(object):
+    path = f'{CLUSTER_URL}/public/reports/querydata?synchronous=true'
+
+    def __init__(self, body):
+        self.body = json.dumps(body).encode('utf8')
+
+
+def test_query_body():
+    client = powerbi.PowerBIClient(URL)
+    client._cluster_url = CLUSTER_URL
+    client._model = {'model_id': 123, 'dataset_id': 'fake-dataset', 'report_id': 'fake-report'}
+    body = client.make_query_body([
+        powerbi.column('Cases_Ethnicity', 'raceethnicity'),
+        powerbi.aggregation('CountNonNull', 'Cases_Ethnicity', 'Total Cases'),
+        powerbi.measure('Date_Uploaded', 'Data as of')])
+    assert body['modelId'] == 123
+    # Query bodies match the filters used for captured requests.
+    assert powerbi.filter_requests(
+        entity='Date_Uploaded',
+        selects=['Cases_Ethnicity.raceethnicity', 'CountNonNull(Cases_Ethnicity.Total Cases)'])(FakeRequest(body))
+
+
+def test_query(session):
+    client = powerbi.PowerBIClient(URL)
+    selects = [powerbi.column('Cases_Ethnicity', 'raceethnicity'),
+               powerbi.aggregation('CountNonNull', 'Cases_Ethnicity', 'Total Cases')]
+    parser = powerbi.PowerBIParser(body=client.query(selects))
+    expected = powerbi.PowerBIParser(body=loader.get_blob('california_san_francisco_cases.txt'))
+    assert parser.list_keys() == expected.list_keys()
+    assert session.posts[0]['queries'][0]['ApplicationContext'] == {
+        'DatasetId': 'fake-dataset', 'Sources': [{'ReportId': 'fake-report'}]}
+
+    # Results are cached by query.
+    client.query(selects)
+    assert len(session.posts) == 1
+    client.query(selects[:1])
+    assert len(session.posts) == 2
+    powerbi.PowerBIClient(URL, max_age=0).query(selects)
+    assert len(session.posts) == 3
+
+
+def test_bad_url():
+    with pytest.raises(powerbi.PowerBIClientException):
+        powerbi.PowerBIClient('https://app.powerbigov.us/view?r=bogus')
+
+
+def make_body(rows, value_dicts=None):
+    dataset = {'N': 'DS0', 'PH': [{'DM0': rows}]}
+    if value_dicts:
+        dataset['ValueDicts'] = value_dicts
+    return json.dumps({'results': [{'result': {'data': {
+        'descriptor': {'Select': [
+            {'Kind': 2, 'Value': 'M0', 'Name': 'Sum(Cases.Count)'},
+            {'Kind': 1, 'Value': 'G0', 'Name': 'Cases.Race'},
+            {'Kind': 1, 'Value': 'G1', 'Name': 'Cases.County'},
+        ]},
+        'dsr': {'DS': [dataset]},
+    }}}]})
+
+
+def test_decode_rows():
+    body = make_body([
+        {'S': [{'N': 'G0', 'T': 1, 'DN': 'D0'}, {'N': 'G1', 'T': 1}, {'N': 'M0', 'T': 4}],
+         'C': [0, 'Alameda', 10]},
+        {'C': [1], 'R': 6},  # County and count repeat
+        {'C': ['Marin'], 'R': 1, 'Ø': 4},  # Race repeats, count is null
+        {'C': [0, 7], 'R': 2},
+        {'G0': 1, 'G1': 'Napa', 'M0': 3},
+    ], value_dicts={'D0': ['Black', 'White']})
+    df = powerbi.PowerBIParser(body=body).get_dataframe_by_key('Cases.Race')
+    assert list(df.columns) == ['Sum(Cases.Count)', 'Cases.Race', 'Cases.County']
+    assert list(df['Cases.Race']) == ['Black', 'White', 'White', 'Black', 'White']
+    assert list(df['Cases.County']) == ['Alameda', 'Alameda', 'Marin', 'Marin', 'Napa']
+    assert df['Sum(Cases.Count)'].tolist()[:2] == [10, 10]
+    assert df['Sum(Cases.Count)'].isna().tolist() == [False, False, True, False, False]
+    assert df['Sum(Cases.Count)'].dtype == float
+
+
+def test_decode_schema_change():
+    body = make_body([
+        {'S': [{'N': 'G0', 'T': 1}, {'N': 'M0', 'T': 4}], 'C': ['Black', 1]},
+        {'S': [{'N': 'G1', 'T': 1}, {'N': 'M0', 'T': 4}], 'C': ['Napa', 2]},
+    ])
+    df = powerbi.PowerBIParser(body=body).get_dataframe_by_key('Cases.Race')
+    assert list(df['Cases.Race']) == ['Black', None]
+    assert list(df['Cases.County']) == [None, 'Napa']
+    assert list(df['Sum(Cases.Count)']) == [1, 2]
+
+
+def test_decode_errors():
+    body = make_body([{'S': [{'N': 'G0', 'T': 1}, {'N': 'M0', 'T': 4}], 'C': ['Black']}])
+    # Results are only decoded when requested.
+    parser = powerbi.PowerBIParser(body=body)
+    assert parser.list_keys() == ['Sum(Cases.Count) Cases.Race Cases.County']
+    with pytest.raises(powerbi.PowerBIParserException):
+        parser.get_dataframe_by_key('Cases.Race')
+    with pytest.raises(powerbi.PowerBIParserException):
+        parser.get_dataframe_by_key('Missing')
@@ -20,6 +20,8 @@ class MockSession(object):
         if isinstance(content, str):
             content = content.encode(encoding)
         r._content = content
+        # Serve iter_content from _content, as for a read response.
+        r._content_consumed = True
         return r
 
     def add_response(self, resp=None, **kwargs):
@@ -31,7 +33,7 @@ class MockSession(object):
     def prepare_request(self, request):
         return request.prepare()
 
-    def send(self, request):
+    def send(self, request, **kwargs):
         resp = self.responses.pop()
         if isinstance(resp, Exception):
             raise resp
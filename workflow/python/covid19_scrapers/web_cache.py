@@ -1,13 +1,23 @@
 # Helpers for cached HTTP data retrieval.
+from contextlib import contextmanager, nullcontext
 import datetime
 import email.utils as eut
+import hashlib
+import json
 import logging
-import pickle
+import os
+from pathlib import Path
 import sqlite3
-from urllib.parse import urldefrag
+import threading
+import time
+from urllib.parse import urldefrag, urlsplit
 
 import requests
 
+from covid19_scrapers.blob_store import (
+    BlobStore, CHUNK_SIZE, MemoryBlobStore)
+from covid19_scrapers.session_pool import SessionPool
+
 
 _logger = logging.getLogger(__name__)
 
@@ -78,64 +88,506 @@ def is_fresh(response):
         return False
 
 
+# Bump this when changing the fields written by _dump_response_meta.
+# Entries in other formats are treated as cache misses.
+RESPONSE_FORMAT_VERSION = 1
+
+
+def _dump_response_meta(response):
+    """Serialize a requests.Response's metadata, without its body, which
+    is kept in the blob store.
+
+    This is JSON rather than a pickle, so stored entries do not depend
+    on the installed version of requests, and loading them cannot run
+    arbitrary code.
+    """
+    return json.dumps({
+        'version': RESPONSE_FORMAT_VERSION,
+        'url': response.url,
+        'status_code': response.status_code,
+        'reason': response.reason,
+        'encoding': response.encoding,
+        # A list of pairs, since header names are case-insensitive.
+        'headers': list(response.headers.items()),
+        'elapsed': response.elapsed.total_seconds(),
+    })
+
+
+class CachedResponse(requests.Response):
+    """A requests.Response rebuilt from the web cache, which loads its
+    body from the blob store only when it is first used (e.g., by
+    `content`, `text`, or `json()`).  Checking the headers, e.g. for
+    freshness, does not load the body.
+
+    Arguments:
+      meta: the JSON string from _dump_response_meta.
+      load_body: a callable returning the body as bytes.
+      body_digest: optional, the key of the body in the blob store.
+
+    Raises ValueError if meta is in an unknown format.
+
+    """
+
+    def __init__(self, meta, load_body, body_digest=None):
+        super().__init__()
+        meta = json.loads(meta)
+        if meta.get('version') != RESPONSE_FORMAT_VERSION:
+            raise ValueError('Unknown cached response format: '
+                             f'{meta.get("version")}')
+        self.url = meta['url']
+        self.status_code = meta['status_code']
+        self.reason = meta['reason']
+        self.encoding = meta['encoding']
+        self.headers.update(meta['headers'])
+        self.elapsed = datetime.timedelta(seconds=meta['elapsed'])
+        self._load_body = load_body
+        self.body_digest = body_digest
+        # Replace the "not yet read" marker set by Response.__init__.
+        self._content = None
+        self._content_consumed = True
+
+    @property
+    def _content(self):
+        # requests.Response reads its body from this attribute.
+        body = self.__dict__.get('_body')
+        if body is None:
+            body = self.__dict__['_body'] = self._load_body()
+        return body
+
+    @_content.setter
+    def _content(self, body):
+        self.__dict__['_body'] = body
+
+
+class EvictionPolicy(object):
+    """Limits on what a WebCache keeps.  Entries are evicted least
+    recently used first.
+
+    Keyword arguments:
+      max_bytes: evict entries until the cache stores at most this
+        many bytes.
+      max_age: evict entries not stored or revalidated in this many
+        seconds.
+      max_host_bytes: evict each host's entries until it stores at
+        most this many bytes.  This may also be a dict mapping host
+        names to limits, in which case only hosts in the dict are
+        limited.
+      interval: how often in seconds the cache evicts entries as it
+        stores responses.  If None, entries are only evicted by calls
+        to `WebCache.collect_garbage`.
+
+    Entry sizes count the stored body and metadata, so bodies shared
+    by several URLs are counted once per URL.
+
+    """
+
+    def __init__(self, *, max_bytes=None, max_age=None, max_host_bytes=None,
+                 interval=600.0):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.max_host_bytes = max_host_bytes
+        self.interval = interval
+
+    def __repr__(self):
+        return (f'<{self.__class__.__name__} max_bytes={self.max_bytes} '
+                f'max_age={self.max_age} '
+                f'max_host_bytes={self.max_host_bytes}>')
+
+    def get_host_limit(self, host):
+        if isinstance(self.max_host_bytes, dict):
+            return self.max_host_bytes.get(host)
+        return self.max_host_bytes
+
+
 class WebCache(object):
+    # Bump this when changing SCHEMA.  Since this is a cache, tables
+    # from older versions are dropped rather than migrated.
+    SCHEMA_VERSION = 4
     SCHEMA = [
         'url TEXT PRIMARY KEY',
         'etag TEXT',
         'last_modified TEXT',
-        'response BLOB NOT NULL',
+        # The response metadata from _dump_response_meta.
+        'response TEXT NOT NULL',
+        # The key of the body in the blob store.
+        'body_digest TEXT NOT NULL',
+        # Statistics for the eviction policy.
+        'host TEXT NOT NULL',
+        # Bytes stored for the body and response.
+        'size INTEGER NOT NULL',
+        # When the response was stored or last revalidated, and last
+        # read, in seconds since the epoch.
+        'cached_at REAL NOT NULL',
+        'accessed_at REAL NOT NULL',
     ]
+    INDEXES = {
+        'web_cache_host': 'host',
+        'web_cache_accessed_at': 'accessed_at',
+    }
+    # Reads only record their access time if the last recorded access
+    # was at least this many seconds earlier, so most cache hits do
+    # not write to the DB.
+    ACCESS_TIME_RESOLUTION = 60.0
+    # Unreferenced bodies stored within this many seconds are kept by
+    # collect_garbage, since their rows may not be committed yet.
+    ORPHAN_GRACE_PERIOD = 3600.0
+
+    def __init__(self, db_name='web_cache.db', reset=False,
+                 busy_timeout=30.0, commit_interval=0.0, blob_dir=None,
+                 eviction_policy=None, session_pool=None):
+        """Arguments:
+          db_name: the SQLite DB file to use, or ':memory:'.  A relative
+            path is resolved when the cache is created, so connections
+            that other threads open later (e.g., inside a scraper's
+            dir_context) use the same file.
+          reset: if True, drop any existing cache table and bodies.
+          busy_timeout: how long in seconds to wait for another
+            connection's write lock before failing with "database is
+            locked".
+          commit_interval: how long in seconds writes may stay
+            uncommitted so they can be committed together.  Pending
+            writes are also committed by `flush`, before `fetch`
+            sends a request, and when a `batch` scope exits.
+          blob_dir: the directory in which to store response bodies.
+            Defaults to the DB file name with a `.blobs` suffix, e.g.
+            `web_cache.blobs` for `web_cache.db`.  A relative path is
+            resolved when the cache is created.  Bodies for an
+            in-memory DB are kept in memory.
+          eviction_policy: an EvictionPolicy to apply as responses are
+            stored, and by default in `collect_garbage`.
+          session_pool: the SessionPool whose per-host sessions `fetch`
+            uses when not given a session.  Defaults to a SessionPool
+            with default settings.
+
+        Only response metadata is stored in the DB.  Bodies are stored
+        in a BlobStore keyed by their SHA-256, so identical bodies are
+        stored once, and revalidating a response only rewrites its
+        metadata.
+
+        Each thread uses its own connection to a file DB, in WAL mode
+        so readers do not block the writer.  An in-memory DB exists
+        only for its connection, so its one connection is shared by
+        all threads under a lock.
 
-    def __init__(self, db_name='web_cache.db', reset=False):
+        """
         # Set up DB connection.
+        if db_name != ':memory:':
+            db_name = os.path.abspath(db_name)
         _logger.info(f'Connecting web cache to DB: {db_name}')
         self.db_name = db_name
-        self.conn = sqlite3.connect(db_name)
-        self.conn.row_factory = sqlite3.Row
-        self.cursor = self.conn.cursor()
-        if reset:
-            _logger.debug('Resetting DB table')
-            self.cursor.execute('DROP TABLE IF EXISTS web_cache')
-        _logger.debug('Creating DB table')
-        self.cursor.execute(
-            'CREATE TABLE IF NOT EXISTS web_cache\n'
-            f'({", ".join(self.SCHEMA)})')
+        self.busy_timeout = busy_timeout
+        self.commit_interval = commit_interval
+        self.eviction_policy = eviction_policy
+        self.sessions = session_pool or SessionPool()
+        self._last_gc = time.monotonic()
+        self._local = threading.local()
+        self._shared_conn = None
+        # Only the shared connection needs serializing.
+        self._lock = nullcontext()
+        if db_name == ':memory:':
+            self._shared_conn = self._connect()
+            self._lock = threading.RLock()
+            self.blob_dir = None
+            self.blobs = MemoryBlobStore()
+        else:
+            # Like db_name, resolved now, since scrapers change the cwd.
+            self.blob_dir = Path(os.path.abspath(
+                blob_dir or Path(db_name).with_suffix('.blobs')))
+            self.blobs = BlobStore(self.blob_dir)
+        with self._lock:
+            version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+            if version != self.SCHEMA_VERSION:
+                _logger.info(f'Dropping web cache schema version {version}')
+                reset = True
+            if reset:
+                _logger.debug('Resetting DB table')
+                self.conn.execute('DROP TABLE IF EXISTS web_cache')
+                self.blobs.clear()
+            _logger.debug('Creating DB table')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS web_cache\n'
+                f'({", ".join(self.SCHEMA)})')
+            for index, column in self.INDEXES.items():
+                self.conn.execute(f'CREATE INDEX IF NOT EXISTS {index} '
+                                  f'ON web_cache ({column})')
+            self.conn.execute(f'PRAGMA user_version={self.SCHEMA_VERSION}')
+            self.conn.commit()
 
     def __repr__(self):
         return f'<{self.__class__.__name__} db={self.db_name}>'
 
-    def delete_from_cache(self, where):
-        """Remove the requested rows from the cache.
+    def __getstate__(self):
+        # SQLite connections cannot be shared across processes, so a
+        # pickled WebCache (e.g., one sent to a worker process)
+        # reconnects to the same DB when unpickled.
+        return {
+            'db_name': self.db_name,
+            'busy_timeout': self.busy_timeout,
+            'commit_interval': self.commit_interval,
+            'blob_dir': self.blob_dir,
+            'eviction_policy': self.eviction_policy,
+            'session_pool': self.sessions,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_name, timeout=self.busy_timeout,
+                               check_same_thread=self.db_name != ':memory:')
+        conn.row_factory = sqlite3.Row
+        if self.db_name != ':memory:':
+            conn.execute('PRAGMA journal_mode=WAL')
+            # In WAL mode, this only syncs on checkpoints rather than
+            # on every commit, and is still safe from corruption.
+            conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @property
+    def conn(self):
+        """The calling thread's DB connection."""
+        if self._shared_conn is not None:
+            return self._shared_conn
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            _logger.debug(f'Opening connection to {self.db_name}')
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _write(self, sql, params=()):
+        """Execute a modifying statement, and commit it if due."""
+        with self._lock:
+            self.conn.execute(sql, params)
+            if getattr(self._local, 'pending_since', None) is None:
+                self._local.pending_since = time.monotonic()
+            if (
+                    not getattr(self._local, 'batch_depth', 0)
+                    and time.monotonic() - self._local.pending_since
+                    >= self.commit_interval):
+                self.flush()
+
+    def flush(self):
+        """Commit the calling thread's pending writes."""
+        with self._lock:
+            if getattr(self._local, 'pending_since', None) is not None:
+                self.conn.commit()
+                self._local.pending_since = None
+
+    @contextmanager
+    def batch(self):
+        """This context manager defers commits of this thread's writes
+        until the outermost batch scope exits, e.g. to delete or
+        insert many rows with a single commit.
+        """
+        self._local.batch_depth = getattr(self._local, 'batch_depth', 0) + 1
+        try:
+            yield self
+        finally:
+            self._local.batch_depth -= 1
+            if not self._local.batch_depth:
+                self.flush()
+
+    def close(self):
+        """Commit pending writes and close the calling thread's connection.
+        It will be reopened if the cache is used again.
+        """
+        self.flush()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def delete_from_cache(self, where, params=()):
+        """Remove the requested rows from the cache.  Their bodies are
+        removed by the next `collect_garbage`.
 
         Arguments:
           where: a string WHERE clause in the schema of this DB.
+          params: optional, values for placeholders in `where`.
 
         Example:
           web_cache.delete_from_cache(where='url LIKE "%missisippi%"')
+          web_cache.delete_from_cache(where='host = ?',
+                                      params=('www.example.com',))
+
+        """
+        with self.batch():
+            self._write('DELETE FROM web_cache '
+                        f'WHERE {where}', params)
+
+    def get_stats(self):
+        """Return a dict of the number of entries and bytes stored, in
+        total and (under 'hosts') for each host.
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT host, COUNT(*) AS entries, SUM(size) AS bytes,'
+                ' MIN(accessed_at) AS oldest_access'
+                ' FROM web_cache GROUP BY host').fetchall()
+        return {
+            'entries': sum(row['entries'] for row in rows),
+            'bytes': sum(row['bytes'] for row in rows),
+            'hosts': {
+                row['host']: {
+                    'entries': row['entries'],
+                    'bytes': row['bytes'],
+                    'oldest_access': row['oldest_access'],
+                }
+                for row in rows
+            },
+        }
+
+    def _find_lru_excess(self, limit, where='1', params=()):
+        """Return the rows beyond the most recently used ones that fit
+        within limit bytes.
+        """
+        rows = self.conn.execute(
+            'SELECT url, size FROM web_cache '
+            f'WHERE {where} ORDER BY accessed_at DESC', params)
+        total = 0
+        excess = []
+        for row in rows:
+            total += row['size']
+            if total > limit:
+                excess.append(row)
+        return excess
+
+    def _find_evictions(self, policy):
+        """Return the rows that policy evicts."""
+        evict = []
+        if policy.max_age is not None:
+            evict.extend(self.conn.execute(
+                'SELECT url, size FROM web_cache WHERE cached_at < ?',
+                (time.time() - policy.max_age,)))
+        if policy.max_host_bytes is not None:
+            for row in self.conn.execute(
+                    'SELECT host, SUM(size) AS bytes'
+                    ' FROM web_cache GROUP BY host').fetchall():
+                limit = policy.get_host_limit(row['host'])
+                if limit is not None and row['bytes'] > limit:
+                    evict.extend(self._find_lru_excess(
+                        limit, 'host = ?', (row['host'],)))
+        if policy.max_bytes is not None:
+            evict.extend(self._find_lru_excess(policy.max_bytes))
+        return {row['url']: row['size'] for row in evict}
+
+    def _delete_orphaned_blobs(self):
+        """Delete bodies no row refers to, and return how many."""
+        referenced = set(
+            row[0] for row in self.conn.execute(
+                'SELECT DISTINCT body_digest FROM web_cache'))
+        cutoff = time.time() - self.ORPHAN_GRACE_PERIOD
+        deleted = 0
+        for digest, stored_at in self.blobs.digests():
+            if digest not in referenced and stored_at < cutoff:
+                self.blobs.delete(digest)
+                deleted += 1
+        return deleted
+
+    def collect_garbage(self, policy=None, vacuum=False):
+        """Evict entries according to the eviction policy, and delete
+        bodies no longer referenced.
+
+        Arguments:
+          policy: optional, the EvictionPolicy to apply.  Defaults to
+            the cache's eviction_policy.  If neither is set, only
+            unreferenced bodies are deleted.
+          vacuum: if True, also rebuild the DB file to release the
+            space freed by deleted rows.
+
+        Returns a dict of the number of entries evicted, their bytes,
+        and the number of bodies deleted.
 
         """
-        self.cursor.execute('DELETE FROM web_cache '
-                            f'WHERE {where}')
-        self.conn.commit()
+        policy = policy or self.eviction_policy
+        self._last_gc = time.monotonic()
+        with self._lock:
+            evict = self._find_evictions(policy) if policy else {}
+            with self.batch():
+                for url in evict:
+                    self._write('DELETE FROM web_cache WHERE url = ?', (url,))
+            blobs = self._delete_orphaned_blobs()
+            if vacuum:
+                self.conn.execute('VACUUM')
+        stats = {
+            'entries': len(evict),
+            'bytes': sum(evict.values()),
+            'blobs': blobs,
+        }
+        _logger.info(f'Collected web cache garbage: {stats}')
+        return stats
+
+    def _maybe_collect_garbage(self):
+        if (
+                self.eviction_policy is not None
+                and self.eviction_policy.interval is not None
+                and time.monotonic() - self._last_gc
+                >= self.eviction_policy.interval):
+            self.collect_garbage()
+
+    def _record_access(self, row):
+        now = time.time()
+        if now - row['accessed_at'] >= self.ACCESS_TIME_RESOLUTION:
+            self._write('UPDATE web_cache SET accessed_at = ? WHERE url = ?',
+                        (now, row['url']))
+
+    def _get_row(self, url):
+        with self._lock:
+            return self.conn.execute(
+                'SELECT *'
+                ' FROM web_cache WHERE url = ?', (url,)).fetchone()
 
     def get_cached_response(self, url):
-        self.cursor.execute(
-            'SELECT *'
-            ' FROM web_cache WHERE url = ?', (url,))
-        row = self.cursor.fetchone()
+        """Return a dict of the url, etag, last_modified and (as a
+        CachedResponse) response of the cached URL, or None if it
+        is not cached.
+
+        The response's body is only read from the blob store when it
+        is used.
+        """
+        row = self._get_row(url)
+        if row:
+            digest = row['body_digest']
+            if not self.blobs.contains(digest):
+                _logger.warning(f'Missing cached body for {url}')
+                return None
+            try:
+                response = CachedResponse(
+                    row['response'], lambda: self.blobs.get(digest),
+                    body_digest=digest)
+            except ValueError as e:
+                _logger.warning(f'Ignoring cached response for {url}: {e}')
+                return None
+            self._record_access(row)
+            return {
+                'url': row['url'],
+                'etag': row['etag'],
+                'last_modified': row['last_modified'],
+                'response': response,
+            }
+
+    def get_cached_body(self, url):
+        """Return the cached body of the URL as a read-only buffer, or None
+        if it is not cached.
+
+        Large uncompressed bodies (e.g. PDFs) are memory-mapped rather
+        than copied into memory.
+        """
+        row = self._get_row(url)
         if row:
-            resp = dict(zip(row.keys(), row))
-            if resp['response'] is not None:
-                resp['response'] = pickle.loads(resp['response'])
-            return resp
+            self._record_access(row)
+            return self.blobs.open(row['body_digest'])
 
-    def cache_response(self, url, response, force_cache):
+    def _get_validators(self, url, response, force_cache):
+        """Return the response's ETag and Last-Modified values for
+        revalidating it, or None if it should not be cached.
+        """
         cache_control = parse_cache_control(response)
         if cache_control.get('no-store'):
             if not force_cache:
                 _logger.debug('Skipping cache: response has '
                               'Cache-Control: no-store')
-                return
+                return None
             _logger.debug('Caching: response has Cache-Control: no-store, '
                           'but force_cache is set')
 
@@ -150,35 +602,99 @@ class WebCache(object):
             else:
                 _logger.debug(f'Unable to cache {url}: '
                               'No ETag or Last-Modified header returned')
-                return
-        self.cursor.execute(
+                return None
+        return etag, last_modified
+
+    def _store_row(self, url, response, etag, last_modified, body_digest):
+        meta = _dump_response_meta(response)
+        now = time.time()
+        self._write(
             'INSERT OR REPLACE INTO web_cache VALUES'
-            ' (:url, :etag, :last_modified, :response)',
+            ' (:url, :etag, :last_modified, :response, :body_digest,'
+            ' :host, :size, :cached_at, :accessed_at)',
             {
                 'url': url,
                 'etag': etag,
                 'last_modified': last_modified,
-                'response': pickle.dumps(response),
+                'response': meta,
+                'body_digest': body_digest,
+                'host': urlsplit(url).hostname or '',
+                'size': len(meta) + self.blobs.size(body_digest),
+                'cached_at': now,
+                'accessed_at': now,
             })
-        self.conn.commit()
+        self._maybe_collect_garbage()
+
+    def cache_response(self, url, response, force_cache):
+        validators = self._get_validators(url, response, force_cache)
+        if validators:
+            # Store the body first, so the row never refers to a
+            # missing blob.
+            body_digest = self.blobs.put(response.content)
+            self._store_row(url, response, *validators, body_digest)
+
+    def cache_file(self, url, response, path, force_cache,
+                   body_digest=None):
+        """Cache the response, whose body has been saved to the file at
+        path, without reading the body into memory.
+
+        Arguments:
+          url: the cache key.
+          response: the requests.Response.
+          path: the file containing the response body.
+          force_cache: as in `fetch`.
+          body_digest: optional, the SHA-256 hex digest of the file,
+            if already computed.
+
+        """
+        validators = self._get_validators(url, response, force_cache)
+        if validators:
+            body_digest = self.blobs.put_file(path, body_digest)
+            self._store_row(url, response, *validators, body_digest)
+
+    def _save_body(self, response, to_file):
+        """Stream the response body to the file in chunks, and return its
+        SHA-256 hex digest.  The file is only replaced once the whole
+        body has been received.
+        """
+        to_file = Path(to_file)
+        partial = to_file.with_name(f'.{to_file.name}.part')
+        hasher = hashlib.sha256()
+        try:
+            with response, partial.open('wb') as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    hasher.update(chunk)
+                    f.write(chunk)
+            os.replace(str(partial), str(to_file))
+        except BaseException:
+            if partial.exists():
+                partial.unlink()
+            raise
+        response.body_digest = hasher.hexdigest()
+        return response.body_digest
 
     def touch_response(self, cache_key, cached_response, new_headers):
         """Update the headers in the cached response for cache freshness."""
         cached_response.headers.update(new_headers)
-        self.cursor.execute(
+        meta = _dump_response_meta(cached_response)
+        now = time.time()
+        self._write(
             'UPDATE web_cache '
-            'SET response=:response '
+            'SET response=:response, '
+            'size=size - LENGTH(response) + :meta_size, '
+            'cached_at=:now, accessed_at=:now '
             'WHERE url=:url',
             {
                 'url': cache_key,
-                'response': pickle.dumps(cached_response),
+                'response': meta,
+                'meta_size': len(meta),
+                'now': now,
             })
-        self.conn.commit()
 
     def fetch(self, url, force_remote=False, force_cache=False,
               cache_only=False, method='GET', headers={}, params={},
               data={}, files={}, cookies={}, session=None,
-              session_kwargs={}, **kwargs):
+              session_kwargs={}, to_file=None, timeout=None, **kwargs):
         """Retrieve a URL from the cache, or retrieve the URL from the web and
         store the response into a cache.
 
@@ -196,14 +712,27 @@ class WebCache(object):
           files: files for POST requestsd.
           cookies: request cookies.
           session: the requests.Session object to use. If one is not
-            provided, a new one will be created.
+            provided, the cache's pooled session for the URL's host
+            is used.
           session_args: dict of arguments to use if constructing a
-            requests.Session object.
-
-        Returns a requests.Response object.
+            requests.Session object.  If set, a new session is used
+            rather than a pooled one.
+          timeout: the (connect, read) timeout in seconds for the
+            request.  Defaults to the session pool's timeout.
+          to_file: if set, the path of a file to which to save the
+            response body.  The body is streamed to the file and the
+            cache in chunks, rather than read into memory.
+
+        Returns a requests.Response object.  If to_file is set, its body
+        has been consumed, and its `body_digest` is the SHA-256 hex
+        digest of the saved file.
 
         """
-        session = session or requests.Session(**session_kwargs)
+        if session is None:
+            if session_kwargs:
+                session = requests.Session(**session_kwargs)
+            else:
+                session = self.sessions.get_session(url)
         request = session.prepare_request(
             requests.Request(method, url=url, headers=headers,
                              cookies=cookies, params=params, data=data,
@@ -213,11 +742,19 @@ class WebCache(object):
         cache_key, _ = urldefrag(request.url)
         cached = None
         revalidating = False
+        send_kwargs = {'timeout': timeout or self.sessions.timeout}
+        if to_file:
+            send_kwargs['stream'] = True
+
+        # Don't hold the DB's write lock while waiting on the network.
+        self.flush()
 
         # HTTP only cache GETs
         if method != 'GET' or force_remote:
-            response = session.send(request)
+            response = session.send(request, **send_kwargs)
             response.raise_for_status()
+            if to_file:
+                self._save_body(response, to_file)
             return response
 
         cached = self.get_cached_response(cache_key)
@@ -227,11 +764,11 @@ class WebCache(object):
             if cache_only:
                 _logger.debug('Requested cache_only: returning cached'
                               ' response')
-                return cached['response']
+                return self._return_cached(cached['response'], to_file)
             # Do we know the cached value is good without revalidating?
             if is_fresh(cached['response']):
                 _logger.debug('Cache hit: returning cached response')
-                return cached['response']
+                return self._return_cached(cached['response'], to_file)
             # Prepare to revalidate.
             _logger.debug('Revalidating stale cached response')
             if cached['etag']:
@@ -249,18 +786,30 @@ class WebCache(object):
 
         # For cache misses and revalidation, we need to contact the server.
         _logger.debug(f'Sending request: {url}')
-        response = session.send(request)
+        response = session.send(request, **send_kwargs)
 
         if revalidating:
             if response.status_code == 304:
                 _logger.debug('Still valid: returning cached response')
+                response.close()
                 # Update the cached headers
                 self.touch_response(cache_key, cached['response'],
                                     response.headers)
-                return cached['response']
+                return self._return_cached(cached['response'], to_file)
             _logger.debug('No longer valid; replacing cached response')
 
         response.raise_for_status()
-        self.cache_response(cache_key, response, force_cache=force_cache)
+        if to_file:
+            body_digest = self._save_body(response, to_file)
+            self.cache_file(cache_key, response, to_file,
+                            force_cache=force_cache, body_digest=body_digest)
+        else:
+            self.cache_response(cache_key, response, force_cache=force_cache)
         response.headers['x-new-response'] = '1'
         return response
+
+    def _return_cached(self, response, to_file):
+        if to_file:
+            if not self.blobs.copy_to(response.body_digest, to_file):
+                raise RuntimeError(f'Missing cached body for {response.url}')
+        return response
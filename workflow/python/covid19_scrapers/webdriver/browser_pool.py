@@ -0,0 +1,189 @@
+import atexit
+from contextlib import contextmanager
+import logging
+import os
+import threading
+
+from selenium.common.exceptions import WebDriverException
+from seleniumwire import webdriver
+
+from covid19_scrapers.webdriver.load_profile import LoadProfile
+
+
+_logger = logging.getLogger(__name__)
+
+
+def make_chrome_driver(headless=True, load_profile=None):
+    """Returns a new selenium-wire Chrome webdriver, with the launch settings of the
+    load_profile, if given.
+    """
+    seleniumwire_options = {
+        'connection_keep_alive': False,
+        'connection_timeout': 20
+    }
+    options = webdriver.ChromeOptions()
+    options.add_argument('window-size=1920,1080')
+    if headless is True:
+        options.add_argument('--disable-extensions')
+        options.add_argument('--headless')
+        options.add_argument('--disable-gpu')
+        options.add_argument('--no-sandbox')
+    if load_profile:
+        load_profile.configure_options(options)
+    return webdriver.Chrome(options=options, seleniumwire_options=seleniumwire_options)
+
+
+class BrowserPool(object):
+    """BrowserPool keeps started webdrivers between WebdriverRunner runs, so that
+    each run does not pay to start a new browser and selenium-wire proxy.
+
+    Usage:
+        pool = BrowserPool(size=2)
+        with pool.driver() as driver:
+            driver.get(url)
+
+    Drivers are reset when returned to the pool: the browser is sent to a blank page,
+    and its cookies, storage, blocked URLs, captured requests and request capture scope
+    are cleared.
+    A driver is quit instead of being reused if it raised a WebDriverException (e.g.,
+    the browser crashed), or if it has been used `max_uses` times.
+
+    Params:
+        size: the number of idle drivers to keep.
+        max_uses: the number of runs after which a driver is replaced.
+        factory: a function returning a new driver.
+    """
+
+    def __init__(self, size=1, max_uses=10, factory=make_chrome_driver):
+        self.size = size
+        self.max_uses = max_uses
+        self.factory = factory
+        self._idle = []
+        self._uses = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'BrowserPool(size={self.size}, max_uses={self.max_uses}, idle={len(self._idle)})'
+
+    def acquire(self):
+        """Returns an idle driver, or a new one if none are idle."""
+        with self._lock:
+            if self._idle:
+                driver = self._idle.pop()
+                _logger.debug(f'Reusing pooled driver: uses={self._uses[id(driver)]}')
+                return driver
+        _logger.debug('Starting new driver')
+        driver = self.factory()
+        with self._lock:
+            self._uses[id(driver)] = 0
+        return driver
+
+    def release(self, driver, broken=False):
+        """Returns the driver to the pool after resetting it, or quits it if it is
+        broken, worn out, or the pool is full.
+        """
+        with self._lock:
+            self._uses[id(driver)] += 1
+            worn_out = self._uses[id(driver)] >= self.max_uses
+        if not broken and not worn_out:
+            try:
+                self.reset(driver)
+            except WebDriverException as e:
+                _logger.warning(f'Unable to reset driver: {e}')
+                broken = True
+        with self._lock:
+            if not broken and not worn_out and len(self._idle) < self.size:
+                self._idle.append(driver)
+                return
+            del self._uses[id(driver)]
+        self._quit(driver)
+
+    @staticmethod
+    def reset(driver):
+        """Clears the state a previous run left in the driver."""
+        driver.switch_to.default_content()
+        driver.get('about:blank')
+        try:
+            # Clears cookies and storage for all sites, not just the current one.
+            driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+            driver.execute_cdp_cmd('Storage.clearDataForOrigin',
+                                   {'origin': '*', 'storageTypes': 'all'})
+            LoadProfile.clear(driver)
+        except (AttributeError, WebDriverException):
+            driver.delete_all_cookies()
+        del driver.requests
+        try:
+            del driver.scopes
+        except AttributeError:
+            pass
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            _logger.warning(f'Unable to quit driver: {e}')
+
+    @contextmanager
+    def driver(self):
+        """Context manager that acquires a driver, and releases it on exit. The
+        driver is treated as broken if a WebDriverException escapes the scope.
+        """
+        driver = self.acquire()
+        broken = False
+        try:
+            yield driver
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            self.release(driver, broken=broken)
+
+    def warm(self):
+        """Starts drivers until `size` are idle."""
+        while len(self._idle) < self.size:
+            driver = self.factory()
+            with self._lock:
+                self._uses[id(driver)] = 0
+                self._idle.append(driver)
+
+    def close(self):
+        """Quits all idle drivers."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            for driver in idle:
+                del self._uses[id(driver)]
+        for driver in idle:
+            self._quit(driver)
+
+
+_DEFAULT_POOLS = {}
+_DEFAULT_POOLS_LOCK = threading.Lock()
+
+
+def _reset_default_pools():
+    # A forked child must not share its parent's browsers, or quit them at exit.
+    global _DEFAULT_POOLS_LOCK
+    for pool in _DEFAULT_POOLS.values():
+        pool._idle = []
+        pool._uses = {}
+        pool._lock = threading.Lock()
+    _DEFAULT_POOLS.clear()
+    _DEFAULT_POOLS_LOCK = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_default_pools)
+
+
+def get_default_pool(headless=True, load_profile=None):
+    """Returns this process's shared BrowserPool for headless or headed Chrome
+    drivers, started with the launch settings of the load_profile. Its drivers are
+    quit when the process exits.
+    """
+    key = (headless, load_profile.launch_key() if load_profile else None)
+    with _DEFAULT_POOLS_LOCK:
+        if key not in _DEFAULT_POOLS:
+            pool = BrowserPool(factory=lambda: make_chrome_driver(headless, load_profile))
+            atexit.register(pool.close)
+            _DEFAULT_POOLS[key] = pool
+        return _DEFAULT_POOLS[key]
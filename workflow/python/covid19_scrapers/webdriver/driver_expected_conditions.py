@@ -1,11 +1,23 @@
 import pydash
 from selenium.common.exceptions import InvalidArgumentException
+from selenium.webdriver.common.by import By
 
 
 class DriverExpectedConditionsException(Exception):
     pass
 
 
+class ErrorMarkerFound(DriverExpectedConditionsException):
+    pass
+
+
+# Elements that dashboards show when they fail to load, so waits for their content can
+# fail at once instead of timing out.
+ERROR_MARKER_LOCATORS = [
+    (By.ID, 'tabBootErrTitle'),  # Tableau's "Unexpected Error" dialog.
+]
+
+
 class NumberOfElementsIsGreaterOrEqualTo(object):
     def __init__(self, locator, number):
         self.locator = locator
@@ -21,12 +33,33 @@ class NumberOfElementsIsGreaterOrEqualTo(object):
 
 
 class WaitForResponseFromRequest(object):
-    def __init__(self, find_by, wait_for_response_body=True):
+    def __init__(self, find_by, wait_for_response_body=True, request_index=None):
         self.find_by = find_by
         self.wait_for_response_body = wait_for_response_body
+        self.request_index = request_index
 
     def __call__(self, driver):
-        found_request = pydash.find(driver.requests, self.find_by)
+        if self.request_index is not None:
+            found_request = self.request_index.find(driver, self.find_by)
+        else:
+            found_request = pydash.find(driver.requests, self.find_by)
         if self.wait_for_response_body:
             return pydash.get(found_request, 'response.body', None)
         return found_request and found_request.response
+
+
+class FailOnErrorMarkers(object):
+    """Wraps a condition, raising ErrorMarkerFound if any of the error_locators are
+    present instead of waiting for it.
+    """
+
+    def __init__(self, condition, error_locators=ERROR_MARKER_LOCATORS):
+        self.condition = condition
+        self.error_locators = error_locators
+
+    def __call__(self, driver):
+        for locator in self.error_locators:
+            elements = driver.find_elements(*locator)
+            if elements:
+                raise ErrorMarkerFound(f'Page shows error marker {locator}: {elements[0].text}')
+        return self.condition(driver)
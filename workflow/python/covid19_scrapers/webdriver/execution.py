@@ -1,16 +1,17 @@
 import abc
 import enum
 import logging
-from copy import deepcopy
+import time
+from copy import copy
 
-import pydash
 from bs4 import BeautifulSoup
 from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.support import expected_conditions
 from selenium.webdriver.support.ui import WebDriverWait
 
 from covid19_scrapers.webdriver.driver_expected_conditions import (
-    NumberOfElementsIsGreaterOrEqualTo, WaitForResponseFromRequest)
+    ERROR_MARKER_LOCATORS, FailOnErrorMarkers, NumberOfElementsIsGreaterOrEqualTo,
+    WaitForResponseFromRequest)
 from covid19_scrapers.utils.misc import as_list
 
 _logger = logging.getLogger(__name__)
@@ -24,32 +25,52 @@ class WebdriverSteps(object):
 
     Optionally, once an execution step has been created, an instance method, for adding
     the execution step, can be added to this class as (kinda) syntactic sugar.
+
+    WebdriverSteps are immutable: `add_step` returns a new instance that links back to
+    this one, rather than copying it, so chains share their common prefixes and can be
+    built once (e.g., at import time) and extended or run any number of times.
     """
 
     def __init__(self):
-        self._steps = []
+        self._previous = None
+        self._step = None
+        self._length = 0
 
     def add_step(self, step):
-        clone = deepcopy(self)
-        clone._steps.append(step)
+        clone = copy(self)
+        clone._previous = self
+        clone._step = step
+        clone._length = self._length + 1
         return clone
 
     def steps(self):
-        return self._steps
+        """Returns a tuple of the steps, in the order they were added."""
+        steps = []
+        node = self
+        while node._length:
+            steps.append(node._step)
+            node = node._previous
+        return tuple(reversed(steps))
 
     def go_to_url(self, url):
         return self.add_step(GoToURL(url))
 
-    def wait_for_presence_of_elements(self, element_locators, timeout=60):
-        return self.add_step(WaitFor(element_locators, timeout=timeout))
+    def wait_for_presence_of_elements(self, element_locators, timeout=60,
+                                      error_locators=ERROR_MARKER_LOCATORS, wait_key=None):
+        return self.add_step(WaitFor(element_locators, timeout=timeout, error_locators=error_locators,
+                                     wait_key=wait_key))
 
-    def wait_for_number_of_elements(self, element_locators, number_of_elements, timeout=60):
+    def wait_for_number_of_elements(self, element_locators, number_of_elements, timeout=60,
+                                    error_locators=ERROR_MARKER_LOCATORS, wait_key=None):
         return self.add_step(
             WaitFor(element_locators, condition=Condition.NUMBER_OF_ELEMENTS,
-                    number_of_elements=number_of_elements, timeout=timeout))
+                    number_of_elements=number_of_elements, timeout=timeout,
+                    error_locators=error_locators, wait_key=wait_key))
 
-    def wait_for_visibility_of_elements(self, element_locators, timeout=60):
-        return self.add_step(WaitFor(element_locators, condition=Condition.VISIBILITY, timeout=timeout))
+    def wait_for_visibility_of_elements(self, element_locators, timeout=60,
+                                        error_locators=ERROR_MARKER_LOCATORS, wait_key=None):
+        return self.add_step(WaitFor(element_locators, condition=Condition.VISIBILITY, timeout=timeout,
+                                     error_locators=error_locators, wait_key=wait_key))
 
     def find_element_by_xpath(self, xpath, ignore_missing=False):
         return self.add_step(FindElement('xpath', xpath, ignore_missing))
@@ -63,8 +84,8 @@ class WebdriverSteps(object):
     def get_page_source(self, as_soup=True):
         return self.add_step(GetPageSource(as_soup))
 
-    def find_request(self, key, find_by):
-        return self.add_step(FindRequest(key, find_by))
+    def find_request(self, key, find_by, error_locators=ERROR_MARKER_LOCATORS, wait_key=None):
+        return self.add_step(FindRequest(key, find_by, error_locators=error_locators, wait_key=wait_key))
 
     def clear_request_history(self):
         return self.add_step(ClearRequests())
@@ -78,6 +99,9 @@ class WebdriverSteps(object):
     def set_request_capture_scope(self, scope):
         return self.add_step(SetRequestCaptureScope(scope))
 
+    def use_load_profile(self, load_profile):
+        return self.add_step(UseLoadProfile(load_profile))
+
 
 class ExecutionStepException(Exception):
     pass
@@ -142,26 +166,53 @@ class Condition(enum.Enum):
     VISIBILITY = 'visibility'
 
 
-def wait_for_conditions_on_webdriver(driver, conditions, timeout):
+def wait_for_conditions_on_webdriver(driver, conditions, timeout, *, wait_history=None, key=None,
+                                     error_locators=()):
+    """Waits for the conditions, failing at once if any of the error_locators are present.
+
+    If a `WaitHistory` is given, the timeout is adapted to how long the wait (identified
+    by key) took in past runs, and its time is recorded.
+    """
+    poll_frequency = 0.5
+    if wait_history is not None:
+        timeout = wait_history.get_timeout(key, timeout)
+        poll_frequency = wait_history.get_poll_frequency(key)
+    if error_locators:
+        conditions = [FailOnErrorMarkers(c, error_locators) for c in as_list(conditions)]
+    start = time.monotonic()
     try:
         for c in as_list(conditions):
-            WebDriverWait(driver, timeout).until(c)
+            WebDriverWait(driver, timeout, poll_frequency=poll_frequency).until(c)
     except TimeoutException:
         _logger.error('Waiting timed out in %s seconds' % timeout)
+        if wait_history is not None:
+            wait_history.record(key, timeout)
         raise
+    if wait_history is not None:
+        wait_history.record(key, time.monotonic() - start)
 
 
 class WaitFor(ExecutionStep):
     """Tells the driver to wait for the given conditions before proceeding to the next steps
+
+    The wait fails at once if any of the error_locators are present, e.g. Tableau's error
+    dialog. `timeout` is the most the wait is allowed; once the runner's `WaitHistory` knows
+    how long it usually takes, it fails sooner.
+
+    The wait's times are recorded under `wait_key` if given, or else under the key the
+    runner gives the step (see `WebdriverContext.wait_key`).
     """
 
-    def __init__(self, element_locators, condition=Condition.PRESENCE, number_of_elements=None, timeout=60):
+    def __init__(self, element_locators, condition=Condition.PRESENCE, number_of_elements=None, timeout=60,
+                 error_locators=ERROR_MARKER_LOCATORS, wait_key=None):
         if condition not in Condition:
             raise ExecutionStepException('Invalid condition, check the `Conditions` enum for valid conditions')
         self.locators = as_list(element_locators)
         self.condition = condition
         self.timeout = timeout
         self.number_of_elements = number_of_elements
+        self.error_locators = error_locators
+        self.wait_key = wait_key
 
     def execute(self, driver, context):
         applied_conditions = None
@@ -177,7 +228,10 @@ class WaitFor(ExecutionStep):
                                   for locator in self.locators]
         else:
             raise ExecutionStepException('Invalid condition, check the `Conditions` enum for valid conditions')
-        wait_for_conditions_on_webdriver(driver, applied_conditions, self.timeout)
+        wait_for_conditions_on_webdriver(
+            driver, applied_conditions, self.timeout, wait_history=context.wait_history,
+            key=self.wait_key or context.wait_key or repr(self),
+            error_locators=self.error_locators)
 
     def __repr__(self):
         return (
@@ -262,14 +316,12 @@ class GetXSessionId(ExecutionStep):
     the `.get_x_session_id()` function.
     """
 
-    def get_session_id_from_seleniumwire(self, driver):
-        responses = [r.response for r in driver.requests if r.response]
-        response_headers = [r.headers for r in responses]
-        return next((h.get('X-Session-Id') for h in response_headers if 'X-Session-Id' in h), None)
+    def get_session_id_from_seleniumwire(self, driver, request_index):
+        return request_index.find_response_header(driver, 'X-Session-Id')
 
     def execute(self, driver, context):
         context.add_to_context(
-            'x_session_id', self.get_session_id_from_seleniumwire(driver))
+            'x_session_id', self.get_session_id_from_seleniumwire(driver, context.request_index))
 
     def __repr__(self):
         return 'GetXSessionId()'
@@ -283,20 +335,34 @@ class FindRequest(ExecutionStep):
         key: the key which the request will be saved to in the `request` variable.
         find_by: function that takes a single seleniumwire.webdriver.request.Request object.
             Requests made by the dricver will then be iterated over and the first request that
-            the function returns truthy for will be saved.
+            the function returns truthy for will be saved. While waiting, each request is only
+            passed to find_by again if its response had not arrived yet.
+        wait_duration: the most time to wait for the request, which is shortened once the
+            runner's `WaitHistory` knows how long it usually takes.
+        error_locators: elements which, if present, mean the request will never be made.
+        wait_key: the key the wait's times are recorded under in the `WaitHistory`, in place
+            of the one the runner gives the step.
     """
 
-    def __init__(self, key, find_by, wait_for_response_body=True, wait_duration=60):
+    def __init__(self, key, find_by, wait_for_response_body=True, wait_duration=60,
+                 error_locators=ERROR_MARKER_LOCATORS, wait_key=None):
         self.key = key
         self.find_by = find_by
         self.wait_for_response_body = wait_for_response_body
         self.wait_duration = wait_duration
+        self.error_locators = error_locators
+        self.wait_key = wait_key
 
     def execute(self, driver, context):
         current = context.get('requests')
         wait_for_conditions_on_webdriver(
-            driver, WaitForResponseFromRequest(self.find_by, self.wait_for_response_body), timeout=self.wait_duration)
-        found_request = pydash.find(driver.requests, self.find_by)
+            driver,
+            WaitForResponseFromRequest(self.find_by, self.wait_for_response_body,
+                                       request_index=context.request_index),
+            timeout=self.wait_duration, wait_history=context.wait_history,
+            key=self.wait_key or context.wait_key or repr(self),
+            error_locators=self.error_locators)
+        found_request = context.request_index.find(driver, self.find_by)
 
         # HACK: Response bodys are lazily loaded so it must get called before adding to context
         if found_request and found_request.response:
@@ -313,11 +379,15 @@ class ClearRequests(ExecutionStep):
     This makes it so that subsequent `find_requests` are slow.
 
     To help with this, this step can be used to clear the existing requests that were
-    made to speed up the `find_requests`
+    made to speed up the `find_requests`. `find_requests` only inspects newly captured
+    requests on each poll, but polls that see new requests (or requests still awaiting
+    responses) fetch the whole capture history from selenium-wire, which cannot return
+    only the newer requests.
     """
 
     def execute(self, driver, context):
         del driver.requests
+        context.request_index.reset()
 
     def __repr__(self):
         return 'ClearRequests()'
@@ -370,3 +440,21 @@ class SetRequestCaptureScope(ExecutionStep):
 
     def __repr__(self):
         return f'SetRequestCaptureScope({self.scope})'
+
+
+class UseLoadProfile(ExecutionStep):
+    """Applies a `LoadProfile`'s blocked URLs and capture scopes to the driver for the rest of
+    the run, in place of the runner's profile. Use it before going to a URL.
+
+    The profile's launch settings (`block_images` and `chrome_args`) only apply to the
+    WebdriverRunner's profile, since they take effect when Chrome starts.
+    """
+
+    def __init__(self, load_profile):
+        self.load_profile = load_profile
+
+    def execute(self, driver, context):
+        self.load_profile.apply(driver)
+
+    def __repr__(self):
+        return f'UseLoadProfile({self.load_profile})'
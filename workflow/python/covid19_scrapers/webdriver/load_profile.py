@@ -0,0 +1,133 @@
+import logging
+
+from selenium.common.exceptions import WebDriverException
+
+
+_logger = logging.getLogger(__name__)
+
+
+# URL patterns for Chrome's Network.setBlockedURLs, which accepts `*` wildcards.
+IMAGE_URL_PATTERNS = ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.svg', '*.webp', '*.ico', '*.bmp']
+FONT_URL_PATTERNS = ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+                     '*fonts.googleapis.com*', '*fonts.gstatic.com*']
+MEDIA_URL_PATTERNS = ['*.mp4', '*.webm', '*.mp3', '*.m4a', '*.ogg', '*.avi']
+TRACKER_URL_PATTERNS = ['*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+                        '*connect.facebook.net*', '*hotjar.com*', '*nr-data.net*',
+                        '*js-agent.newrelic.com*', '*siteimproveanalytics.com*']
+MAP_TILE_URL_PATTERNS = ['*tile.openstreetmap.org*', '*basemaps.cartocdn.com*',
+                         '*services.arcgisonline.com*', '*tiles.mapbox.com*',
+                         '*api.mapbox.com/styles/*']
+
+# Chrome features that scraping does not need.
+DISABLED_FEATURE_ARGS = [
+    '--disable-background-networking',
+    '--disable-component-update',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--disable-translate',
+    '--metrics-recording-only',
+    '--mute-audio',
+    '--no-first-run',
+    '--disable-features=TranslateUI,OptimizationHints,MediaRouter',
+]
+
+
+class LoadProfile(object):
+    """LoadProfile describes which resources a webdriver should load for a page.
+
+    Blocked resources are refused by Chrome itself, so they are neither downloaded nor
+    passed through (and captured by) the selenium-wire proxy.
+
+    Some settings apply when Chrome is started (`block_images` and `chrome_args`), so
+    WebdriverRunner keeps separate browser pools for profiles that differ in them. The
+    rest apply to a running browser, and can also be set for a single `WebdriverSteps`
+    run with `use_load_profile`.
+
+    Params:
+        block_images: block all images, via Chrome's content settings.
+        block_fonts: block web fonts.
+        block_media: block audio and video.
+        block_trackers: block common analytics and tracking scripts.
+        block_map_tiles: block common map tile servers.
+        blocked_url_patterns: additional URL patterns to block, with `*` wildcards.
+        capture_scopes: if set, a list of regexes; selenium-wire only captures
+            requests whose URLs match one of them.
+        chrome_args: additional command line arguments for Chrome.
+    """
+
+    def __init__(self, *, block_images=False, block_fonts=False, block_media=False,
+                 block_trackers=False, block_map_tiles=False, blocked_url_patterns=(),
+                 capture_scopes=None, chrome_args=()):
+        self.block_images = block_images
+        self.block_fonts = block_fonts
+        self.block_media = block_media
+        self.block_trackers = block_trackers
+        self.block_map_tiles = block_map_tiles
+        self.blocked_url_patterns = list(blocked_url_patterns)
+        self.capture_scopes = capture_scopes
+        self.chrome_args = list(chrome_args)
+
+    def __repr__(self):
+        return (
+            f'LoadProfile(block_images={self.block_images}, block_fonts={self.block_fonts}, '
+            f'block_media={self.block_media}, block_trackers={self.block_trackers}, '
+            f'block_map_tiles={self.block_map_tiles}, '
+            f'blocked_url_patterns={self.blocked_url_patterns}, '
+            f'capture_scopes={self.capture_scopes}, chrome_args={self.chrome_args})')
+
+    def launch_key(self):
+        """Returns a hashable key for the settings applied when Chrome starts."""
+        return (self.block_images, tuple(self.chrome_args))
+
+    def blocked_urls(self):
+        """Returns the URL patterns this profile blocks."""
+        patterns = []
+        if self.block_images:
+            # Also block images by URL, in case the content setting is not applied.
+            patterns.extend(IMAGE_URL_PATTERNS)
+        if self.block_fonts:
+            patterns.extend(FONT_URL_PATTERNS)
+        if self.block_media:
+            patterns.extend(MEDIA_URL_PATTERNS)
+        if self.block_trackers:
+            patterns.extend(TRACKER_URL_PATTERNS)
+        if self.block_map_tiles:
+            patterns.extend(MAP_TILE_URL_PATTERNS)
+        patterns.extend(self.blocked_url_patterns)
+        return patterns
+
+    def configure_options(self, options):
+        """Adds this profile's launch settings to the ChromeOptions."""
+        for arg in self.chrome_args:
+            options.add_argument(arg)
+        if self.block_images:
+            options.add_experimental_option(
+                'prefs', {'profile.managed_default_content_settings.images': 2})
+
+    def apply(self, driver):
+        """Applies this profile's blocked URLs and capture scopes to a running driver."""
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.blocked_urls()})
+        except (AttributeError, WebDriverException) as e:
+            _logger.warning(f'Unable to block URLs in driver: {e}')
+        if self.capture_scopes is not None:
+            driver.scopes = self.capture_scopes
+
+    @staticmethod
+    def clear(driver):
+        """Removes any blocked URLs from a running driver."""
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': []})
+
+
+# Loads everything, as a desktop browser would.
+FULL_PROFILE = LoadProfile()
+
+# Loads only what dashboards need to render their data.
+LIGHTWEIGHT_PROFILE = LoadProfile(
+    block_images=True,
+    block_fonts=True,
+    block_media=True,
+    block_trackers=True,
+    block_map_tiles=True,
+    chrome_args=DISABLED_FEATURE_ARGS)
@@ -0,0 +1,174 @@
+import base64
+from contextlib import contextmanager
+from contextvars import ContextVar
+import hashlib
+import json
+import logging
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+from requests.structures import CaseInsensitiveDict
+
+
+_logger = logging.getLogger(__name__)
+
+# WebdriverRunner modes.
+LIVE = 'live'
+RECORD = 'record'
+REPLAY = 'replay'
+MODES = [LIVE, RECORD, REPLAY]
+
+# Recordings are saved in this directory, relative to the working directory (for
+# scrapers, their home_dir).
+RECORDING_DIR = Path('webdriver_recordings')
+RECORDING_FORMAT_VERSION = 1
+
+_MODE = ContextVar('webdriver_mode', default=LIVE)
+
+
+def get_webdriver_mode():
+    """Returns the mode for WebdriverRunners that do not set one."""
+    return _MODE.get()
+
+
+@contextmanager
+def webdriver_mode(mode):
+    """This context manager sets the mode for WebdriverRunners that do not set one,
+    within its scope:
+      LIVE: run steps in a browser.
+      RECORD: run steps in a browser, and save the results.
+      REPLAY: return the saved results, without starting a browser.
+    """
+    if mode not in MODES:
+        raise ValueError(f'Invalid webdriver mode: {mode}')
+    token = _MODE.set(mode)
+    try:
+        yield
+    finally:
+        _MODE.reset(token)
+
+
+class RecordedResponse(object):
+    """A replayed selenium-wire response."""
+
+    def __init__(self, status_code, reason, headers, body):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = CaseInsensitiveDict(headers)
+        self.body = body
+
+    def __repr__(self):
+        return f'RecordedResponse(status_code={self.status_code}, reason={self.reason})'
+
+
+class RecordedRequest(object):
+    """A replayed selenium-wire request, with the attributes scrapers use."""
+
+    def __init__(self, method, url, path, headers, body, response=None):
+        self.method = method
+        self.url = url
+        self.path = path
+        self.headers = CaseInsensitiveDict(headers)
+        self.body = body
+        self.response = response
+
+    def __repr__(self):
+        return f'RecordedRequest(method={self.method}, url={self.url})'
+
+
+def _encode_body(body):
+    if body is None:
+        return None
+    return base64.b64encode(body).decode('ascii')
+
+
+def _decode_body(body):
+    if body is None:
+        return None
+    return base64.b64decode(body)
+
+
+def _dump_request(request):
+    if request is None:
+        return None
+    response = request.response
+    return {
+        'method': request.method,
+        'url': getattr(request, 'url', request.path),
+        'path': request.path,
+        'headers': list(request.headers.items()),
+        'body': _encode_body(request.body),
+        'response': response and {
+            'status_code': response.status_code,
+            'reason': response.reason,
+            'headers': list(response.headers.items()),
+            'body': _encode_body(response.body),
+        },
+    }
+
+
+def _load_request(data):
+    if data is None:
+        return None
+    response = data['response'] and RecordedResponse(
+        status_code=data['response']['status_code'],
+        reason=data['response']['reason'],
+        headers=data['response']['headers'],
+        body=_decode_body(data['response']['body']))
+    return RecordedRequest(
+        method=data['method'],
+        url=data['url'],
+        path=data['path'],
+        headers=data['headers'],
+        body=_decode_body(data['body']),
+        response=response)
+
+
+def get_recording_path(webdriver_steps):
+    """Returns the path of the recording for the steps, which is named by a hash of
+    the steps, so changing the steps (e.g., a URL) requires a new recording.
+    """
+    steps = '\n'.join(repr(step) for step in webdriver_steps.steps())
+    return RECORDING_DIR / (hashlib.sha256(steps.encode('utf8')).hexdigest()[:16] + '.json')
+
+
+def save_recording(webdriver_steps, results):
+    """Saves the WebdriverResults of running the steps, for `load_recording`."""
+    path = get_recording_path(webdriver_steps)
+    page_source = results.page_source
+    as_soup = isinstance(page_source, BeautifulSoup)
+    recording = {
+        'version': RECORDING_FORMAT_VERSION,
+        'steps': [repr(step) for step in webdriver_steps.steps()],
+        'x_session_id': results.x_session_id,
+        'page_source': str(page_source) if page_source is not None else None,
+        'page_source_as_soup': as_soup,
+        'requests': results.requests and {
+            key: _dump_request(request) for key, request in results.requests.items()},
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _logger.info(f'Saving webdriver recording: {path}')
+    path.write_text(json.dumps(recording))
+
+
+def load_recording(webdriver_steps, results_type):
+    """Returns the recorded results of running the steps as a results_type
+    (WebdriverResults).
+
+    Raises FileNotFoundError if there is no recording for the steps.
+    """
+    path = get_recording_path(webdriver_steps)
+    if not path.exists():
+        raise FileNotFoundError(f'No webdriver recording for steps: {path}')
+    _logger.info(f'Replaying webdriver recording: {path}')
+    recording = json.loads(path.read_text())
+    if recording.get('version') != RECORDING_FORMAT_VERSION:
+        raise ValueError(f'Unknown webdriver recording format: {recording.get("version")}')
+    page_source = recording['page_source']
+    if page_source is not None and recording['page_source_as_soup']:
+        page_source = BeautifulSoup(page_source, 'lxml')
+    return results_type(
+        x_session_id=recording['x_session_id'],
+        page_source=page_source,
+        requests=recording['requests'] and {
+            key: _load_request(request) for key, request in recording['requests'].items()})
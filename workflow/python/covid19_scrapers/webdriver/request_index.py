@@ -0,0 +1,176 @@
+import logging
+import re
+
+
+_logger = logging.getLogger(__name__)
+
+
+class _Query(object):
+    """The state of one predicate's search through the captured requests."""
+
+    def __init__(self, predicate):
+        self.predicate = predicate
+        # Positions of requests that may still match: those not yet checked, and those
+        # checked before their response arrived.
+        self.pending = []
+        # The first match, once its response has arrived, after which it is final.
+        self.match = None
+
+
+class RequestIndex(object):
+    """RequestIndex finds captured selenium-wire requests without rescanning the whole
+    capture history on every poll.
+
+    Each predicate only inspects requests captured since its last search, plus earlier
+    ones whose responses had not yet arrived.  A request's response (and body) does not
+    change once it arrives, so requests with responses that did not match are never
+    checked again, and a match with a response is remembered.
+
+    As with `pydash.find(driver.requests, predicate)`, searches return the first
+    matching request in capture order.
+
+    selenium-wire (2.x) can only return the whole capture history, not the requests
+    after a given one, so each update first asks the driver for its `last_request`
+    only.  When that is the last request already seen, and every request seen has its
+    response, nothing can have changed, and the history is not fetched.  Otherwise (new
+    requests, or responses still awaited) the whole history is fetched, and only its
+    new or unsettled requests are checked.
+
+    Usage:
+        index = RequestIndex()
+        request = index.find(driver, lambda r: '/bootstrapSession/' in r.path)
+    """
+
+    def __init__(self):
+        self._queries = {}
+        self._count = 0
+        self._last_id = None
+        self._requests = []
+        # Positions of requests whose responses had not arrived when last fetched.
+        self._unsettled = set()
+
+    def __repr__(self):
+        return f'RequestIndex(requests={self._count}, queries={len(self._queries)})'
+
+    def reset(self):
+        """Forgets all captured requests, e.g. after they are deleted from the driver."""
+        self._queries.clear()
+        self._count = 0
+        self._last_id = None
+        self._requests = []
+        self._unsettled = set()
+
+    @staticmethod
+    def _request_id(request):
+        return getattr(request, 'id', None) or (request.method, request.path)
+
+    def _unchanged(self, driver):
+        if not self._count or self._unsettled:
+            return False
+        try:
+            last_request = driver.last_request
+        except AttributeError:
+            return False
+        return last_request is not None and self._request_id(last_request) == self._last_id
+
+    def update(self, driver):
+        """Fetches the captured requests from the driver, unless none can have changed
+        since the last update, and notes new ones.
+        """
+        if self._unchanged(driver):
+            return
+        requests = driver.requests
+        if len(requests) < self._count or (
+                self._count and self._request_id(requests[self._count - 1]) != self._last_id):
+            _logger.debug('Captured requests were cleared; resetting index')
+            self.reset()
+        new_positions = range(self._count, len(requests))
+        for query in self._queries.values():
+            if query.match is None:
+                query.pending.extend(new_positions)
+        self._unsettled = {position for position in self._unsettled.union(new_positions)
+                           if requests[position].response is None}
+        self._requests = requests
+        self._count = len(requests)
+        if requests:
+            self._last_id = self._request_id(requests[-1])
+
+    def _get_query(self, predicate):
+        query = self._queries.get(predicate)
+        if query is None:
+            query = self._queries[predicate] = _Query(predicate)
+            query.pending.extend(range(self._count))
+        return query
+
+    def _search(self, query):
+        still_pending = []
+        found = None
+        for idx, position in enumerate(query.pending):
+            request = self._requests[position]
+            settled = request.response is not None
+            if query.predicate(request):
+                found = request
+                if settled:
+                    query.match = request
+                    still_pending = []
+                else:
+                    still_pending.extend(query.pending[idx:])
+                break
+            if not settled:
+                still_pending.append(position)
+        if query.match is None:
+            query.pending = still_pending
+        return found
+
+    def find(self, driver, predicate):
+        """Returns the first captured request for which predicate is truthy, or None.
+
+        Params:
+            driver: the selenium-wire webdriver.
+            predicate: function that takes a single seleniumwire request.
+        """
+        self.update(driver)
+        query = self._get_query(predicate)
+        if query.match is not None:
+            return query.match
+        return self._search(query)
+
+    def find_by_path(self, driver, pattern):
+        """Returns the first captured request whose path matches the regex pattern."""
+        return self.find(driver, _PathMatcher(pattern))
+
+    def find_response_header(self, driver, name):
+        """Returns the value of the named header in the first captured response that has
+        it, or None.
+        """
+        request = self.find(driver, _ResponseHeaderMatcher(name))
+        if request:
+            return request.response.headers.get(name)
+
+
+class _PathMatcher(object):
+    def __init__(self, pattern):
+        self.pattern = re.compile(pattern)
+
+    def __call__(self, request):
+        return self.pattern.search(request.path)
+
+    def __eq__(self, other):
+        return isinstance(other, _PathMatcher) and self.pattern == other.pattern
+
+    def __hash__(self):
+        return hash(self.pattern)
+
+
+class _ResponseHeaderMatcher(object):
+    def __init__(self, name):
+        self.name = name
+
+    def __call__(self, request):
+        return request.response is not None and self.name in request.response.headers
+
+    def __eq__(self, other):
+        return isinstance(other, _ResponseHeaderMatcher) and self.name == other.name
+
+    def __hash__(self):
+        return hash(self.name)
@@ -1,7 +1,18 @@
 from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 import logging
+import time
 
-from seleniumwire import webdriver
+from selenium.common.exceptions import WebDriverException
+
+from covid19_scrapers.webdriver.browser_pool import get_default_pool, make_chrome_driver
+from covid19_scrapers.webdriver.execution import GoToURL
+from covid19_scrapers.webdriver.load_profile import LIGHTWEIGHT_PROFILE
+from covid19_scrapers.webdriver.recording import (
+    MODES, RECORD, REPLAY, get_webdriver_mode, load_recording, save_recording)
+from covid19_scrapers.webdriver.request_index import RequestIndex
+from covid19_scrapers.webdriver.wait_history import WAIT_HISTORY_FILE, WaitHistory
 
 
 _logger = logging.getLogger(__name__)
@@ -10,7 +21,22 @@ _logger = logging.getLogger(__name__)
 WebdriverResults = namedtuple('WebdriverResults', [
     'x_session_id',
     'page_source',
-    'requests'
+    'requests',
+    'trace',
+], defaults=(None,))
+
+# How long a step took, by its repr.
+StepTiming = namedtuple('StepTiming', ['step', 'seconds'])
+
+# What a run cost: its StepTimings, its total time, the number of requests the driver
+# captured (None if it does not capture them), the size of the page source and found response bodies, and the browser's
+# JavaScript heap size (None if unavailable).
+WebdriverTrace = namedtuple('WebdriverTrace', [
+    'steps',
+    'seconds',
+    'requests_captured',
+    'response_bytes',
+    'js_heap_bytes',
 ])
 
 
@@ -30,28 +56,49 @@ class WebdriverRunner(object):
             .step2()
             ...)
 
-    After the run, results will be returned as a `WebdriverResults` namedtuple
+    After the run, results will be returned as a `WebdriverResults` namedtuple, whose `trace`
+    is a `WebdriverTrace` of how long each step took and what the run captured. The trace is
+    also logged.
+
+    Independent step chains (e.g. for several dashboards) can be run at the same time with
+    `run_all`, which returns a list of `WebdriverResults`.
+
+    Unless a driver is passed in, each run borrows a driver from a `BrowserPool`, which keeps
+    warm browsers between runs (by default, this process's shared pool).
+
+    Each run applies a `LoadProfile` to the driver, which by default blocks images, fonts,
+    media, trackers and map tiles. Scrapers that need these can pass
+    `load_profile=FULL_PROFILE`.
+
+    In RECORD mode, the results of each run are also saved in the working directory, and
+    in REPLAY mode they are returned from there without starting a browser, so scrapers can
+    be developed and tested offline. Unless a mode is passed in, the mode set by the
+    enclosing `recording.webdriver_mode` context is used (LIVE by default).
+
+    With `adaptive_waits`, the time each wait takes is saved in the working directory, and
+    later runs' waits time out after a few times their usual duration (see `WaitHistory`)
+    instead of after their full timeouts. Each wait is timed separately for each page it
+    runs on (see `WebdriverContext.wait_key`).
     """
 
-    def __init__(self, driver=None, headless=True):
-        '''The headless variable will only be used if a webdriver is not passed in.
+    def __init__(self, driver=None, headless=True, pool=None, load_profile=LIGHTWEIGHT_PROFILE,
+                 mode=None, adaptive_waits=True):
+        '''The headless and pool variables will only be used if a webdriver is not passed in.
         '''
+        if mode is not None and mode not in MODES:
+            raise ValueError(f'Invalid webdriver mode: {mode}')
         self.headless = headless
         self.driver = driver
+        self.pool = pool
+        self.load_profile = load_profile
+        self.mode = mode
+        self.adaptive_waits = adaptive_waits
 
     def _get_default_driver(self, headless):
-        seleniumwire_options = {
-            'connection_keep_alive': False,
-            'connection_timeout': 20
-        }
-        options = webdriver.ChromeOptions()
-        options.add_argument('window-size=1920,1080')
-        if headless is True:
-            options.add_argument('--disable-extensions')
-            options.add_argument('--headless')
-            options.add_argument('--disable-gpu')
-            options.add_argument('--no-sandbox')
-        return webdriver.Chrome(options=options, seleniumwire_options=seleniumwire_options)
+        return make_chrome_driver(headless, self.load_profile)
+
+    def _get_pool(self):
+        return self.pool or get_default_pool(self.headless, self.load_profile)
 
     def format_error_log(self, idx, steps):
         step_number = idx + 1
@@ -59,24 +106,134 @@ class WebdriverRunner(object):
         steps_log = '\n'.join([f'{i}. {step}' for i, step in enumerate(steps, 1)])
         return base + steps_log
 
+    @staticmethod
+    def _get_response_bytes(results):
+        size = len(str(results.page_source)) if results.page_source is not None else 0
+        for request in (results.requests or {}).values():
+            if request is not None and request.response is not None:
+                size += len(request.response.body or b'')
+        return size
+
+    @staticmethod
+    def _count_requests(driver):
+        try:
+            return len(driver.requests)
+        except (AttributeError, WebDriverException):
+            return None
+
+    @staticmethod
+    def _get_js_heap_bytes(driver):
+        try:
+            return driver.execute_script('return window.performance.memory.usedJSHeapSize')
+        except (AttributeError, WebDriverException):
+            return None
+
+    def _make_trace(self, driver, timings, seconds, results):
+        return WebdriverTrace(
+            steps=timings,
+            seconds=seconds,
+            requests_captured=self._count_requests(driver),
+            response_bytes=self._get_response_bytes(results),
+            js_heap_bytes=self._get_js_heap_bytes(driver))
+
+    @staticmethod
+    def log_trace(trace):
+        """Logs the trace's totals and slowest step, and each step's time at debug level."""
+        slowest = max(trace.steps, key=lambda timing: timing.seconds, default=None)
+        _logger.info(
+            f'Webdriver stats: {len(trace.steps)} steps in {trace.seconds:.2f}s, '
+            f'{trace.requests_captured} requests captured, {trace.response_bytes} response bytes, '
+            f'JS heap {trace.js_heap_bytes} bytes'
+            + (f'; slowest step {slowest.seconds:.2f}s: {slowest.step}' if slowest else ''))
+        for timing in trace.steps:
+            _logger.debug(f'Webdriver step took {timing.seconds:.2f}s: {timing.step}')
+
     def run(self, webdriver_steps):
         """Performs all the steps from webdriver_steps after another in order.
 
         returns results as a WebdriverResults namedtuple
         """
-        driver = self.driver or self._get_default_driver(self.headless)
-        ctx = WebdriverContext()
+        mode = self.mode or get_webdriver_mode()
+        if mode == REPLAY:
+            return load_recording(webdriver_steps, WebdriverResults)
+        results = self._run(webdriver_steps)
+        if mode == RECORD:
+            save_recording(webdriver_steps, results)
+        return results
+
+    def run_all(self, webdriver_steps_list, max_browsers=3, return_exceptions=False):
+        """Performs each of the independent webdriver_steps at the same time, each in its own
+        browser from the pool, so they take as long as the slowest rather than the sum of all.
+
+        Selenium drives one window of a browser at a time, and selenium-wire captures the
+        requests of all its windows together, so the steps do not share a browser.
+
+        Params:
+            webdriver_steps_list: a list of `WebdriverSteps`.
+            max_browsers: the most browsers to run at once. The steps are run one after
+                another if this is 1, or if the runner was given a driver.
+            return_exceptions: if True, a failed run's exception is returned in place of
+                its results; otherwise, the first failure is raised once all runs finish.
+
+        returns a list of WebdriverResults in the order of webdriver_steps_list
+        """
+        webdriver_steps_list = list(webdriver_steps_list)
+        workers = 1 if self.driver else max(1, min(max_browsers, len(webdriver_steps_list)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Runs use this thread's webdriver mode.
+            futures = [executor.submit(copy_context().run, self.run, webdriver_steps)
+                       for webdriver_steps in webdriver_steps_list]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+    def _run(self, webdriver_steps):
+        pool = None if self.driver else self._get_pool()
+        driver = self.driver or pool.acquire()
+        ctx = WebdriverContext(
+            wait_history=WaitHistory(WAIT_HISTORY_FILE) if self.adaptive_waits else None)
+        broken = False
+        idx = 0
+        url = None
+        timings = []
+        start = time.monotonic()
         try:
+            if self.load_profile:
+                self.load_profile.apply(driver)
             for idx, step in enumerate(webdriver_steps.steps()):
-                step.execute(driver, ctx)
-            # need to get results before quitting the webdriver, otherwise some requests info will throw errors.
+                if isinstance(step, GoToURL):
+                    url = step.url
+                ctx.wait_key = f'{url} #{idx} {step!r}'
+                step_start = time.monotonic()
+                try:
+                    step.execute(driver, ctx)
+                finally:
+                    timings.append(StepTiming(repr(step), time.monotonic() - step_start))
+            # need to get results before releasing the webdriver, otherwise some requests info will throw errors.
             results = ctx.get_results()
+            results = results._replace(
+                trace=self._make_trace(driver, timings, time.monotonic() - start, results))
+            self.log_trace(results.trace)
+        except WebDriverException:
+            broken = True
+            _logger.debug(self.format_error_log(idx, webdriver_steps.steps()))
+            raise
         except Exception:
             _logger.debug(self.format_error_log(idx, webdriver_steps.steps()))
+            _logger.info(f'Webdriver step {idx + 1} failed after {timings[-1].seconds if timings else 0:.2f}s, '
+                         f'{time.monotonic() - start:.2f}s into the run')
             raise
         finally:
-            if not self.driver:
-                driver.quit()
+            if ctx.wait_history:
+                ctx.wait_history.save()
+            if pool:
+                pool.release(driver, broken=broken)
         return results
 
 
@@ -87,11 +244,20 @@ class WebdriverContext(object):
         1. to hold state during a WebdriverRunner().run()
         2. to process results after a run has been complete
 
-    ExecutionSteps should only interact with it only via the `get` and `add_to_context` methods
+    ExecutionSteps should only interact with it only via the `get` and `add_to_context` methods,
+    the `request_index` used to find captured requests, and the `wait_history` used to time
+    waits (None if waits are not adaptive).
+
+    `wait_key` identifies the running step's waits in the `wait_history`: the URL of the
+    last `GoToURL` step, the step's position and its repr. So the same step (e.g. finding
+    a Tableau bootstrapSession request) keeps separate times for each page it waits on.
     """
 
-    def __init__(self):
+    def __init__(self, wait_history=None):
         self._context = defaultdict(dict)
+        self.request_index = RequestIndex()
+        self.wait_history = wait_history
+        self.wait_key = None
 
     def __contains__(self, key):
         return key in self._context
@@ -0,0 +1,87 @@
+from unittest import mock
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+from covid19_scrapers.webdriver import WebdriverRunner, WebdriverSteps
+from covid19_scrapers.webdriver.browser_pool import BrowserPool
+
+
+class FakeDriver(object):
+    def __init__(self):
+        self.switch_to = mock.Mock()
+        self.urls = []
+        self.requests_cleared = 0
+        self.quit_called = False
+
+    @property
+    def requests(self):
+        return []
+
+    @requests.deleter
+    def requests(self):
+        self.requests_cleared += 1
+
+    def get(self, url):
+        if url == 'http://crash/':
+            raise WebDriverException('chrome not reachable')
+        self.urls.append(url)
+
+    def execute_cdp_cmd(self, cmd, args):
+        pass
+
+    def quit(self):
+        self.quit_called = True
+
+
+class TestBrowserPool(object):
+    def setup(self):
+        self.drivers = []
+
+        def factory():
+            self.drivers.append(FakeDriver())
+            return self.drivers[-1]
+
+        self.pool = BrowserPool(size=1, max_uses=3, factory=factory)
+
+    def test_reuses_and_resets_driver(self):
+        with self.pool.driver() as driver:
+            driver.get('http://fake/')
+        with self.pool.driver() as driver2:
+            assert driver2 is driver
+            assert driver.urls == ['http://fake/', 'about:blank']
+            assert driver.requests_cleared == 1
+        assert len(self.drivers) == 1
+
+    def test_recycles_after_max_uses(self):
+        for i in range(4):
+            with self.pool.driver():
+                pass
+        assert len(self.drivers) == 2
+        assert self.drivers[0].quit_called
+        assert not self.drivers[1].quit_called
+
+    def test_replaces_crashed_driver(self):
+        with pytest.raises(WebDriverException):
+            with self.pool.driver() as driver:
+                driver.get('http://crash/')
+        assert driver.quit_called
+        with self.pool.driver() as driver2:
+            assert driver2 is not driver
+
+    def test_keeps_at_most_size_idle(self):
+        driver = self.pool.acquire()
+        driver2 = self.pool.acquire()
+        self.pool.release(driver)
+        self.pool.release(driver2)
+        assert driver2.quit_called
+        self.pool.close()
+        assert driver.quit_called
+
+    def test_runner_uses_pool(self):
+        runner = WebdriverRunner(pool=self.pool)
+        runner.run(WebdriverSteps().go_to_url('http://fake/1'))
+        runner.run(WebdriverSteps().go_to_url('http://fake/2'))
+        assert len(self.drivers) == 1
+        assert self.drivers[0].urls == [
+            'http://fake/1', 'about:blank', 'http://fake/2', 'about:blank']
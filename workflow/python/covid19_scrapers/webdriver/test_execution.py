@@ -0,0 +1,25 @@
+from covid19_scrapers.webdriver.execution import GoToURL, WebdriverSteps
+
+
+def test_steps_are_immutable():
+    def predicate(request):
+        return True
+
+    base = WebdriverSteps().go_to_url('http://fake/')
+    first = base.find_request('first', find_by=predicate)
+    second = base.get_page_source()
+    assert WebdriverSteps().steps() == ()
+    assert len(base.steps()) == 1
+    assert [type(step).__name__ for step in first.steps()] == ['GoToURL', 'FindRequest']
+    assert [type(step).__name__ for step in second.steps()] == ['GoToURL', 'GetPageSource']
+
+    # Steps and their predicates are shared, not copied.
+    assert first.steps()[0] is second.steps()[0]
+    assert first.steps()[1].find_by is predicate
+
+
+def test_long_chain():
+    steps = WebdriverSteps()
+    for i in range(5000):
+        steps = steps.add_step(GoToURL(f'http://fake/{i}'))
+    assert [step.url for step in steps.steps()] == [f'http://fake/{i}' for i in range(5000)]
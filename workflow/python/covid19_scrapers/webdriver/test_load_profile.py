@@ -0,0 +1,52 @@
+from selenium.webdriver import ChromeOptions
+
+from covid19_scrapers.webdriver import WebdriverRunner, WebdriverSteps
+from covid19_scrapers.webdriver.load_profile import (
+    FULL_PROFILE, IMAGE_URL_PATTERNS, LIGHTWEIGHT_PROFILE, LoadProfile)
+
+
+class FakeDriver(object):
+    def __init__(self):
+        self.cdp_commands = []
+        self.urls = []
+
+    def execute_cdp_cmd(self, cmd, args):
+        self.cdp_commands.append((cmd, args))
+
+    def get(self, url):
+        self.urls.append(url)
+
+
+def test_blocked_urls():
+    assert FULL_PROFILE.blocked_urls() == []
+    profile = LoadProfile(block_images=True, blocked_url_patterns=['*.css'])
+    assert profile.blocked_urls() == IMAGE_URL_PATTERNS + ['*.css']
+
+
+def test_launch_key():
+    assert LoadProfile(block_fonts=True).launch_key() == FULL_PROFILE.launch_key()
+    assert LIGHTWEIGHT_PROFILE.launch_key() != FULL_PROFILE.launch_key()
+
+
+def test_configure_options():
+    options = ChromeOptions()
+    LIGHTWEIGHT_PROFILE.configure_options(options)
+    assert '--mute-audio' in options.arguments
+    assert options.experimental_options['prefs'] == {
+        'profile.managed_default_content_settings.images': 2}
+
+
+def test_runner_applies_profile():
+    driver = FakeDriver()
+    profile = LoadProfile(blocked_url_patterns=['*.css'], capture_scopes=['.*data.*'])
+    WebdriverRunner(driver=driver, load_profile=profile).run(
+        WebdriverSteps()
+        .use_load_profile(FULL_PROFILE)
+        .go_to_url('http://fake/'))
+    assert driver.cdp_commands == [
+        ('Network.enable', {}),
+        ('Network.setBlockedURLs', {'urls': ['*.css']}),
+        ('Network.enable', {}),
+        ('Network.setBlockedURLs', {'urls': []})]
+    assert driver.scopes == ['.*data.*']
+    assert driver.urls == ['http://fake/']
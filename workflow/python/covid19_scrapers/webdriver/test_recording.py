@@ -0,0 +1,102 @@
+import pytest
+
+from covid19_scrapers.dir_context import dir_context
+from covid19_scrapers.webdriver import WebdriverRunner, WebdriverSteps
+from covid19_scrapers.webdriver.recording import (
+    RECORD, REPLAY, get_recording_path, get_webdriver_mode, webdriver_mode)
+
+
+class FakeResponse(object):
+    def __init__(self, body, headers):
+        self.status_code = 200
+        self.reason = 'OK'
+        self.headers = headers
+        self.body = body
+
+
+class FakeRequest(object):
+    def __init__(self, path, body, response):
+        self.method = 'POST'
+        self.path = path
+        self.url = 'http://fake' + path
+        self.headers = {'Content-Type': 'application/json'}
+        self.body = body
+        self.response = response
+
+
+class FakeDriver(object):
+    page_source = '<html><body><p>fake page</p></body></html>'
+
+    def __init__(self):
+        self.urls = []
+        self.requests = [
+            FakeRequest('/other', b'', FakeResponse(b'', {})),
+            FakeRequest('/query', b'{"q": 1}',
+                        FakeResponse(b'\x00binary', {'X-Session-Id': 'fake-session'})),
+        ]
+
+    def execute_cdp_cmd(self, cmd, args):
+        pass
+
+    def get(self, url):
+        self.urls.append(url)
+
+    def find_elements(self, by, value):
+        return []
+
+
+class UnusablePool(object):
+    def acquire(self):
+        raise AssertionError('Replay must not start a browser')
+
+
+def query_request(request):
+    return request.path == '/query'
+
+
+def make_steps(url='http://fake/'):
+    return (WebdriverSteps()
+            .go_to_url(url)
+            .get_x_session_id()
+            .find_request('query', find_by=query_request)
+            .get_page_source())
+
+
+def test_record_and_replay(tmp_path):
+    with dir_context(tmp_path):
+        driver = FakeDriver()
+        recorded = WebdriverRunner(driver=driver, mode=RECORD).run(make_steps())
+        assert driver.urls == ['http://fake/']
+        assert (tmp_path / get_recording_path(make_steps())).exists()
+
+        replayed = WebdriverRunner(pool=UnusablePool(), mode=REPLAY).run(make_steps())
+        assert replayed.x_session_id == 'fake-session'
+        assert str(replayed.page_source) == str(recorded.page_source)
+        request = replayed.requests['query']
+        assert request.path == '/query'
+        assert request.url == 'http://fake/query'
+        assert request.body == b'{"q": 1}'
+        assert request.headers['content-type'] == 'application/json'
+        assert request.response.status_code == 200
+        assert request.response.body == b'\x00binary'
+        assert request.response.headers.get('x-session-id') == 'fake-session'
+
+
+def test_replay_without_recording(tmp_path):
+    with dir_context(tmp_path):
+        WebdriverRunner(driver=FakeDriver(), mode=RECORD).run(make_steps())
+        with pytest.raises(FileNotFoundError):
+            WebdriverRunner(pool=UnusablePool(), mode=REPLAY).run(
+                make_steps('http://fake/changed'))
+
+
+def test_webdriver_mode():
+    assert get_webdriver_mode() == 'live'
+    with webdriver_mode(REPLAY):
+        assert get_webdriver_mode() == REPLAY
+        with pytest.raises(FileNotFoundError):
+            WebdriverRunner(pool=UnusablePool()).run(make_steps('http://fake/unrecorded'))
+    assert get_webdriver_mode() == 'live'
+    with pytest.raises(ValueError):
+        with webdriver_mode('bogus'):
+            pass
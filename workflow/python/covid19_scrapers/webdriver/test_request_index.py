@@ -0,0 +1,118 @@
+from covid19_scrapers.webdriver.request_index import RequestIndex
+
+
+class FakeResponse(object):
+    def __init__(self, headers={}, body=b''):
+        self.headers = headers
+        self.body = body
+
+
+class FakeRequest(object):
+    def __init__(self, id, path, response=None):
+        self.id = id
+        self.path = path
+        self.method = 'GET'
+        self.response = response
+
+
+class FakeDriver(object):
+    def __init__(self):
+        self.captured = []
+        self.fetches = 0
+
+    @property
+    def requests(self):
+        self.fetches += 1
+        return list(self.captured)
+
+    @requests.deleter
+    def requests(self):
+        self.captured = []
+
+    @property
+    def last_request(self):
+        return self.captured[-1] if self.captured else None
+
+
+class TestRequestIndex(object):
+    def setup(self):
+        self.driver = FakeDriver()
+        self.index = RequestIndex()
+        self.checked = []
+        self.next_id = 0
+
+    def capture(self, path, response=None):
+        request = FakeRequest(self.next_id, path, response)
+        self.next_id += 1
+        self.driver.captured.append(request)
+        return request
+
+    def find_data(self, request):
+        self.checked.append(request.id)
+        return '/data' in request.path and request.response and request.response.body == b'data'
+
+    def test_only_checks_new_requests(self):
+        for i in range(100):
+            self.capture(f'/other/{i}', FakeResponse())
+        assert self.index.find(self.driver, self.find_data) is None
+        assert len(self.checked) == 100
+        self.capture('/other/100', FakeResponse())
+        assert self.index.find(self.driver, self.find_data) is None
+        assert len(self.checked) == 101
+
+        request = self.capture('/data', FakeResponse(body=b'data'))
+        assert self.index.find(self.driver, self.find_data) is request
+        assert len(self.checked) == 102
+        # Matches with responses are remembered.
+        assert self.index.find(self.driver, self.find_data) is request
+        assert len(self.checked) == 102
+
+    def test_rechecks_requests_awaiting_responses(self):
+        request = self.capture('/data')
+        self.capture('/other', FakeResponse())
+        assert self.index.find(self.driver, self.find_data) is None
+        request.response = FakeResponse(body=b'data')
+        assert self.index.find(self.driver, self.find_data) is request
+        assert self.checked == [0, 1, 0]
+
+    def test_returns_first_match(self):
+        first = self.capture('/data/1')
+        self.capture('/data/2', FakeResponse())
+        # The first match is returned even though its response is pending.
+        assert self.index.find(self.driver, lambda r: '/data' in r.path) is first
+        assert self.index.find_by_path(self.driver, r'/data/\d') is first
+
+    def test_find_response_header(self):
+        self.capture('/a')
+        self.capture('/b', FakeResponse())
+        assert self.index.find_response_header(self.driver, 'X-Session-Id') is None
+        self.capture('/c', FakeResponse({'X-Session-Id': 'id'}))
+        assert self.index.find_response_header(self.driver, 'X-Session-Id') == 'id'
+
+    def test_resets_when_requests_cleared(self):
+        self.capture('/data', FakeResponse(body=b'data'))
+        assert self.index.find(self.driver, self.find_data)
+        del self.driver.requests
+        self.capture('/other', FakeResponse())
+        assert self.index.find(self.driver, self.find_data) is None
+
+    def test_only_fetches_history_when_it_may_have_changed(self):
+        self.capture('/other/0', FakeResponse())
+        assert self.index.find(self.driver, self.find_data) is None
+        assert self.index.find(self.driver, self.find_data) is None
+        assert self.driver.fetches == 1
+
+        # New requests are fetched, and so are responses awaited.
+        request = self.capture('/data')
+        assert self.index.find(self.driver, self.find_data) is None
+        assert self.driver.fetches == 2
+        request.response = FakeResponse(body=b'data')
+        assert self.index.find(self.driver, self.find_data) is request
+        assert self.driver.fetches == 3
+        assert self.index.find(self.driver, lambda r: '/other' in r.path)
+        assert self.driver.fetches == 3
+
+        # So is the history after it is cleared.
+        del self.driver.requests
+        assert self.index.find(self.driver, self.find_data) is None
+        assert self.driver.fetches == 4
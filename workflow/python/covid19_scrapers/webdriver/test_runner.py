@@ -0,0 +1,96 @@
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from covid19_scrapers.dir_context import dir_context
+from covid19_scrapers.webdriver import WebdriverRunner, WebdriverSteps
+from covid19_scrapers.webdriver.browser_pool import BrowserPool
+from covid19_scrapers.webdriver.recording import RECORD, REPLAY, webdriver_mode
+
+
+class SlowDriver(object):
+    """Takes 0.2 seconds to load each page, whose source is its URL."""
+
+    def __init__(self, tracker):
+        self.switch_to = mock.Mock()
+        self.page_source = None
+        self.tracker = tracker
+
+    @property
+    def requests(self):
+        return []
+
+    @requests.deleter
+    def requests(self):
+        pass
+
+    def get(self, url):
+        if url == 'about:blank':
+            return
+        with self.tracker['lock']:
+            self.tracker['active'] += 1
+            self.tracker['max_active'] = max(self.tracker['max_active'], self.tracker['active'])
+        time.sleep(0.2)
+        with self.tracker['lock']:
+            self.tracker['active'] -= 1
+        if url == 'http://fake/missing':
+            raise ValueError('Page not found')
+        self.page_source = url
+
+    def execute_cdp_cmd(self, cmd, args):
+        pass
+
+    def quit(self):
+        pass
+
+
+class TestRunAll(object):
+    def setup(self):
+        self.tracker = {'lock': threading.Lock(), 'active': 0, 'max_active': 0}
+        self.pool = BrowserPool(size=3, factory=lambda: SlowDriver(self.tracker))
+        self.runner = WebdriverRunner(pool=self.pool, load_profile=None, adaptive_waits=False)
+
+    def make_steps(self, url):
+        return WebdriverSteps().go_to_url(url).get_page_source(as_soup=False)
+
+    def test_runs_at_once(self):
+        urls = [f'http://fake/{i}' for i in range(4)]
+        results = self.runner.run_all([self.make_steps(url) for url in urls], max_browsers=2)
+        assert [r.page_source for r in results] == urls
+        assert self.tracker['max_active'] == 2
+
+    def test_exceptions(self):
+        steps = [self.make_steps('http://fake/1'), self.make_steps('http://fake/missing')]
+        with pytest.raises(ValueError):
+            self.runner.run_all(steps)
+        results = self.runner.run_all(steps, return_exceptions=True)
+        assert results[0].page_source == 'http://fake/1'
+        assert isinstance(results[1], ValueError)
+
+    def test_uses_webdriver_mode(self, tmp_path):
+        steps = [self.make_steps('http://fake/1'), self.make_steps('http://fake/2')]
+        with dir_context(tmp_path):
+            with webdriver_mode(RECORD):
+                self.runner.run_all(steps)
+            self.pool.factory = None
+            with webdriver_mode(REPLAY):
+                results = self.runner.run_all(steps)
+        assert [r.page_source for r in results] == ['http://fake/1', 'http://fake/2']
+
+
+def test_trace(caplog):
+    tracker = {'lock': threading.Lock(), 'active': 0, 'max_active': 0}
+    runner = WebdriverRunner(driver=SlowDriver(tracker), load_profile=None, adaptive_waits=False)
+    steps = WebdriverSteps().go_to_url('http://fake/1').get_page_source(as_soup=False)
+    with caplog.at_level('INFO'):
+        results = runner.run(steps)
+    trace = results.trace
+    assert [timing.step for timing in trace.steps] == [repr(step) for step in steps.steps()]
+    assert trace.steps[0].seconds >= 0.2
+    assert trace.seconds >= trace.steps[0].seconds
+    assert trace.requests_captured == 0
+    assert trace.response_bytes == len('http://fake/1')
+    assert trace.js_heap_bytes is None
+    assert f'slowest step {trace.steps[0].seconds:.2f}s: {trace.steps[0].step}' in caplog.text
@@ -0,0 +1,136 @@
+import threading
+import time
+
+import pytest
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.webdriver.common.by import By
+
+from covid19_scrapers.dir_context import dir_context
+from covid19_scrapers.webdriver import WebdriverRunner, WebdriverSteps
+from covid19_scrapers.webdriver.driver_expected_conditions import ErrorMarkerFound
+from covid19_scrapers.webdriver.wait_history import WAIT_HISTORY_FILE, WaitHistory
+
+
+class FakeElement(object):
+    text = 'Unexpected Error'
+
+
+class FakeDriver(object):
+    """Finds elements once their locators are shown."""
+
+    def __init__(self, shown=()):
+        self.shown = list(shown)
+
+    def execute_cdp_cmd(self, cmd, args):
+        pass
+
+    def get(self, url):
+        pass
+
+    def find_element(self, by, value):
+        if (by, value) in self.shown:
+            return FakeElement()
+        raise NoSuchElementException(value)
+
+    def find_elements(self, by, value):
+        return [FakeElement()] if (by, value) in self.shown else []
+
+
+def test_timeouts():
+    history = WaitHistory(min_timeout=1)
+    assert history.get_timeout('wait', 60) == 60
+    assert history.get_poll_frequency('wait') == 0.5
+    for seconds in [2, 2, 4]:
+        history.record('wait', seconds)
+    assert history.get_timeout('wait', 60) == pytest.approx(3 * 3.96)
+    assert history.get_timeout('wait', 5) == 5
+    assert history.get_poll_frequency('wait') == pytest.approx(0.1)
+    for _ in range(history.size):
+        history.record('wait', 0.001)
+    assert history.get_times('wait') == [0.001] * history.size
+    assert history.get_timeout('wait', 60) == 1
+    assert history.get_poll_frequency('wait') == history.min_poll
+
+
+def test_save(tmp_path):
+    path = tmp_path / 'history.json'
+    first = WaitHistory(path)
+    second = WaitHistory(path)
+    first.record('a', 1)
+    second.record('b', 2)
+    first.save()
+    second.save()
+    assert WaitHistory(path).get_times('a') == [1]
+    assert WaitHistory(path).get_times('b') == [2]
+
+
+def test_concurrent_saves(tmp_path):
+    path = tmp_path / 'history.json'
+    histories = [WaitHistory(path) for _ in range(8)]
+    for i, history in enumerate(histories):
+        history.record(f'wait {i}', i)
+    threads = [threading.Thread(target=history.save) for history in histories]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    saved = WaitHistory(path)
+    assert all(saved.get_times(f'wait {i}') == [i] for i in range(8))
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_save_failure_is_logged(tmp_path, caplog):
+    history = WaitHistory(tmp_path / 'missing' / 'history.json')
+    history.record('a', 1)
+    history.save()
+    assert 'Unable to save wait history' in caplog.text
+
+
+def test_runner_adapts_timeouts(tmp_path):
+    steps = WebdriverSteps().wait_for_presence_of_elements((By.ID, 'chart'), timeout=2)
+    with dir_context(tmp_path):
+        for _ in range(3):
+            WebdriverRunner(driver=FakeDriver(shown=[(By.ID, 'chart')])).run(steps)
+        history = WaitHistory(WAIT_HISTORY_FILE)
+        key = f'None #0 {steps.steps()[0]!r}'
+        assert len(history.get_times(key)) == 3
+
+        # The wait now fails after its minimum timeout, rather than the step's.
+        history = WaitHistory(WAIT_HISTORY_FILE, min_timeout=0.2)
+        assert history.get_timeout(key, 2) == 0.2
+
+
+def test_waits_are_keyed_by_url(tmp_path):
+    def steps(url):
+        return WebdriverSteps().go_to_url(url).wait_for_presence_of_elements((By.ID, 'chart'), timeout=2)
+
+    with dir_context(tmp_path):
+        runner = WebdriverRunner(driver=FakeDriver(shown=[(By.ID, 'chart')]))
+        for _ in range(3):
+            runner.run(steps('http://fast/'))
+        runner.run(steps('http://slow/'))
+        history = WaitHistory(WAIT_HISTORY_FILE)
+        wait = repr(steps('http://fast/').steps()[1])
+        assert len(history.get_times(f'http://fast/ #1 {wait}')) == 3
+        assert len(history.get_times(f'http://slow/ #1 {wait}')) == 1
+
+        # Callers can name the wait themselves.
+        runner.run(WebdriverSteps().wait_for_presence_of_elements((By.ID, 'chart'), wait_key='chart'))
+        assert len(WaitHistory(WAIT_HISTORY_FILE).get_times('chart')) == 1
+
+
+def test_error_marker():
+    driver = FakeDriver(shown=[(By.ID, 'tabBootErrTitle')])
+    start = time.monotonic()
+    with pytest.raises(ErrorMarkerFound):
+        WebdriverRunner(driver=driver, adaptive_waits=False).run(
+            WebdriverSteps().wait_for_presence_of_elements((By.ID, 'chart'), timeout=5))
+    assert time.monotonic() - start < 1
+
+    # Steps can wait for the error marker itself.
+    WebdriverRunner(driver=driver, adaptive_waits=False).run(
+        WebdriverSteps().wait_for_presence_of_elements((By.ID, 'tabBootErrTitle'), error_locators=[]))
+
+    with pytest.raises(TimeoutException):
+        WebdriverRunner(driver=FakeDriver(), adaptive_waits=False).run(
+            WebdriverSteps().wait_for_presence_of_elements((By.ID, 'chart'), timeout=0.1))
@@ -0,0 +1,127 @@
+import json
+import logging
+import os
+from pathlib import Path
+import tempfile
+import threading
+
+import numpy as np
+
+
+_logger = logging.getLogger(__name__)
+
+# Wait times are saved in this file, relative to the working directory (for scrapers,
+# their home_dir), so each scraper has its own history.
+WAIT_HISTORY_FILE = Path('webdriver_wait_history.json')
+
+# Serializes saves in this process, so runs that finish at once (e.g. from
+# `WebdriverRunner.run_all`) all add their times to the file.
+_SAVE_LOCK = threading.Lock()
+
+
+class WaitHistory(object):
+    """WaitHistory records how long each WebdriverSteps wait took in past runs, and sets
+    the timeout and poll interval of later runs of the same wait from them.
+
+    Once a wait has `min_samples` recorded times, its timeout is the `percentile` of
+    its recent times times `multiplier`, but at least `min_timeout`, and never more than
+    the step's own timeout. So a wait that usually takes 5 seconds fails after 15,
+    rather than a minute, when a dashboard changes and its elements never appear.
+
+    A wait that times out records its timeout as its time, so if a page has become
+    slower, the next runs allow it longer (up to the step's own timeout).
+
+    Waits poll every `poll_fraction` of their median time, between `min_poll` and
+    `max_poll` seconds, so quick waits notice their conditions sooner.
+
+    Params:
+        path: the JSON file the history is loaded from and saved to, or None to keep
+            it in memory.
+        size: the number of recent times kept for each wait.
+    """
+
+    def __init__(self, path=None, size=20, min_samples=3, percentile=99, multiplier=3,
+                 min_timeout=10, poll_fraction=0.05, min_poll=0.05, max_poll=0.5):
+        self.path = path
+        self.size = size
+        self.min_samples = min_samples
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_timeout = min_timeout
+        self.poll_fraction = poll_fraction
+        self.min_poll = min_poll
+        self.max_poll = max_poll
+        self._times = {}
+        self._new_times = {}
+        self._lock = threading.Lock()
+        if path:
+            self._times = self._read()
+
+    def __repr__(self):
+        return f'WaitHistory(path={self.path}, waits={len(self._times)})'
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                times = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            _logger.warning(f'Ignoring unreadable wait history {self.path}: {e}')
+            return {}
+        return {key: [float(t) for t in values] for key, values in times.items()}
+
+    def get_times(self, key):
+        """Returns the recorded times for the wait, oldest first."""
+        with self._lock:
+            return list(self._times.get(key, []))
+
+    def get_timeout(self, key, max_timeout):
+        """Returns the timeout in seconds for the wait, whose step allows max_timeout."""
+        times = self.get_times(key)
+        if len(times) < self.min_samples:
+            return max_timeout
+        timeout = float(np.percentile(times, self.percentile)) * self.multiplier
+        return min(max_timeout, max(self.min_timeout, timeout))
+
+    def get_poll_frequency(self, key):
+        """Returns the interval in seconds between checks of the wait's conditions."""
+        times = self.get_times(key)
+        if not times:
+            return self.max_poll
+        poll = float(np.median(times)) * self.poll_fraction
+        return min(self.max_poll, max(self.min_poll, poll))
+
+    def record(self, key, seconds):
+        """Records that the wait took seconds."""
+        with self._lock:
+            for times in (self._times, self._new_times):
+                times[key] = (times.get(key, []) + [seconds])[-self.size:]
+
+    def save(self):
+        """Adds the times recorded since loading to the history file.
+
+        The history only tunes later runs, so failing to save it is logged rather than
+        raised.
+        """
+        with self._lock:
+            new_times, self._new_times = self._new_times, {}
+        if not self.path or not new_times:
+            return
+        with _SAVE_LOCK:
+            # Re-read the file, in case another run saved to it meanwhile.
+            times = self._read()
+            for key, values in new_times.items():
+                times[key] = (times.get(key, []) + values)[-self.size:]
+            tmp_path = None
+            try:
+                # A unique temporary file, so saves from other processes do not clash.
+                fd, tmp_path = tempfile.mkstemp(dir=Path(self.path).parent,
+                                                prefix=f'{Path(self.path).name}.', suffix='.part')
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(times, f)
+                os.replace(tmp_path, self.path)
+            except (OSError, ValueError) as e:
+                _logger.warning(f'Unable to save wait history {self.path}: {e}')
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""Driver script for benchmarking the Tableau and PowerBI response parsers
+on synthetic responses, and saving the results for comparison with later
+runs.
+"""
+
+import argparse
+import logging
+from pathlib import Path
+import sys
+
+from covid19_scrapers.utils import benchmark
+
+
+def parse_args():
+    """Process command line arguments from sys.argv and returns an options
+    object.
+    """
+    parser = argparse.ArgumentParser(
+        description='Benchmark the Tableau and PowerBI parsers offline')
+    parser.add_argument('--output', metavar='FILE',
+                        default='work/benchmarks.jsonl', action='store',
+                        help='Append results to FILE, and compare them with'
+                        ' the previous results in it.')
+    parser.add_argument('--scale', type=float, metavar='X', action='store',
+                        default=1.0,
+                        help='Multiply the size of the synthetic responses'
+                        ' by X.')
+    parser.add_argument('--repeat', type=int, metavar='N', action='store',
+                        default=3,
+                        help='Time the best of N runs of each benchmark.')
+    parser.add_argument('--threshold', type=float, metavar='RATIO',
+                        action='store', default=1.25,
+                        help='Report benchmarks that take more than RATIO'
+                        ' times the time or memory of the previous run.')
+    return parser.parse_args()
+
+
+def main():
+    opts = parse_args()
+    logging.basicConfig(
+        stream=sys.stderr, level=logging.INFO,
+        format='%(asctime)s %(levelname)s %(name)s:  %(message)s')
+
+    output = Path(opts.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    runs = benchmark.load_results(output)
+    results = benchmark.run_benchmarks(scale=opts.scale, repeat=opts.repeat)
+    regressions = benchmark.compare_results(runs[-1] if runs else None,
+                                            results, opts.threshold)
+    for result, seconds_ratio, bytes_ratio in regressions:
+        logging.warning(f'{result.name} {result.params} regressed: '
+                        f'{seconds_ratio:.2f}x time, '
+                        f'{bytes_ratio:.2f}x peak memory')
+    benchmark.save_results(output, results)
+    logging.info(f'Wrote results to {output}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -10,6 +10,8 @@ from pathlib import Path
 import sys
 
 from covid19_scrapers import get_scraper_names, make_scraper_registry
+from covid19_scrapers.session_pool import SessionPool
+from covid19_scrapers.web_cache import EvictionPolicy, WebCache
 
 
 def parse_args():
@@ -81,6 +83,66 @@ def parse_args():
     parser.add_argument('--enable_beta_scrapers', action='store_true',
                         help='Include beta scrapers when not specifying'
                         ' scrapers manually.')
+    parser.add_argument('--jobs', type=int, metavar='N', action='store',
+                        default=1,
+                        help='Run up to N scrapers concurrently, in'
+                        ' separate worker processes.'
+                        ' (default: %(default)s)')
+    parser.add_argument('--no_isolation', dest='isolate_scrapers',
+                        action='store_false',
+                        help='Run browser- and JVM-based scrapers like the'
+                        ' others, instead of each in its own process.')
+    parser.add_argument('--isolated_jobs', type=int, metavar='N',
+                        action='store', default=1,
+                        help='Run up to N isolated scrapers concurrently.'
+                        ' (default: %(default)s)')
+    parser.add_argument('--isolated_timeout', type=float, metavar='SECONDS',
+                        action='store', default=1800,
+                        help='Kill isolated scrapers that run longer than'
+                        ' SECONDS.'
+                        ' (default: %(default)s)')
+    parser.add_argument('--isolated_memory_limit', type=int, metavar='MB',
+                        action='store', default=4096,
+                        help='Kill isolated scrapers whose processes use more'
+                        ' than MB megabytes of memory.'
+                        ' (default: %(default)s)')
+    parser.add_argument('--cache_gc', action='store_true',
+                        help='Evict entries from the web cache according to'
+                        ' the --cache_max_* options, delete unreferenced'
+                        ' bodies, compact the DB, and exit.')
+    parser.add_argument('--cache_max_size', type=float, metavar='MB',
+                        action='store',
+                        help='Evict least recently used web cache entries'
+                        ' beyond MB megabytes.')
+    parser.add_argument('--cache_max_host_size', type=float, metavar='MB',
+                        action='store',
+                        help='Evict least recently used web cache entries'
+                        ' beyond MB megabytes for each host.')
+    parser.add_argument('--cache_max_age', type=float, metavar='DAYS',
+                        action='store',
+                        help='Evict web cache entries not stored or'
+                        ' revalidated in DAYS days.')
+    parser.add_argument('--cache_gc_interval', type=float,
+                        metavar='SECONDS', action='store', default=600,
+                        help='While scraping, apply the --cache_max_*'
+                        ' limits every SECONDS seconds.'
+                        ' (default: %(default)s)')
+    parser.add_argument('--http_retries', type=int, metavar='N',
+                        action='store', default=3,
+                        help='Retry failed HTTP requests up to N times, with'
+                        ' exponential backoff.'
+                        ' (default: %(default)s)')
+    parser.add_argument('--http_timeout', type=float, metavar='SECONDS',
+                        action='store', default=120,
+                        help='Fail HTTP requests that wait more than SECONDS'
+                        ' for the server.'
+                        ' (default: %(default)s)')
+    parser.add_argument('--webdriver_mode', action='store',
+                        choices=['live', 'record', 'replay'], default='live',
+                        help='Run browser steps live, or also record their'
+                        ' results in the work dir, or replay recorded'
+                        ' results without a browser.'
+                        ' (default: %(default)s)')
     parser.add_argument('--start_date', action='store',
                         type=pd.Timestamp.fromisoformat,
                         help='If set, acquire data starting on the specified'
@@ -118,6 +180,28 @@ def setup_logging(log_file, log_level, log_to_stderr, stderr_log_level):
     sw_logger.setLevel(logging.ERROR)
 
 
+def make_eviction_policy(opts):
+    """Return the EvictionPolicy for the --cache_max_* options, or None
+    if none are set.
+    """
+    if (
+            opts.cache_max_size is None
+            and opts.cache_max_host_size is None
+            and opts.cache_max_age is None):
+        return None
+
+    def to_bytes(mb):
+        if mb is not None:
+            return int(mb * 2**20)
+
+    return EvictionPolicy(
+        max_bytes=to_bytes(opts.cache_max_size),
+        max_host_bytes=to_bytes(opts.cache_max_host_size),
+        max_age=(opts.cache_max_age * 86400
+                 if opts.cache_max_age is not None else None),
+        interval=opts.cache_gc_interval)
+
+
 def write_output(df, output, sort=False):
     """Given a dataframe, write it to one of the output files."""
     logging.info(f'Writing {output}')
@@ -156,13 +240,34 @@ def main():
     setup_logging(opts.log_file, opts.log_level, opts.log_to_stderr,
                   opts.stderr_log_level)
 
+    eviction_policy = make_eviction_policy(opts)
+    if opts.cache_gc:
+        web_cache = WebCache(str(Path(opts.work_dir) / 'web_cache.db'))
+        web_cache.collect_garbage(eviction_policy, vacuum=True)
+        stats = web_cache.get_stats()
+        logging.info(f'Web cache has {stats["entries"]} entries using '
+                     f'{stats["bytes"] / 2**20:.1f} MB')
+        web_cache.close()
+        exit(0)
+
     # Run scrapers
     scraper_registry = make_scraper_registry(
         home_dir=Path(opts.work_dir),
         census_api_key=opts.census_api_key,
         scraper_args=dict(google_api_key=opts.google_api_key,
-                          github_access_token=opts.github_access_token),
-        registry_args=dict(enable_beta_scrapers=opts.enable_beta_scrapers),
+                          github_access_token=opts.github_access_token,
+                          webdriver_mode=opts.webdriver_mode),
+        registry_args=dict(
+            enable_beta_scrapers=opts.enable_beta_scrapers,
+            jobs=opts.jobs,
+            isolate_scrapers=opts.isolate_scrapers,
+            isolated_jobs=opts.isolated_jobs,
+            isolated_timeout=opts.isolated_timeout,
+            isolated_memory_limit=opts.isolated_memory_limit * 2**20),
+        web_cache_args=dict(
+            eviction_policy=eviction_policy,
+            session_pool=SessionPool(max_retries=opts.http_retries,
+                                     timeout=(10, opts.http_timeout))),
     )
     if not opts.scrapers:
         logging.info('Running all scrapers')